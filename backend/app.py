@@ -1,21 +1,37 @@
 import os
 import json
+import base64
+import hashlib
 import random
 import string
 import smtplib
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import date, timedelta, datetime
 from functools import wraps
 
-import requests
-from flask import Flask, jsonify, request, send_from_directory
+import click
+from flask import Flask, Response, copy_current_request_context, g, jsonify, request, send_from_directory
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import JWTManager, create_access_token, decode_token, get_jwt, get_jwt_identity, jwt_required
 from flask_bcrypt import Bcrypt
-from werkzeug.utils import secure_filename
-from sqlalchemy import func
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import and_, case, event, func, or_
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+
+import migrations
+from cache import SingleFlight, TTLCache
+from images import (SNIFF_BYTES, ImageError, UploadTooLarge, image_variant_url, parse_filename, probe_image,
+                    process_image, receive_stream, sniff_format, url_digest, variant_files, write_files)
+from icafe_client import CircuitBreaker, ICafeClient
 
 # Initialize Flask with static folder pointing to frontend build
 app = Flask(__name__, 
@@ -62,6 +78,9 @@ def log_request_info():
         print(f"DEBUG: {request.method} {request.path} | Auth Header: {auth_header[:20] if auth_header else 'None'}")
 
 # Models
+RATING_STARS = range(0, 6)  # reviews are rated 0..5
+
+
 class Club(db.Model):
     __tablename__ = 'clubs'
     id = db.Column(db.Integer, primary_key=True)
@@ -81,6 +100,28 @@ class Club(db.Model):
     zones = db.Column(db.Text, nullable=True)
     tariffs = db.Column(db.Text, nullable=True)
     internet_speed = db.Column(db.String(50), nullable=True)
+    # Upstream (iCafeCloud) circuit breaker state, see icafe_breaker
+    breaker_state = db.Column(db.String(20), default="closed")
+    breaker_failures = db.Column(db.Integer, default=0)
+    breaker_open_until = db.Column(db.DateTime, nullable=True)
+    breaker_last_error = db.Column(db.String(255), nullable=True)
+    breaker_changed_at = db.Column(db.DateTime, nullable=True)
+    # Rating aggregates over club_reviews, kept in step by create_public_club_review
+    # (rebuild with `flask rebuild-ratings`)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_star_0 = db.Column(db.Integer, nullable=False, default=0)
+    rating_star_1 = db.Column(db.Integer, nullable=False, default=0)
+    rating_star_2 = db.Column(db.Integer, nullable=False, default=0)
+    rating_star_3 = db.Column(db.Integer, nullable=False, default=0)
+    rating_star_4 = db.Column(db.Integer, nullable=False, default=0)
+    rating_star_5 = db.Column(db.Integer, nullable=False, default=0)
+    # club_daily_revenue sync state: last local day fetched and when
+    revenue_synced_through = db.Column(db.Date, nullable=True)
+    revenue_refreshed_at = db.Column(db.DateTime, nullable=True)
+    # club_members mirror sync state
+    members_synced_at = db.Column(db.DateTime, nullable=True)  # last successful incremental or full sync
+    members_full_synced_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     users = db.relationship('User', backref='club', lazy=True)
@@ -95,7 +136,8 @@ class User(db.Model):
     role = db.Column(db.String(20), default="manager") # admin or manager
     is_verified = db.Column(db.Boolean, default=False)
     club_id = db.Column(db.Integer, db.ForeignKey('clubs.id'), nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    token_version = db.Column(db.Integer, nullable=False, default=0)  # bump to revoke issued tokens
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     def set_password(self, password):
         self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
@@ -126,6 +168,11 @@ class ClubReview(db.Model):
     club = db.relationship("Club", backref=db.backref("reviews", lazy=True))
     user = db.relationship("User", backref=db.backref("club_reviews", lazy=True))
 
+    __table_args__ = (
+        db.Index("ix_club_reviews_club_created", "club_id", "created_at"),
+        db.Index("ix_club_reviews_user_created", "user_id", "created_at"),
+    )
+
 
 class BookingRequest(db.Model):
     __tablename__ = "booking_requests"
@@ -142,10 +189,102 @@ class BookingRequest(db.Model):
     canceled_by = db.Column(db.String(20), nullable=True)  # client / manager / admin
     canceled_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     club = db.relationship("Club", backref=db.backref("booking_requests", lazy=True))
     user = db.relationship("User", backref=db.backref("booking_requests", lazy=True))
 
+    __table_args__ = (
+        db.Index("ix_booking_requests_club_created", "club_id", "created_at"),
+        db.Index("ix_booking_requests_user_created", "user_id", "created_at"),
+    )
+
+
+class BookingEvent(db.Model):
+    """Append-only log of booking changes; the id doubles as the SSE event id."""
+    __tablename__ = "booking_events"
+    id = db.Column(db.Integer, primary_key=True)
+    booking_id = db.Column(db.Integer, db.ForeignKey("booking_requests.id"), nullable=False)
+    club_id = db.Column(db.Integer, db.ForeignKey("clubs.id"), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    event_type = db.Column(db.String(20), nullable=False)  # created / approved / rejected / cancelled
+    status = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class ClubPcSnapshot(db.Model):
+    """Latest PC list of a club, written by poller.py and read by the HTTP endpoints."""
+    __tablename__ = "club_pc_snapshots"
+    club_id = db.Column(db.Integer, db.ForeignKey("clubs.id"), primary_key=True)
+    pcs = db.Column(db.Text, nullable=True)  # JSON array of raw PCs + normalized "status"
+    pcs_total = db.Column(db.Integer, default=0)
+    pcs_free = db.Column(db.Integer, default=0)
+    fetched_at = db.Column(db.DateTime, nullable=True)  # last successful poll
+    checked_at = db.Column(db.DateTime, nullable=True)  # last poll attempt
+    last_error = db.Column(db.String(255), nullable=True)
+    last_viewed_at = db.Column(db.DateTime, nullable=True)
+
+
+class ClubDailyRevenue(db.Model):
+    """Local copy of iCafeCloud's reportChart: one row per club, day and payment series."""
+    __tablename__ = "club_daily_revenue"
+    club_id = db.Column(db.Integer, db.ForeignKey("clubs.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    series = db.Column(db.String(100), primary_key=True)  # payment method, as named by iCafeCloud
+    amount = db.Column(db.Float, nullable=False, default=0)
+
+
+class ClubMember(db.Model):
+    """Local mirror of a club's iCafeCloud /members, kept up to date by sync_club_members()."""
+    __tablename__ = "club_members"
+    club_id = db.Column(db.Integer, db.ForeignKey("clubs.id"), primary_key=True)
+    member_id = db.Column(db.Integer, primary_key=True)  # member_icafe_id
+    account = db.Column(db.String(100), nullable=False, default="")
+    name = db.Column(db.String(200), nullable=False, default="")
+    account_key = db.Column(db.String(100), nullable=False, default="")  # lower-cased, for prefix search
+    name_key = db.Column(db.String(200), nullable=False, default="")
+    balance = db.Column(db.Float, nullable=False, default=0)
+    balance_bonus = db.Column(db.Float, nullable=False, default=0)
+    points = db.Column(db.Float, nullable=False, default=0)
+    group_name = db.Column(db.String(100), nullable=False, default="")
+    is_active = db.Column(db.Boolean, nullable=False, default=False)
+    is_logined = db.Column(db.Boolean, nullable=False, default=False)
+    expire = db.Column(db.String(30), nullable=False, default="")
+    created = db.Column(db.String(30), nullable=False, default="")  # "YYYY-MM-DD HH:MM:SS", sorts as text
+    synced_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_club_members_club_account", "club_id", "account_key"),
+        db.Index("ix_club_members_club_name", "club_id", "name_key"),
+        db.Index("ix_club_members_club_created", "club_id", "created"),
+    )
+
+
+class UploadedFile(db.Model):
+    """A processed upload (all variants of one image), reference counted from clubs."""
+    __tablename__ = "uploaded_files"
+    digest = db.Column(db.String(32), primary_key=True)  # see images.digest_of
+    fallback_ext = db.Column(db.String(4), nullable=False, default="jpg")
+    size = db.Column(db.Integer, nullable=False, default=0)  # bytes of all variant files
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    status = db.Column(db.String(20), nullable=False, default="processing")  # processing / ready / failed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ScrapedPage(db.Model):
+    """HTTP validators and last result for each page scraper.py fetches."""
+    __tablename__ = "scraped_pages"
+    url = db.Column(db.String(255), primary_key=True)
+    etag = db.Column(db.String(255), nullable=True)
+    last_modified = db.Column(db.String(64), nullable=True)
+    content_hash = db.Column(db.String(64), nullable=True)  # sha256 of the body, for servers without validators
+    links = db.Column(db.Text, nullable=True)  # listing pages: JSON array of club URLs found on it
+    club_id = db.Column(db.Integer, db.ForeignKey("clubs.id"), nullable=True)  # club pages: club it fed
+    status = db.Column(db.String(20), nullable=True)  # changed / unchanged / failed, last run
+    fetched_at = db.Column(db.DateTime, nullable=True)  # last 200
+    checked_at = db.Column(db.DateTime, nullable=True)  # last attempt
+
 
 def generate_verification_code():
     return ''.join(random.choices(string.digits, k=6))
@@ -197,109 +336,79 @@ def send_verification_email(to_email, code):
 # Handle persistent data paths for Docker
 CONFIG_DIR = os.environ.get("CONFIG_DIR", os.path.dirname(__file__))
 UPLOAD_FOLDER = os.path.join(CONFIG_DIR, "uploads")
+UPLOAD_INCOMING = os.path.join(UPLOAD_FOLDER, "incoming")  # received originals awaiting processing
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+os.makedirs(UPLOAD_INCOMING, exist_ok=True)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
-
-# Create tables if they don't exist
-with app.app_context():
-    db.create_all()
-    
-    # Migration: add new columns to existing tables if they don't exist
-    from sqlalchemy import inspect, text
-    inspector = inspect(db.engine)
-    existing_columns = [col['name'] for col in inspector.get_columns('users')]
-    
-    with db.engine.connect() as conn:
-        if 'email' not in existing_columns:
-            conn.execute(text("ALTER TABLE users ADD COLUMN email VARCHAR(120) UNIQUE"))
-            conn.commit()
-            print("✅ Added 'email' column to users table")
-        if 'phone' not in existing_columns:
-            conn.execute(text("ALTER TABLE users ADD COLUMN phone VARCHAR(20)"))
-            conn.commit()
-            print("✅ Added 'phone' column to users table")
-        if 'is_verified' not in existing_columns:
-            conn.execute(text("ALTER TABLE users ADD COLUMN is_verified BOOLEAN DEFAULT 1"))
-            conn.commit()
-            print("✅ Added 'is_verified' column to users table")
-            
-    # Migration for clubs
-    existing_club_columns = [col['name'] for col in inspector.get_columns('clubs')]
-    with db.engine.connect() as conn:
-        if 'address' not in existing_club_columns:
-            conn.execute(text("ALTER TABLE clubs ADD COLUMN address VARCHAR(255)"))
-            conn.commit()
-        if 'phone' not in existing_club_columns:
-            conn.execute(text("ALTER TABLE clubs ADD COLUMN phone VARCHAR(50)"))
-            conn.commit()
-        if 'description' not in existing_club_columns:
-            conn.execute(text("ALTER TABLE clubs ADD COLUMN description TEXT"))
-            conn.commit()
-        if 'lat' not in existing_club_columns:
-            conn.execute(text("ALTER TABLE clubs ADD COLUMN lat FLOAT"))
-            conn.commit()
-        if 'lng' not in existing_club_columns:
-            conn.execute(text("ALTER TABLE clubs ADD COLUMN lng FLOAT"))
-            conn.commit()
-        if 'instagram' not in existing_club_columns:
-            conn.execute(text("ALTER TABLE clubs ADD COLUMN instagram VARCHAR(100)"))
-            conn.commit()
-        if 'working_hours' not in existing_club_columns:
-            conn.execute(text("ALTER TABLE clubs ADD COLUMN working_hours VARCHAR(100)"))
-            conn.commit()
-        if 'zones' not in existing_club_columns:
-            conn.execute(text("ALTER TABLE clubs ADD COLUMN zones TEXT"))
-            conn.commit()
-        if 'tariffs' not in existing_club_columns:
-            conn.execute(text("ALTER TABLE clubs ADD COLUMN tariffs TEXT"))
-            conn.commit()
-        if 'internet_speed' not in existing_club_columns:
-            conn.execute(text("ALTER TABLE clubs ADD COLUMN internet_speed VARCHAR(50)"))
-            conn.commit()
-        if 'club_main_photo_url' not in existing_club_columns:
-            conn.execute(text("ALTER TABLE clubs ADD COLUMN club_main_photo_url VARCHAR(255) DEFAULT ''"))
-            conn.commit()
-        if 'club_photos' not in existing_club_columns:
-            conn.execute(text("ALTER TABLE clubs ADD COLUMN club_photos TEXT"))
-            conn.commit()
-
-    # Migration for booking_requests
-    existing_tables = inspector.get_table_names()
-    if 'booking_requests' in existing_tables:
-        existing_booking_columns = [col['name'] for col in inspector.get_columns('booking_requests')]
-        with db.engine.connect() as conn:
-            if 'cancellation_reason' not in existing_booking_columns:
-                conn.execute(text("ALTER TABLE booking_requests ADD COLUMN cancellation_reason TEXT"))
-                conn.commit()
-            if 'canceled_by' not in existing_booking_columns:
-                conn.execute(text("ALTER TABLE booking_requests ADD COLUMN canceled_by VARCHAR(20)"))
-                conn.commit()
-            if 'canceled_at' not in existing_booking_columns:
-                conn.execute(text("ALTER TABLE booking_requests ADD COLUMN canceled_at DATETIME"))
-                conn.commit()
-            
-    # Create or update default admin user
-    admin = User.query.filter_by(username='admin').first()
-    if not admin:
-        print("🌱 Creating default admin user...")
-        admin = User(username='admin', role='admin', is_verified=True)
-        admin.set_password('admin123')
-        db.session.add(admin)
-        db.session.commit()
-        print("✅ Default admin user created successfully.")
-    else:
-        # Ensure admin is always verified
-        if not admin.is_verified:
-            admin.is_verified = True
+# Werkzeug rejects bigger request bodies with 413 before they are read
+app.config["MAX_CONTENT_LENGTH"] = UPLOAD_MAX_BYTES + 64 * 1024  # + multipart framing
+
+
+# Schema changes live in migrations/ (versioned, recorded in schema_version).
+# With AUTO_MIGRATE=0 start-up refuses to run against an outdated schema and
+# `flask --app app migrate` has to be run first.
+AUTO_MIGRATE = os.environ.get("AUTO_MIGRATE", "1") == "1"
+
+
+def init_db():
+    """Apply pending migrations and seed the default admin.
+
+    Run once per deployment start, before serving: gunicorn's on_starting hook
+    (see gunicorn.conf.py), `python app.py` or `flask --app app init-db`.
+    """
+    with app.app_context():
+        current, latest = migrations.current_version(db), migrations.latest_version()
+        if current < latest:
+            if not AUTO_MIGRATE:
+                raise RuntimeError(
+                    f"Database schema is at version {current}, this release needs {latest}: "
+                    "run `flask --app app migrate`"
+                )
+            migrations.upgrade(db)
+
+        # Create or update default admin user
+        admin = User.query.filter_by(username='admin').first()
+        if not admin:
+            print("🌱 Creating default admin user...")
+            admin = User(username='admin', role='admin', is_verified=True)
+            admin.set_password('admin123')
+            db.session.add(admin)
             db.session.commit()
-            print("✅ Admin user marked as verified.")
+            print("✅ Default admin user created successfully.")
+        else:
+            # Ensure admin is always verified
+            if not admin.is_verified:
+                admin.is_verified = True
+                db.session.commit()
+                print("✅ Admin user marked as verified.")
+
+        restore_breaker_states()
+
+
+@app.cli.command("init-db")
+def init_db_command():
+    """Apply pending migrations and seed the default admin."""
+    init_db()
+
+
+@app.cli.command("migrate")
+@click.option("--status", is_flag=True, help="Only show the current and latest schema version.")
+def migrate_command(status):
+    """Apply pending schema migrations."""
+    current, latest = migrations.current_version(db), migrations.latest_version()
+    if status:
+        print(f"Schema version {current} (latest {latest})")
+        return
+    applied = migrations.upgrade(db)
+    print(f"✅ Schema at version {latest}" + (f", applied: {', '.join(applied)}" if applied else " (nothing to do)"))
+
 
 # ── Config file (legacy/compatibility) ────────────────────────────────────────
 CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
 
-ICAFE_BASE = "https://api.icafecloud.com/api/v2"
+# Shared keep-alive session; pool size is per worker process (ICAFE_POOL_SIZE)
+icafe_client = ICafeClient.from_env()
 
 
 def load_config() -> dict:
@@ -338,17 +447,41 @@ def save_config(data: dict):
         json.dump(data, f, indent=2)
 
 
-def get_club_rating_stats(club_id: int) -> tuple[float, int]:
-    avg_rating, total_reviews = db.session.query(
-        func.avg(ClubReview.rating),
-        func.count(ClubReview.id)
-    ).filter(ClubReview.club_id == club_id).first()
-
-    avg = float(avg_rating or 0.0)
-    count = int(total_reviews or 0)
+def get_club_rating_stats(club: Club) -> tuple[float, int]:
+    count = club.rating_count or 0
+    avg = (club.rating_sum or 0) / count if count else 0.0
     return avg, count
 
 
+def club_rating_histogram(club: Club) -> dict:
+    return {str(star): getattr(club, f"rating_star_{star}") or 0 for star in RATING_STARS}
+
+
+def rebuild_club_ratings() -> int:
+    """Recompute every club's rating aggregates from club_reviews; returns the number of clubs."""
+    totals = {}
+    rows = db.session.query(ClubReview.club_id, ClubReview.rating, func.count(ClubReview.id)) \
+        .group_by(ClubReview.club_id, ClubReview.rating).all()
+    for club_id, rating, count in rows:
+        totals.setdefault(club_id, {})[rating] = count
+
+    clubs = Club.query.all()
+    for c in clubs:
+        per_star = totals.get(c.id, {})
+        c.rating_sum = sum(rating * count for rating, count in per_star.items())
+        c.rating_count = sum(per_star.values())
+        for star in RATING_STARS:
+            setattr(c, f"rating_star_{star}", per_star.get(star, 0))
+    db.session.commit()
+    return len(clubs)
+
+
+@app.cli.command("rebuild-ratings")
+def rebuild_ratings_command():
+    """Recompute club rating aggregates from club_reviews."""
+    print(f"✅ Rebuilt rating aggregates for {rebuild_club_ratings()} clubs")
+
+
 def parse_icafe_pcs(raw_result: dict | None) -> list:
     if not raw_result or raw_result.get("code") != 200:
         return []
@@ -372,20 +505,289 @@ def detect_pc_status(pc: dict) -> str:
     return "free"
 
 
+# ── Upstream circuit breaker ──────────────────────────────────────────────────
+# A tenant whose key was revoked or whose cafe is unreachable is refused
+# instantly after a few consecutive failures instead of costing every request a
+# full timeout. State changes are mirrored onto the Club row so all workers
+# (and /api/admin/clubs) can see them.
+
+def persist_breaker_state(cafe_id: str, state: dict):
+    open_until = datetime.utcfromtimestamp(state["open_until"]) if state["open_until"] else None
+    # Own app context -> own session, safe from request handlers and pool threads
+    with app.app_context():
+        Club.query.filter_by(cafe_id=cafe_id).update({
+            "breaker_state": state["state"],
+            "breaker_failures": state["failures"],
+            "breaker_open_until": open_until,
+            "breaker_last_error": state["last_error"],
+            "breaker_changed_at": datetime.utcnow(),
+        }, synchronize_session=False)
+        db.session.commit()
+
+
+icafe_breaker = CircuitBreaker.from_env(on_change=persist_breaker_state)
+
+
+def restore_breaker_states():
+    for c in Club.query.filter(Club.breaker_state.in_(["open", "half_open"])).all():
+        if not c.cafe_id:
+            continue
+        open_until = (c.breaker_open_until - datetime(1970, 1, 1)).total_seconds() if c.breaker_open_until else 0.0
+        icafe_breaker.restore(str(c.cafe_id), c.breaker_state, c.breaker_failures, open_until, c.breaker_last_error)
+
+
+def is_upstream_failure(result: dict | None) -> bool:
+    # None means transport error / undecodable body; 401/403 mean the key is dead
+    return result is None or result.get("code") in (401, 403)
+
+
+def breaker_summary(club: Club) -> dict:
+    live = icafe_breaker.state(str(club.cafe_id)) if club.cafe_id else None
+    if live:
+        return {
+            "state": live["state"],
+            "failures": live["failures"],
+            "open_until": datetime.utcfromtimestamp(live["open_until"]).isoformat() + "Z" if live["open_until"] else None,
+            "last_error": live["last_error"],
+        }
+    return {
+        "state": club.breaker_state or "closed",
+        "failures": club.breaker_failures or 0,
+        "open_until": club.breaker_open_until.isoformat() + "Z" if club.breaker_open_until else None,
+        "last_error": club.breaker_last_error,
+    }
+
+
+# Identical GETs in flight at the same time (dashboard tabs polling together)
+# share a single upstream call and its decoded result.
+icafe_single_flight = SingleFlight("icafe_get")
+
+
+def icafe_get_raw(api_key: str, cafe_id: str, path: str, params: dict = None, timeout: int = 15) -> dict | None:
+    key = (str(cafe_id), path, tuple(sorted((params or {}).items())))
+    return icafe_single_flight.do(key, lambda: _icafe_http_get(api_key, cafe_id, path, params, timeout))
+
+
+def _icafe_http_get(api_key: str, cafe_id: str, path: str, params: dict = None, timeout: int = 15) -> dict | None:
+    tenant = str(cafe_id)
+    if not icafe_breaker.allow(tenant):
+        return None
+    try:
+        result = icafe_client.get(api_key, cafe_id, path, params=params, read_timeout=timeout)
+    except Exception as e:
+        print(f"API Error ({path}): {e}")
+        icafe_breaker.record_failure(tenant, f"{type(e).__name__}: {e}")
+        return None
+
+    if is_upstream_failure(result):
+        icafe_breaker.record_failure(tenant, f"code {result.get('code')}: {result.get('message', '')}")
+    else:
+        icafe_breaker.record_success(tenant)
+    return result
+
+
 def icafe_get_for_club(club: Club, path: str, params: dict = None, timeout: int = 15) -> dict | None:
     if not club or not club.api_key or not club.cafe_id:
         return None
-    headers = {
-        "Authorization": f"Bearer {club.api_key.strip()}",
-        "Accept": "application/json",
-    }
-    url = f"{ICAFE_BASE}/cafe/{club.cafe_id}{path}"
+    return icafe_get_raw(club.api_key, club.cafe_id, path, params=params, timeout=timeout)
+
+
+# ── Shared PC-list cache ──────────────────────────────────────────────────────
+# Every /pcList consumer (dashboard, club-finder, bookings) goes through this
+# cache, so one cafe costs at most one upstream call per PC_CACHE_TTL window.
+
+PC_CACHE_TTL = float(os.environ.get("PC_CACHE_TTL", "5"))
+PC_CACHE_STALE_TTL = float(os.environ.get("PC_CACHE_STALE_TTL", "30"))
+
+pc_list_cache = TTLCache(
+    "pc_list", PC_CACHE_TTL, PC_CACHE_STALE_TTL,
+    should_cache=lambda raw: bool(raw) and raw.get("code") == 200,
+)
+
+
+def fetch_pc_list(api_key: str, cafe_id: str, timeout: float = 8, allow_stale: bool = True) -> dict | None:
+    if not api_key or not cafe_id:
+        return None
+    if icafe_breaker.is_open(str(cafe_id)):
+        # Failing tenant: answer from last-known data without touching upstream,
+        # unless the caller needs live data (last-known may be any age here)
+        return pc_list_cache.peek(str(cafe_id)) if allow_stale else None
+    return pc_list_cache.get(
+        str(cafe_id),
+        lambda: icafe_get_raw(api_key, cafe_id, "/pcList", timeout=timeout),
+        allow_stale=allow_stale,
+    )
+
+
+def get_club_pc_list(club: Club, timeout: float = 8, allow_stale: bool = True) -> dict | None:
+    if not club:
+        return None
+    note_clubs_viewed([club.id])
+    if allow_stale:
+        snapshot = read_pc_snapshot(club.id)
+        if snapshot:
+            return snapshot
+    return fetch_pc_list(club.api_key, club.cafe_id, timeout=timeout, allow_stale=allow_stale)
+
+
+# ── PC snapshots (written by poller.py) ───────────────────────────────────────
+# When the poller runs, read endpoints are served from club_pc_snapshots and
+# never wait on iCafeCloud. Without it (or when it falls behind) snapshots go
+# stale after PC_SNAPSHOT_MAX_AGE and the live, cached path takes over.
+
+PC_SNAPSHOT_MAX_AGE = float(os.environ.get("PC_SNAPSHOT_MAX_AGE", "120"))
+VIEW_MARK_INTERVAL = 30  # seconds between last_viewed_at writes per club
+
+_view_marks = {}
+_view_marks_lock = threading.Lock()
+
+
+def snapshot_is_fresh(snapshot: ClubPcSnapshot | None) -> bool:
+    return bool(
+        snapshot and snapshot.fetched_at
+        and (datetime.utcnow() - snapshot.fetched_at).total_seconds() <= PC_SNAPSHOT_MAX_AGE
+    )
+
+
+def snapshot_payload(snapshot: ClubPcSnapshot) -> dict:
+    """Return the snapshot in the same shape as a raw /pcList response."""
+    try:
+        pcs = json.loads(snapshot.pcs or "[]")
+    except Exception:
+        pcs = []
+    return {"code": 200, "data": pcs}
+
+
+def read_pc_snapshot(club_id: int) -> dict | None:
+    snapshot = db.session.get(ClubPcSnapshot, club_id)
+    return snapshot_payload(snapshot) if snapshot_is_fresh(snapshot) else None
+
+
+def save_pc_snapshot(club_id: int, raw: dict | None, error: str | None = None):
+    """Store a polled /pcList result; failed polls only update checked_at/last_error."""
+    now = datetime.utcnow()
+    snapshot = db.session.get(ClubPcSnapshot, club_id)
+    if not snapshot:
+        snapshot = ClubPcSnapshot(club_id=club_id)
+        db.session.add(snapshot)
+    snapshot.checked_at = now
+
+    if raw and raw.get("code") == 200:
+        pcs = parse_icafe_pcs(raw)
+        for pc in pcs:
+            pc["status"] = detect_pc_status(pc)
+        snapshot.pcs = json.dumps(pcs, ensure_ascii=False)
+        snapshot.pcs_total = len(pcs)
+        snapshot.pcs_free = sum(1 for pc in pcs if pc["status"] == "free")
+        snapshot.fetched_at = now
+        snapshot.last_error = None
+    else:
+        snapshot.last_error = (error or (raw or {}).get("message") or "no response")[:255]
+    db.session.commit()
+
+
+def note_clubs_viewed(club_ids: list[int]):
+    """Record (throttled) that someone is looking at these clubs so the poller speeds up."""
+    now = time.monotonic()
+    with _view_marks_lock:
+        due = [cid for cid in club_ids if now - _view_marks.get(cid, 0) >= VIEW_MARK_INTERVAL]
+        for cid in due:
+            _view_marks[cid] = now
+    if not due:
+        return
     try:
-        resp = requests.get(url, headers=headers, params=params, timeout=timeout)
-        return resp.json()
+        with app.app_context():
+            viewed_at = datetime.utcnow()
+            ClubPcSnapshot.query.filter(ClubPcSnapshot.club_id.in_(due)).update(
+                {"last_viewed_at": viewed_at}, synchronize_session=False
+            )
+            existing = {row.club_id for row in db.session.query(ClubPcSnapshot.club_id).filter(ClubPcSnapshot.club_id.in_(due))}
+            for cid in due:
+                if cid not in existing:
+                    db.session.add(ClubPcSnapshot(club_id=cid, last_viewed_at=viewed_at))
+            db.session.commit()
     except Exception as e:
-        print(f"Public API Error ({path}): {e}")
-        return None
+        print(f"Failed to mark clubs {due} as viewed: {e}")
+
+
+def invalidate_pc_list(cafe_id: str | None = None):
+    """Drop the cached PC list of one cafe, or of every cafe when cafe_id is None."""
+    pc_list_cache.invalidate(str(cafe_id) if cafe_id else None)
+
+
+# ── Public club-finder fan-out ────────────────────────────────────────────────
+# /api/public/clubs needs the PC list of every club. Fetch them on a shared,
+# bounded pool with one global deadline so a dead tenant can't stall the page.
+
+PUBLIC_FANOUT_WORKERS = int(os.environ.get("PUBLIC_FANOUT_WORKERS", "16"))
+PUBLIC_FANOUT_DEADLINE = float(os.environ.get("PUBLIC_FANOUT_DEADLINE", "3"))
+
+_public_fanout_pool = ThreadPoolExecutor(max_workers=PUBLIC_FANOUT_WORKERS, thread_name_prefix="pc-fanout")
+
+
+def _timed_pc_list_fetch(api_key: str, cafe_id: str, timeout: float) -> tuple[dict | None, float]:
+    started = time.perf_counter()
+    result = fetch_pc_list(api_key, cafe_id, timeout=timeout)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def fetch_pc_lists_concurrently(clubs: list, deadline: float = PUBLIC_FANOUT_DEADLINE) -> dict[int, dict]:
+    """Fetch /pcList for many clubs in parallel within a single deadline.
+
+    Returns {club_id: {"status": ..., "pcs": [...], "ms": ...}} where status is
+    "ok", "snapshot", "stale", "error", "timeout", "circuit_open" or
+    "unconfigured". Clubs with a fresh poller snapshot, or whose circuit is
+    open, are answered without an upstream call. Clubs that miss the deadline
+    fall back to their last cached PC list ("stale") when there is one; their
+    requests finish in the background and refill the cache.
+    """
+    started = time.perf_counter()
+    results = {}
+    futures = {}
+    cafe_ids = {}
+    snapshots = {
+        s.club_id: s
+        for s in ClubPcSnapshot.query.filter(ClubPcSnapshot.club_id.in_([c.id for c in clubs])).all()
+    } if clubs else {}
+    note_clubs_viewed([c.id for c in clubs])
+    for c in clubs:
+        if snapshot_is_fresh(snapshots.get(c.id)):
+            results[c.id] = {"status": "snapshot", "pcs": parse_icafe_pcs(snapshot_payload(snapshots[c.id])), "ms": 0.0}
+            continue
+        if not c.api_key or not c.cafe_id:
+            results[c.id] = {"status": "unconfigured", "pcs": [], "ms": 0.0}
+            continue
+        if icafe_breaker.is_open(str(c.cafe_id)):
+            last_known = pc_list_cache.peek(str(c.cafe_id))
+            results[c.id] = {
+                "status": "stale" if last_known else "circuit_open",
+                "pcs": parse_icafe_pcs(last_known),
+                "ms": 0.0,
+            }
+            continue
+        # Pass plain values: ORM instances must not cross into worker threads.
+        future = _public_fanout_pool.submit(_timed_pc_list_fetch, c.api_key, c.cafe_id, deadline)
+        futures[future] = c.id
+        cafe_ids[c.id] = c.cafe_id
+
+    done, _ = wait(futures, timeout=deadline)
+    for future, club_id in futures.items():
+        if future not in done:
+            elapsed = round((time.perf_counter() - started) * 1000, 1)
+            last_known = pc_list_cache.peek(str(cafe_ids[club_id]))
+            if last_known:
+                results[club_id] = {"status": "stale", "pcs": parse_icafe_pcs(last_known), "ms": elapsed}
+            else:
+                results[club_id] = {"status": "timeout", "pcs": [], "ms": elapsed}
+            continue
+        raw, elapsed = future.result()
+        ok = bool(raw) and raw.get("code") == 200
+        results[club_id] = {
+            "status": "ok" if ok else "error",
+            "pcs": parse_icafe_pcs(raw),
+            "ms": round(elapsed, 1),
+        }
+    return results
 
 
 def normalize_booking_status(raw_status: str | None) -> str:
@@ -435,6 +837,23 @@ def parse_booking_pc_entries(raw_value: str | None) -> list[dict]:
     return entries
 
 
+def booking_summary_counts(query) -> dict:
+    """count / pending_count / cancelled_count over a BookingRequest query, computed in SQL.
+
+    Mirrors normalize_booking_status(): anything not approved/rejected/cancelled is pending.
+    """
+    total, pending, cancelled = query.with_entities(
+        func.count(BookingRequest.id),
+        func.sum(case((BookingRequest.status.in_(["approved", "rejected", "cancelled"]), 0), else_=1)),
+        func.sum(case((BookingRequest.status == "cancelled", 1), else_=0)),
+    ).order_by(None).first()
+    return {
+        "count": int(total or 0),
+        "pending_count": int(pending or 0),
+        "cancelled_count": int(cancelled or 0),
+    }
+
+
 def booking_display_pc_names(entries: list[dict]) -> list[str]:
     result = []
     for entry in entries:
@@ -446,50 +865,448 @@ def booking_display_pc_names(entries: list[dict]) -> list[str]:
     return result
 
 
+# ── Request identity ──────────────────────────────────────────────────────────
+# Access tokens carry role, club_id and the user's token_version ("tv") as
+# claims, so authorization reads the token instead of the users table. Bumping
+# users.token_version revokes every token issued before the change; the check
+# goes through identity_cache, so it costs one small query per user per
+# IDENTITY_CACHE_TTL. Changes made in this process invalidate immediately;
+# other workers pick them up after the TTL.
+
+IDENTITY_CACHE_TTL = float(os.environ.get("IDENTITY_CACHE_TTL", "10"))
+
+identity_cache = TTLCache("identity", ttl=IDENTITY_CACHE_TTL)
+club_credentials_cache = TTLCache("club_credentials", ttl=IDENTITY_CACHE_TTL)
+
+
+def issue_access_token(user: User) -> str:
+    return create_access_token(identity=str(user.id), additional_claims={
+        "role": user.role,
+        "club_id": user.club_id,
+        "tv": user.token_version or 0,
+    })
+
+
+def revoke_user_tokens(user: User):
+    """Invalidate the user's issued tokens on the next commit (their claims are out of date)."""
+    user.token_version = (user.token_version or 0) + 1
+
+
+def load_identity(user_id: int) -> dict | None:
+    row = db.session.query(User.id, User.role, Club.id.label("club_id"), User.token_version) \
+        .outerjoin(Club, User.club_id == Club.id).filter(User.id == user_id).first()
+    if not row:
+        return None
+    return {
+        "user_id": row.id,
+        "role": row.role,
+        "club_id": row.club_id,  # None when unassigned or the club no longer exists
+        "token_version": row.token_version or 0,
+    }
+
+
+def load_club_credentials(club_id: int) -> dict | None:
+    row = db.session.query(Club.api_key, Club.cafe_id).filter(Club.id == club_id).first()
+    return {"api_key": row.api_key, "cafe_id": row.cafe_id} if row else None
+
+
+def claims_revoked(claims: dict) -> bool:
+    """True when the token's "tv" no longer matches the user's token_version."""
+    if "tv" not in claims:
+        return False  # issued before claims were added; expires on its own
+    user_id = int(claims["sub"])
+    identity = identity_cache.get(user_id, lambda: load_identity(user_id))
+    return identity is None or identity["token_version"] != claims["tv"]
+
+
+def identity_from_claims(claims: dict) -> dict | None:
+    """Identity of a token that passed claims_revoked()."""
+    user_id = int(claims["sub"])
+    if "tv" in claims:
+        # claims_revoked() already matched tv against the user's current version
+        return {
+            "user_id": user_id,
+            "role": claims["role"],
+            "club_id": claims["club_id"],
+            "token_version": claims["tv"],
+        }
+    return identity_cache.get(user_id, lambda: load_identity(user_id))
+
+
+@jwt.token_in_blocklist_loader
+def token_is_revoked(jwt_header, jwt_payload) -> bool:
+    return claims_revoked(jwt_payload)
+
+
+@jwt.revoked_token_loader
+def revoked_token_callback(jwt_header, jwt_payload):
+    return jsonify({"message": "The token has been revoked", "error": "token_revoked"}), 401
+
+
+def current_identity() -> dict | None:
+    """Identity of the JWT user for this request (call inside @jwt_required routes)."""
+    if "identity" not in g:
+        g.identity = identity_from_claims(get_jwt())
+    return g.identity
+
+
+def current_club_credentials() -> dict | None:
+    identity = current_identity()
+    if not identity or not identity["club_id"]:
+        return None
+    club_id = identity["club_id"]
+    return club_credentials_cache.get(club_id, lambda: load_club_credentials(club_id))
+
+
+def invalidate_identity(user_id: int = None):
+    """Drop cached identities: one user, or everyone."""
+    identity_cache.invalidate(user_id)
+    g.pop("identity", None)
+
+
 # ── iCafeCloud API helper ─────────────────────────────────────────────────────
 
 def icafe_get(path: str, params: dict = None) -> dict | None:
-    # Get current user and their club's credentials
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    if not user or not user.club:
+    # Current user's club credentials
+    credentials = current_club_credentials()
+    if not credentials:
         return {"code": 401, "message": "No club assigned to user"}
-    
-    headers = {
-        "Authorization": f"Bearer {user.club.api_key.strip()}",
-        "Accept": "application/json"
-    }
-    url = f"{ICAFE_BASE}/cafe/{user.club.cafe_id}{path}"
-    
-    try:
-        resp = requests.get(url, headers=headers, params=params, timeout=15)
-        return resp.json()
-    except Exception as e:
-        print(f"API Error ({path}): {e}")
-        return None
+
+    return icafe_get_raw(credentials["api_key"], credentials["cafe_id"], path, params=params, timeout=15)
+
+
+def current_user_club() -> Club | None:
+    identity = current_identity()
+    return db.session.get(Club, identity["club_id"]) if identity and identity["club_id"] else None
 
 
 def icafe_post(path: str, data: dict = None) -> dict | None:
-    # Get current user and their club's credentials
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    if not user or not user.club:
+    # Current user's club credentials
+    credentials = current_club_credentials()
+    if not credentials:
         return {"code": 401, "message": "No club assigned to user"}
 
-    headers = {
-        "Authorization": f"Bearer {user.club.api_key.strip()}",
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-    }
-    url = f"{ICAFE_BASE}/cafe/{user.club.cafe_id}{path}"
     try:
-        resp = requests.post(url, headers=headers, json=data or {}, timeout=10)
-        return resp.json()
+        return icafe_client.post(credentials["api_key"], credentials["cafe_id"], path, data=data, read_timeout=10)
     except Exception as e:
         print(f"API Error ({path}): {e}")
         return None
 
 
+# ── Booking events (Server-Sent Events) ──────────────────────────────────────
+# Booking changes are appended to booking_events in the same transaction as the
+# change itself. Open SSE streams sleep on an in-process condition that is woken
+# by local writes and by a single watcher thread that polls the events
+# watermark, so idle streams cost two tiny queries per process per
+# SSE_POLL_INTERVAL in total.
+
+SSE_POLL_INTERVAL = float(os.environ.get("SSE_POLL_INTERVAL", "2"))
+SSE_HEARTBEAT_INTERVAL = float(os.environ.get("SSE_HEARTBEAT_INTERVAL", "15"))
+SSE_MAX_STREAM_SECONDS = float(os.environ.get("SSE_MAX_STREAM_SECONDS", "300"))
+# EventSource can't send an Authorization header, so browsers open streams with
+# a short-lived ?ticket= instead of putting the access token in the URL (and in
+# every proxy and access log). Tickets only open booking streams.
+SSE_TICKET_TTL = int(os.environ.get("SSE_TICKET_TTL", "30"))
+# Auto-increment ids are handed out at insert but become visible at commit, so
+# id N can appear after N+1 has already been read. Readers therefore re-read
+# this many ids below their cursor and skip what they already have.
+BOOKING_EVENT_OVERLAP = int(os.environ.get("BOOKING_EVENT_OVERLAP", "100"))
+
+
+def booking_events_watermark() -> tuple[int, int]:
+    """(MAX(id), rows in the overlap window below it): changes when an event
+    commits, including one that commits late below the current max."""
+    latest = db.session.query(func.max(BookingEvent.id)).scalar() or 0
+    recent = db.session.query(func.count(BookingEvent.id)) \
+        .filter(BookingEvent.id > latest - BOOKING_EVENT_OVERLAP).scalar() or 0
+    return latest, recent
+
+
+class BookingEventBus:
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self.generation = 0  # bumped whenever booking_events may have changed
+        self._watermark = None
+        self._cond = threading.Condition()
+        self._watcher = None
+
+    def publish(self):
+        with self._cond:
+            self.generation += 1
+            self._cond.notify_all()
+
+    def wait_for(self, generation: int, timeout: float) -> int:
+        self._ensure_watcher()
+        with self._cond:
+            self._cond.wait_for(lambda: self.generation > generation, timeout=timeout)
+            return self.generation
+
+    def _ensure_watcher(self):
+        with self._cond:
+            if self._watcher:
+                return
+            self._watcher = threading.Thread(target=self._watch, name="booking-events", daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        while True:
+            try:
+                with app.app_context():
+                    watermark = booking_events_watermark()
+                if watermark != self._watermark:
+                    self._watermark = watermark
+                    self.publish()
+            except Exception as e:
+                print(f"Booking event watcher error: {e}")
+            time.sleep(self.poll_interval)
+
+
+booking_event_bus = BookingEventBus(SSE_POLL_INTERVAL)
+
+
+def record_booking_event(booking: "BookingRequest", event_type: str) -> BookingEvent:
+    """Queue an event for ``booking`` in the current transaction (commit is up to the caller)."""
+    if booking.id is None:
+        db.session.flush()
+    event = BookingEvent(
+        booking_id=booking.id,
+        club_id=booking.club_id,
+        user_id=booking.user_id,
+        event_type=event_type,
+        status=normalize_booking_status(booking.status),
+    )
+    db.session.add(event)
+    return event
+
+
+def booking_event_payload(event: BookingEvent) -> dict:
+    return {
+        "id": event.id,
+        "type": event.event_type,
+        "booking_id": event.booking_id,
+        "club_id": event.club_id,
+        "status": event.status,
+        "created_at": event.created_at.isoformat() + "Z" if event.created_at else None,
+    }
+
+
+def stream_ticket_serializer() -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(app.config["JWT_SECRET_KEY"], salt="booking-stream")
+
+
+def stream_claims_from_request() -> tuple[dict | None, Response | None]:
+    """Authenticate an SSE request: (claims, None) or (None, 401 response).
+
+    Accepts a Bearer access token or a ?ticket= from issue_stream_ticket().
+    decode_token() skips the blocklist loader, so the token version is checked
+    here the same way token_is_revoked() does for @jwt_required routes.
+    """
+    auth_header = request.headers.get("Authorization", "")
+    claims = None
+    if auth_header.startswith("Bearer "):
+        try:
+            claims = decode_token(auth_header[7:])
+        except Exception:
+            claims = None
+        if claims and claims.get("type") != "access":
+            claims = None
+    elif request.args.get("ticket"):
+        try:
+            claims = stream_ticket_serializer().loads(request.args["ticket"], max_age=SSE_TICKET_TTL)
+        except BadSignature:  # includes SignatureExpired
+            claims = None
+    if not claims:
+        return None, (jsonify({"message": "Request does not contain a valid access token or stream ticket", "error": "authorization_required"}), 401)
+    if claims_revoked(claims):
+        return None, revoked_token_callback(None, claims)
+    return claims, None
+
+
+def booking_event_stream(filters: list, start_after: int | None, claims: dict) -> Response:
+    def generate():
+        generation = -1  # the first pass sends whatever is already past the cursor
+        with app.app_context():
+            cursor = start_after
+            if cursor is None:
+                cursor = db.session.query(func.max(BookingEvent.id)).scalar() or 0
+            # Events already in the overlap window count as delivered; ones that
+            # commit there later are still sent
+            delivered = {row.id for row in BookingEvent.query.with_entities(BookingEvent.id)
+                         .filter(BookingEvent.id > cursor - BOOKING_EVENT_OVERLAP, BookingEvent.id <= cursor, *filters)}
+        yield "retry: 3000\n\n"
+
+        stream_deadline = time.monotonic() + SSE_MAX_STREAM_SECONDS
+        while time.monotonic() < stream_deadline:
+            latest = booking_event_bus.wait_for(generation, timeout=SSE_HEARTBEAT_INTERVAL)
+            with app.app_context():
+                if claims_revoked(claims):
+                    return  # password reset / reassignment since the stream opened
+            if latest == generation:
+                yield ": keep-alive\n\n"
+                continue
+            generation = latest
+            with app.app_context():
+                rows = BookingEvent.query.filter(BookingEvent.id > cursor - BOOKING_EVENT_OVERLAP, *filters) \
+                    .order_by(BookingEvent.id).all()
+                events = [booking_event_payload(e) for e in rows if e.id not in delivered]
+            for event in events:
+                yield f"id: {event['id']}\nevent: booking\ndata: {json.dumps(event)}\n\n"
+            if events:
+                delivered.update(event["id"] for event in events)
+                cursor = max(cursor, events[-1]["id"])
+                delivered = {event_id for event_id in delivered if event_id > cursor - BOOKING_EVENT_OVERLAP}
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
+def last_event_id() -> int | None:
+    raw = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        return int(raw) if raw else None
+    except ValueError:
+        return None
+
+
+# ── Conditional GET (ETag / 304) ──────────────────────────────────────────────
+# Polled JSON endpoints are usually byte-identical between polls. conditional_get
+# tags responses with an ETag and answers a matching If-None-Match with an empty
+# 304. With a ``version`` callable the ETag comes from a cheap version string,
+# so an unchanged resource is answered before the view queries or serializes.
+
+PUBLIC_CACHE_CONTROL = "public, max-age=5, stale-while-revalidate=30"
+
+
+def conditional_get(cache_control: str = "private, no-cache", version=None):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            etag = None
+            if version:
+                etag = hashlib.sha1(version(*args, **kwargs).encode("utf-8")).hexdigest()
+                if request.if_none_match.contains(etag):
+                    response = Response(status=304)
+                    response.set_etag(etag)
+                    response.headers["Cache-Control"] = cache_control
+                    return response
+
+            response = app.make_response(fn(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            if etag:
+                response.set_etag(etag)
+            else:
+                response.add_etag()
+            response.headers["Cache-Control"] = cache_control
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+
+def _viewer_version_prefix() -> str:
+    # Same user + same query, and the user's role/club (they decide the scope)
+    identity = current_identity()
+    scope = f"{identity['role']}:{identity['club_id']}" if identity else "anonymous"
+    return f"{get_jwt_identity()}|{scope}|{request.query_string.decode()}"
+
+
+def bookings_version(*args, **kwargs) -> str:
+    # Every booking change appends a booking_event; the watermark also moves
+    # when an event commits late below the current max id
+    latest_event, recent_events = booking_events_watermark()
+    return f"bookings|{_viewer_version_prefix()}|{latest_event}|{recent_events}"
+
+
+def reviews_version(*args, **kwargs) -> str:
+    # Reviews are append-only
+    latest_id, total = db.session.query(func.max(ClubReview.id), func.count(ClubReview.id)).first()
+    return f"reviews|{_viewer_version_prefix()}|{latest_id or 0}|{total or 0}"
+
+
+# ── Keyset pagination ─────────────────────────────────────────────────────────
+# Listings are ordered by (created_at DESC, id DESC) and paged with an opaque
+# cursor holding the last row's sort key, so page N costs the same as page 1.
+
+PAGE_SIZE_MAX = int(os.environ.get("PAGE_SIZE_MAX", "500"))
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Inverse of encode_cursor(); raises ValueError on anything it did not produce."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, row_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def page_args(default_limit: int) -> tuple[int, str | None]:
+    limit = request.args.get("limit", default_limit, type=int)
+    return max(1, min(limit, PAGE_SIZE_MAX)), request.args.get("cursor") or None
+
+
+def keyset_page(query, model, limit: int, cursor: str | None) -> tuple[list, str | None]:
+    """One page of ``query`` plus the cursor for the next page (None on the last one)."""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id),
+        ))
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+# ── Listing queries ───────────────────────────────────────────────────────────
+# Serializers read b.club / b.user / r.club / r.user for every row; load them
+# in the same SELECT so a listing page costs a fixed number of statements.
+
+def with_booking_relations(query):
+    return query.options(joinedload(BookingRequest.club), joinedload(BookingRequest.user))
+
+
+def with_review_relations(query):
+    return query.options(joinedload(ClubReview.club), joinedload(ClubReview.user))
+
+
+_query_counters = threading.local()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    for statements in getattr(_query_counters, "active", ()):
+        statements.append(statement)
+
+
+@contextmanager
+def count_queries():
+    """Collect the SQL statements this thread executes inside the block.
+
+        with count_queries() as statements:
+            client.get("/api/bookings", headers=...)
+        assert len(statements) <= 6
+    """
+    statements = []
+    active = getattr(_query_counters, "active", None)
+    if active is None:
+        active = _query_counters.active = []
+    active.append(statements)
+    try:
+        yield statements
+    finally:
+        active.remove(statements)
+
+
 # ── Auth Routes ───────────────────────────────────────────────────────────────
 
 @app.post("/api/auth/register")
@@ -575,7 +1392,7 @@ def verify_email():
     db.session.commit()
 
     # Auto-login after verification
-    access_token = create_access_token(identity=str(user.id))
+    access_token = issue_access_token(user)
 
     return jsonify({
         "message": "Email успешно подтверждён!",
@@ -636,7 +1453,7 @@ def login():
         if not user.is_verified:
             return jsonify({"message": "Email не подтверждён. Проверьте почту.", "needs_verification": True, "email": user.email}), 403
         # Convert ID to string for best compatibility with JWT serialization
-        access_token = create_access_token(identity=str(user.id))
+        access_token = issue_access_token(user)
         return jsonify({
             "access_token": access_token,
             "user": {
@@ -696,7 +1513,7 @@ def client_login():
     if user and user.check_password(password):
         if not user.is_verified:
             return jsonify({"message": "Email не подтверждён. Проверьте почту."}), 403
-        access_token = create_access_token(identity=str(user.id))
+        access_token = issue_access_token(user)
         return jsonify({
             "access_token": access_token,
             "user": {
@@ -710,73 +1527,62 @@ def client_login():
 
 
 @app.get("/api/public/clubs")
+@conditional_get(PUBLIC_CACHE_CONTROL)
 def public_clubs():
     """Return an aggregated list of clubs with some basic stats based on iCafeCloud API"""
     clubs = Club.query.all()
+    started = time.perf_counter()
+    fetched = fetch_pc_lists_concurrently(clubs)
+    fanout_ms = (time.perf_counter() - started) * 1000
     result = []
-    
+
     for c in clubs:
-        avg_rating, rating_count = get_club_rating_stats(c.id)
-        try:
-            # We fetch simple public stats if API key is valid
-            headers = {"Authorization": f"Bearer {c.api_key.strip()}", "Accept": "application/json"}
-            
-            # Count PCs
-            pc_raw = requests.get(f"{ICAFE_BASE}/cafe/{c.cafe_id}/pcList", headers=headers, timeout=5).json()
-            total_pcs = 0
-            free_pcs = 0
-            if pc_raw.get("code") == 200:
-                data_field = pc_raw.get("data", {})
-                pcs = data_field if isinstance(data_field, list) else data_field.get("pcs", [])
-                total_pcs = len(pcs)
-                for pc in pcs:
-                    if not (pc.get("member_id") or pc.get("status_connect_time_local") or pc.get("member_account")):
-                        s_str = str(pc.get("pc_status", "")).lower()
-                        if s_str not in ("busy", "locked", "ordered", "using", "offline", "off"):
-                            free_pcs += 1
-            
-            result.append({
-                "id": c.id,
-                "name": c.name,
-                "logo": c.club_main_photo_url or c.club_logo_url,
-                "profile_logo": c.club_logo_url,
-                "pcsTotal": total_pcs,
-                "pcsFree": free_pcs,
-                "rating": round(avg_rating, 1),
-                "rating_count": rating_count,
-                "address": c.address or "Адрес не указан",
-                "phone": c.phone or "",
-                "description": c.description or "",
-                "lat": c.lat or 0.0,
-                "lng": c.lng or 0.0,
-                "instagram": c.instagram or "",
-                "working_hours": c.working_hours or "Круглосуточно",
-                "isOpen": True,
-                "pricePerHour": 100
-            })
-        except:
-            # Add anyway as offline/unknown
-            result.append({
-                "id": c.id,
-                "name": c.name,
-                "logo": c.club_main_photo_url or c.club_logo_url,
-                "profile_logo": c.club_logo_url,
-                "pcsTotal": 0,
-                "pcsFree": 0,
-                "rating": round(avg_rating, 1),
-                "rating_count": rating_count,
-                "address": c.address or "Адрес не указан",
-                "phone": c.phone or "",
-                "description": c.description or "",
-                "lat": c.lat or 0.0,
-                "lng": c.lng or 0.0,
-                "instagram": c.instagram or "",
-                "working_hours": c.working_hours or "Круглосуточно",
-                "isOpen": False,
-                "pricePerHour": 0
-            })
-            
-    return jsonify(result)
+        avg_rating, rating_count = get_club_rating_stats(c)
+        fetch = fetched[c.id]
+        has_data = fetch["status"] in ("ok", "snapshot", "stale")
+
+        total_pcs = 0
+        free_pcs = 0
+        if has_data:
+            pcs = fetch["pcs"]
+            total_pcs = len(pcs)
+            for pc in pcs:
+                if not (pc.get("member_id") or pc.get("status_connect_time_local") or pc.get("member_account")):
+                    s_str = str(pc.get("pc_status", "")).lower()
+                    if s_str not in ("busy", "locked", "ordered", "using", "offline", "off"):
+                        free_pcs += 1
+
+        # Slow or failing tenants are still listed, flagged as unknown
+        result.append({
+            "id": c.id,
+            "name": c.name,
+            # Card-sized variants: the list only renders small cards
+            "logo": image_variant_url(c.club_main_photo_url or c.club_logo_url, "card"),
+            "profile_logo": image_variant_url(c.club_logo_url, "thumb"),
+            "pcsTotal": total_pcs,
+            "pcsFree": free_pcs,
+            "pcsStatus": fetch["status"],
+            "stale": fetch["status"] not in ("ok", "snapshot"),
+            "rating": round(avg_rating, 1),
+            "rating_count": rating_count,
+            "address": c.address or "Адрес не указан",
+            "phone": c.phone or "",
+            "description": c.description or "",
+            "lat": c.lat or 0.0,
+            "lng": c.lng or 0.0,
+            "instagram": c.instagram or "",
+            "working_hours": c.working_hours or "Круглосуточно",
+            "isOpen": has_data,
+            "pricePerHour": 100 if has_data else 0
+        })
+
+    # Timings go in a header so the body (and its ETag) stays stable between polls
+    response = jsonify(result)
+    response.headers["Server-Timing"] = ", ".join(
+        [f"fanout;dur={fanout_ms:.1f}"]
+        + [f'club-{club_id};dur={fetch["ms"]};desc="{fetch["status"]}"' for club_id, fetch in fetched.items()]
+    )
+    return response
 
 
 # ── Admin Routes (Clubs Management) ───────────────────────────────────────────
@@ -785,9 +1591,8 @@ def admin_required(fn):
     @wraps(fn)
     @jwt_required()
     def wrapper(*args, **kwargs):
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        if user.role != 'admin':
+        identity = current_identity()
+        if not identity or identity["role"] != 'admin':
             return jsonify({"message": "Admin access required"}), 403
         return fn(*args, **kwargs)
     return wrapper
@@ -808,7 +1613,8 @@ def get_clubs():
         "working_hours": c.working_hours or "",
         "lat": c.lat or 0.0,
         "lng": c.lng or 0.0,
-        "description": c.description or ""
+        "description": c.description or "",
+        "upstream": breaker_summary(c),
     } for c in clubs])
 
 @app.put("/api/admin/clubs/<int:club_id>")
@@ -816,6 +1622,8 @@ def get_clubs():
 def update_club(club_id):
     club = Club.query.get_or_404(club_id)
     data = request.json or {}
+    previous_cafe_id = club.cafe_id
+    upload_refs = club_upload_refs(club)
 
     if "name" in data: club.name = data["name"]
     if "api_key" in data: club.api_key = data["api_key"]
@@ -833,7 +1641,17 @@ def update_club(club_id):
     except:
         pass
 
+    if club.cafe_id != previous_cafe_id:
+        reset_club_revenue(club)
+        reset_club_members(club)
+    apply_upload_ref_changes(upload_refs, club_upload_refs(club))
     db.session.commit()
+    if "api_key" in data or "cafe_id" in data:
+        club_credentials_cache.invalidate(club.id)
+        for cafe_id in {previous_cafe_id, club.cafe_id}:
+            if cafe_id:
+                invalidate_pc_list(cafe_id)
+                icafe_breaker.reset(str(cafe_id))
     return jsonify({"message": "Club updated successfully"})
 
 @app.post("/api/admin/clubs")
@@ -849,12 +1667,53 @@ def add_club():
     db.session.commit()
     return jsonify({"message": "Club added successfully", "id": new_club.id})
 
+@app.get("/api/admin/metrics")
+@admin_required
+def admin_metrics():
+    return jsonify({
+        "caches": {
+            "pc_list": pc_list_cache.stats(),
+            "identity": identity_cache.stats(),
+            "club_credentials": club_credentials_cache.stats(),
+            "member_live_fields": member_live_fields_cache.stats(),
+        },
+        "single_flight": icafe_single_flight.stats(),
+        "revenue_sync": revenue_single_flight.stats(),
+        "revenue_window": revenue_window_cache.stats(),
+    })
+
+@app.post("/api/admin/cache/pc-list/invalidate")
+@admin_required
+def admin_invalidate_pc_list():
+    data = request.json or {}
+    invalidate_pc_list(data.get("cafe_id"))
+    return jsonify({"message": "PC list cache invalidated"})
+
 @app.get("/api/admin/users")
 @admin_required
 def get_all_users():
-    """List all registered users for admin panel."""
-    users = User.query.order_by(User.created_at.desc()).all()
-    return jsonify([{
+    """List registered users for admin panel, newest first.
+
+    ?role=member (club-finder accounts) or ?role=staff (everyone else) and
+    ?search= (username, email or phone contains) filter the list. The body
+    stays a plain array; the next page's cursor comes in X-Next-Cursor.
+    """
+    limit, cursor = page_args(default_limit=200)
+    query = User.query.options(joinedload(User.club))
+    role = request.args.get("role")
+    if role == "member":
+        query = query.filter(User.role == "member")
+    elif role == "staff":
+        query = query.filter(User.role != "member")
+    search = request.args.get("search", "").strip()
+    if search:
+        pattern = f"%{search}%"
+        query = query.filter(or_(User.username.ilike(pattern), User.email.ilike(pattern), User.phone.ilike(pattern)))
+    try:
+        users, next_cursor = keyset_page(query, User, limit, cursor)
+    except ValueError:
+        return jsonify({"message": "Invalid cursor"}), 400
+    response = jsonify([{
         "id": u.id,
         "username": u.username,
         "email": u.email,
@@ -865,6 +1724,9 @@ def get_all_users():
         "club_name": u.club.name if u.club else None,
         "created_at": u.created_at.isoformat() if u.created_at else None
     } for u in users])
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 @app.post("/api/admin/assign-user")
 @admin_required
@@ -880,11 +1742,15 @@ def assign_user():
         user.set_password(password)
         db.session.add(user)
     else:
+        if str(user.club_id or "") != str(club_id or ""):
+            revoke_user_tokens(user)
         user.club_id = club_id
         if password:
             user.set_password(password)
+            revoke_user_tokens(user)
             
     db.session.commit()
+    invalidate_identity(user.id)
     return jsonify({"message": "User assigned/updated successfully"})
 
 @app.put("/api/admin/users/<int:user_id>")
@@ -896,14 +1762,18 @@ def update_user(user_id):
         return jsonify({"message": "Пользователь не найден"}), 404
     
     data = request.json or {}
+    previous_claims = (user.role, user.club_id)
     if "role" in data:
         user.role = data["role"]
     if "club_id" in data:
         user.club_id = data["club_id"] if data["club_id"] else None
+    if (user.role, user.club_id) != previous_claims:
+        revoke_user_tokens(user)
     if "is_verified" in data:
         user.is_verified = data["is_verified"]
     
     db.session.commit()
+    invalidate_identity(user.id)
     return jsonify({"message": "Пользователь обновлён"})
 
 @app.delete("/api/admin/users/<int:user_id>")
@@ -920,29 +1790,34 @@ def delete_user(user_id):
     
     db.session.delete(user)
     db.session.commit()
+    invalidate_identity(user_id)
     return jsonify({"message": "Пользователь удалён"})
 
 
 @app.get("/api/reviews")
 @jwt_required()
+@conditional_get(version=reviews_version)
 def get_reviews_for_dashboard():
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    if not user:
+    identity = current_identity()
+    if not identity:
         return jsonify({"message": "User not found"}), 404
 
-    if user.role == "manager":
-        if not user.club_id:
+    if identity["role"] == "manager":
+        if not identity["club_id"]:
             return jsonify({"reviews": [], "summary": {"count": 0, "average_rating": 0.0}}), 200
-        reviews_query = ClubReview.query.filter_by(club_id=user.club_id)
-    elif user.role == "admin":
+        reviews_query = ClubReview.query.filter_by(club_id=identity["club_id"])
+    elif identity["role"] == "admin":
         club_id = request.args.get("club_id", type=int)
         reviews_query = ClubReview.query.filter_by(club_id=club_id) if club_id else ClubReview.query
     else:
         return jsonify({"message": "Access denied"}), 403
 
-    reviews = reviews_query.order_by(ClubReview.created_at.desc()).limit(300).all()
-    avg_rating = round(sum(r.rating for r in reviews) / len(reviews), 1) if reviews else 0.0
+    limit, cursor = page_args(default_limit=100)
+    try:
+        reviews, next_cursor = keyset_page(with_review_relations(reviews_query), ClubReview, limit, cursor)
+    except ValueError:
+        return jsonify({"message": "Invalid cursor"}), 400
+    total, avg_rating = reviews_query.with_entities(func.count(ClubReview.id), func.avg(ClubReview.rating)).first()
 
     return jsonify({
         "reviews": [{
@@ -956,22 +1831,22 @@ def get_reviews_for_dashboard():
             "created_at": r.created_at.isoformat() + "Z" if r.created_at else None,
         } for r in reviews],
         "summary": {
-            "count": len(reviews),
-            "average_rating": avg_rating
-        }
+            "count": int(total or 0),
+            "average_rating": round(float(avg_rating), 1) if avg_rating is not None else 0.0
+        },
+        "next_cursor": next_cursor,
     })
 
 # ── Config endpoints ──────────────────────────────────────────────────────────
 
-@app.get("/api/config")
-@jwt_required()
-def get_config():
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
+def config_payload() -> dict | None:
+    """Dashboard settings of the user's club; None when no club is assigned."""
+    identity = current_identity()
+    user = db.session.get(User, identity["user_id"]) if identity else None
     if not user or not user.club:
-        return jsonify({"message": "No club assigned"}), 404
+        return None
         
-    return jsonify({
+    return {
         "club_name": user.club.name,
         "club_logo_url": user.club.club_logo_url,
         "club_main_photo_url": user.club.club_main_photo_url or "",
@@ -984,7 +1859,17 @@ def get_config():
         "tariffs": user.club.tariffs or "",
         "internet_speed": user.club.internet_speed or "",
         "configured": True
-    })
+    }
+
+
+@app.get("/api/config")
+@jwt_required()
+@conditional_get()
+def get_config():
+    payload = config_payload()
+    if payload is None:
+        return jsonify({"message": "No club assigned"}), 404
+    return jsonify(payload)
 
 
 @app.post("/api/config")
@@ -996,6 +1881,7 @@ def set_config():
         return jsonify({"message": "No club assigned"}), 404
         
     body = request.get_json(force=True) or {}
+    upload_refs = club_upload_refs(user.club)
     if "club_name" in body:
         user.club.name = body["club_name"].strip()
     if "club_logo_url" in body:
@@ -1015,7 +1901,9 @@ def set_config():
     if "internet_speed" in body:
         user.club.internet_speed = body["internet_speed"].strip()
     
+    apply_upload_ref_changes(upload_refs, club_upload_refs(user.club))
     db.session.commit()
+    invalidate_identity(user.id)
     return jsonify({"ok": True})
 
 
@@ -1031,7 +1919,7 @@ def get_icafe_data():
     tariffs_list = []
 
     # 1. Fetch PCs to extract unique Zones / Area names
-    pc_raw = icafe_get("/pcList")
+    pc_raw = get_club_pc_list(user.club)
     try:
         if pc_raw and pc_raw.get("code") == 200:
             data_field = pc_raw.get("data", {})
@@ -1080,6 +1968,7 @@ def get_icafe_data():
     })
 
 @app.get("/api/public/clubs/<int:club_id>")
+@conditional_get(PUBLIC_CACHE_CONTROL)
 def public_club_detail(club_id):
     """Return specific club details including parsed zones and tariffs"""
     c = Club.query.get(club_id)
@@ -1116,27 +2005,25 @@ def public_club_detail(club_id):
     zone_stats = {} # {"ZoneName": {"total": 0, "free": 0}}
     
     try:
-        if c.api_key:
-            headers = {"Authorization": f"Bearer {c.api_key.strip()}", "Accept": "application/json"}
-            pc_raw = requests.get(f"{ICAFE_BASE}/cafe/{c.cafe_id}/pcList", headers=headers, timeout=5).json()
-            if pc_raw.get("code") == 200:
-                data_field = pc_raw.get("data", {})
-                pcs = data_field if isinstance(data_field, list) else data_field.get("pcs", [])
-                total_pcs = len(pcs)
-                for pc in pcs:
-                    # Find real zone name
-                    z_name = pc.get("pc_area_name") or pc.get("pc_group_name") or "Unknown"
-                    if z_name not in zone_stats:
-                        zone_stats[z_name] = {"total": 0, "free": 0}
-                    
-                    zone_stats[z_name]["total"] += 1
-                    
-                    # Logic for "free" vs "busy"
-                    if not (pc.get("member_id") or pc.get("status_connect_time_local") or pc.get("member_account")):
-                        s_str = str(pc.get("pc_status", "")).lower()
-                        if s_str not in ("busy", "locked", "ordered", "using", "offline", "off"):
-                            free_pcs += 1
-                            zone_stats[z_name]["free"] += 1
+        pc_raw = get_club_pc_list(c, timeout=5)
+        if pc_raw and pc_raw.get("code") == 200:
+            data_field = pc_raw.get("data", {})
+            pcs = data_field if isinstance(data_field, list) else data_field.get("pcs", [])
+            total_pcs = len(pcs)
+            for pc in pcs:
+                # Find real zone name
+                z_name = pc.get("pc_area_name") or pc.get("pc_group_name") or "Unknown"
+                if z_name not in zone_stats:
+                    zone_stats[z_name] = {"total": 0, "free": 0}
+                
+                zone_stats[z_name]["total"] += 1
+                
+                # Logic for "free" vs "busy"
+                if not (pc.get("member_id") or pc.get("status_connect_time_local") or pc.get("member_account")):
+                    s_str = str(pc.get("pc_status", "")).lower()
+                    if s_str not in ("busy", "locked", "ordered", "using", "offline", "off"):
+                        free_pcs += 1
+                        zone_stats[z_name]["free"] += 1
     except:
         pass
         
@@ -1148,7 +2035,7 @@ def public_club_detail(club_id):
         z["capacity"] = str(stats["total"])
         z["pcsFree"] = stats["free"]
 
-    avg_rating, rating_count = get_club_rating_stats(c.id)
+    avg_rating, rating_count = get_club_rating_stats(c)
 
     return jsonify({
         "id": c.id,
@@ -1162,6 +2049,7 @@ def public_club_detail(club_id):
         "working_hours": c.working_hours or "Круглосуточно",
         "rating": round(avg_rating, 1),
         "rating_count": rating_count,
+        "rating_histogram": club_rating_histogram(c),
         "lat": c.lat or 0.0,
         "lng": c.lng or 0.0,
         "isOpen": True,
@@ -1173,6 +2061,7 @@ def public_club_detail(club_id):
 
 
 @app.get("/api/public/clubs/<int:club_id>/zone-pcs")
+@conditional_get("public, max-age=5")
 def public_zone_pcs(club_id):
     club = Club.query.get(club_id)
     if not club:
@@ -1182,7 +2071,7 @@ def public_zone_pcs(club_id):
     if not zone_name:
         return jsonify({"message": "zone_name is required"}), 400
 
-    pc_raw = icafe_get_for_club(club, "/pcList", timeout=8)
+    pc_raw = get_club_pc_list(club)
     pcs = parse_icafe_pcs(pc_raw)
 
     zone_name_folded = zone_name.casefold()
@@ -1218,11 +2107,10 @@ def create_public_booking(club_id):
     if not club:
         return jsonify({"message": "Club not found"}), 404
 
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    if not user:
+    identity = current_identity()
+    if not identity:
         return jsonify({"message": "User not found"}), 404
-    if user.role not in ("client", "member"):
+    if identity["role"] not in ("client", "member"):
         return jsonify({"message": "Only authorized clients can create bookings"}), 403
 
     data = request.json or {}
@@ -1267,7 +2155,7 @@ def create_public_booking(club_id):
         return jsonify({"message": "Maximum 10 PCs per booking"}), 400
 
     active_booking = BookingRequest.query.filter(
-        BookingRequest.user_id == user.id,
+        BookingRequest.user_id == identity["user_id"],
         BookingRequest.status.in_(["pending", "approved", "new"])
     ).order_by(BookingRequest.created_at.desc()).first()
     if active_booking:
@@ -1280,7 +2168,10 @@ def create_public_booking(club_id):
             }
         }), 409
 
-    pc_raw = icafe_get_for_club(club, "/pcList", timeout=8)
+    # Availability check must not rely on a stale snapshot
+    pc_raw = get_club_pc_list(club, allow_stale=False)
+    if is_upstream_failure(pc_raw):
+        return jsonify({"message": "PC availability can't be checked right now, try again shortly"}), 503, {"Retry-After": "30"}
     all_pcs = parse_icafe_pcs(pc_raw)
     pc_map = {}
     for pc in all_pcs:
@@ -1312,7 +2203,7 @@ def create_public_booking(club_id):
 
     booking = BookingRequest(
         club_id=club.id,
-        user_id=user.id,
+        user_id=identity["user_id"],
         client_name=client_name,
         phone=phone,
         zone_name=zone_label,
@@ -1321,7 +2212,9 @@ def create_public_booking(club_id):
         status="pending",
     )
     db.session.add(booking)
+    event = record_booking_event(booking, "created")
     db.session.commit()
+    booking_event_bus.publish()
 
     return jsonify({
         "message": "Booking created",
@@ -1347,15 +2240,21 @@ def create_public_booking(club_id):
 
 @app.get("/api/public/bookings/my")
 @jwt_required()
+@conditional_get(version=bookings_version)
 def get_my_public_bookings():
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    if not user:
+    identity = current_identity()
+    if not identity:
         return jsonify({"message": "User not found"}), 404
-    if user.role not in ("client", "member"):
+    if identity["role"] not in ("client", "member"):
         return jsonify({"message": "Only authorized clients can view bookings"}), 403
 
-    rows = BookingRequest.query.filter_by(user_id=user.id).order_by(BookingRequest.created_at.desc()).limit(300).all()
+    limit, cursor = page_args(default_limit=100)
+    query = BookingRequest.query.filter_by(user_id=identity["user_id"])
+    try:
+        rows, next_cursor = keyset_page(with_booking_relations(query), BookingRequest, limit, cursor)
+    except ValueError:
+        return jsonify({"message": "Invalid cursor"}), 400
+    counts = booking_summary_counts(query)
     payload = []
     for b in rows:
         pc_entries = parse_booking_pc_entries(b.pc_names)
@@ -1382,24 +2281,37 @@ def get_my_public_bookings():
     return jsonify({
         "bookings": payload,
         "summary": {
-            "count": len(payload),
-            "pending_count": sum(1 for b in payload if b["status"] == "pending"),
-        }
+            "count": counts["count"],
+            "pending_count": counts["pending_count"],
+        },
+        "next_cursor": next_cursor,
     })
 
 
+@app.get("/api/public/bookings/stream")
+def stream_my_public_bookings():
+    claims, error = stream_claims_from_request()
+    if error:
+        return error
+    identity = identity_from_claims(claims)
+    if not identity:
+        return jsonify({"message": "User not found"}), 404
+    if identity["role"] not in ("client", "member"):
+        return jsonify({"message": "Only authorized clients can view bookings"}), 403
+    return booking_event_stream([BookingEvent.user_id == identity["user_id"]], last_event_id(), claims)
+
+
 @app.put("/api/public/bookings/<int:booking_id>/cancel")
 @jwt_required()
 def cancel_public_booking(booking_id):
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    if not user:
+    identity = current_identity()
+    if not identity:
         return jsonify({"message": "User not found"}), 404
-    if user.role not in ("client", "member"):
+    if identity["role"] not in ("client", "member"):
         return jsonify({"message": "Only authorized clients can cancel bookings"}), 403
 
     booking = BookingRequest.query.get(booking_id)
-    if not booking or booking.user_id != user.id:
+    if not booking or booking.user_id != identity["user_id"]:
         return jsonify({"message": "Booking not found"}), 404
 
     current_status = normalize_booking_status(booking.status)
@@ -1415,7 +2327,9 @@ def cancel_public_booking(booking_id):
     booking.cancellation_reason = reason
     booking.canceled_by = "client"
     booking.canceled_at = datetime.utcnow()
+    event = record_booking_event(booking, "cancelled")
     db.session.commit()
+    booking_event_bus.publish()
 
     return jsonify({
         "message": "Booking cancelled",
@@ -1431,23 +2345,47 @@ def cancel_public_booking(booking_id):
 
 @app.get("/api/bookings")
 @jwt_required()
+@conditional_get(version=bookings_version)
 def get_bookings_for_dashboard():
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    if not user:
+    identity = current_identity()
+    if not identity:
         return jsonify({"message": "User not found"}), 404
 
-    if user.role == "manager":
-        if not user.club_id:
-            return jsonify({"bookings": [], "summary": {"count": 0, "pending_count": 0, "cancelled_count": 0}}), 200
-        query = BookingRequest.query.filter_by(club_id=user.club_id)
-    elif user.role == "admin":
+    since = request.args.get("since")
+    if since is not None and not since.isdigit():
+        return jsonify({"message": "since must be a cursor returned by a previous call"}), 400
+
+    if identity["role"] == "manager":
+        if not identity["club_id"]:
+            return jsonify({"bookings": [], "summary": {"count": 0, "pending_count": 0, "cancelled_count": 0}, "cursor": 0}), 200
+        query = BookingRequest.query.filter_by(club_id=identity["club_id"])
+        events = BookingEvent.query.filter_by(club_id=identity["club_id"])
+    elif identity["role"] == "admin":
         club_id = request.args.get("club_id", type=int)
         query = BookingRequest.query.filter_by(club_id=club_id) if club_id else BookingRequest.query
+        events = BookingEvent.query.filter_by(club_id=club_id) if club_id else BookingEvent.query
     else:
         return jsonify({"message": "Access denied"}), 403
 
-    bookings = query.order_by(BookingRequest.created_at.desc()).limit(300).all()
+    # The cursor is the booking_events id, read before the rows: anything that
+    # changes afterwards is returned again by the next ?since= call. Ids below
+    # the cursor can still commit late, so a delta re-reads BOOKING_EVENT_OVERLAP
+    # ids below it; the client merges rows by id, so repeats are harmless.
+    cursor = db.session.query(func.max(BookingEvent.id)).scalar() or 0
+    summary = booking_summary_counts(query)
+
+    next_cursor = None
+    if since is not None:
+        changed_ids = events.filter(BookingEvent.id > int(since) - BOOKING_EVENT_OVERLAP) \
+            .with_entities(BookingEvent.booking_id)
+        bookings = with_booking_relations(query).filter(BookingRequest.id.in_(changed_ids)) \
+            .order_by(BookingRequest.created_at.desc()).all()
+    else:
+        limit, page_cursor = page_args(default_limit=100)
+        try:
+            bookings, next_cursor = keyset_page(with_booking_relations(query), BookingRequest, limit, page_cursor)
+        except ValueError:
+            return jsonify({"message": "Invalid cursor"}), 400
 
     payload = []
     for b in bookings:
@@ -1470,34 +2408,64 @@ def get_bookings_for_dashboard():
             "canceled_by": b.canceled_by,
             "canceled_at": b.canceled_at.isoformat() + "Z" if b.canceled_at else None,
             "created_at": b.created_at.isoformat() + "Z" if b.created_at else None,
+            "updated_at": b.updated_at.isoformat() + "Z" if b.updated_at else None,
         })
 
     return jsonify({
         "bookings": payload,
-        "summary": {
-            "count": len(payload),
-            "pending_count": sum(1 for b in payload if b["status"] == "pending"),
-            "cancelled_count": sum(1 for b in payload if b["status"] == "cancelled"),
-        }
+        "summary": summary,
+        "cursor": cursor,
+        "next_cursor": next_cursor,
+        "delta": since is not None,
     })
 
 
+@app.post("/api/bookings/stream/ticket")
+@app.post("/api/public/bookings/stream/ticket")
+@jwt_required()
+def issue_stream_ticket():
+    """Single-purpose ticket for opening a booking stream within SSE_TICKET_TTL seconds."""
+    claims = get_jwt()
+    ticket_claims = {key: claims[key] for key in ("sub", "role", "club_id", "tv") if key in claims}
+    return jsonify({"ticket": stream_ticket_serializer().dumps(ticket_claims), "expires_in": SSE_TICKET_TTL})
+
+
+@app.get("/api/bookings/stream")
+def stream_bookings_for_dashboard():
+    claims, error = stream_claims_from_request()
+    if error:
+        return error
+    identity = identity_from_claims(claims)
+    if not identity:
+        return jsonify({"message": "User not found"}), 404
+
+    if identity["role"] == "manager":
+        if not identity["club_id"]:
+            return jsonify({"message": "No club assigned"}), 404
+        filters = [BookingEvent.club_id == identity["club_id"]]
+    elif identity["role"] == "admin":
+        club_id = request.args.get("club_id", type=int)
+        filters = [BookingEvent.club_id == club_id] if club_id else []
+    else:
+        return jsonify({"message": "Access denied"}), 403
+    return booking_event_stream(filters, last_event_id(), claims)
+
+
 @app.put("/api/bookings/<int:booking_id>/status")
 @jwt_required()
 def update_booking_status(booking_id):
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    if not user:
+    identity = current_identity()
+    if not identity:
         return jsonify({"message": "User not found"}), 404
-    if user.role not in ("manager", "admin"):
+    if identity["role"] not in ("manager", "admin"):
         return jsonify({"message": "Access denied"}), 403
 
     booking = BookingRequest.query.get(booking_id)
     if not booking:
         return jsonify({"message": "Booking not found"}), 404
 
-    if user.role == "manager":
-        if not user.club_id or booking.club_id != user.club_id:
+    if identity["role"] == "manager":
+        if not identity["club_id"] or booking.club_id != identity["club_id"]:
             return jsonify({"message": "Access denied"}), 403
 
     body = request.json or {}
@@ -1509,7 +2477,9 @@ def update_booking_status(booking_id):
         return jsonify({"message": "Cannot change status of cancelled booking"}), 409
 
     booking.status = next_status
+    event = record_booking_event(booking, next_status)
     db.session.commit()
+    booking_event_bus.publish()
 
     pc_entries = parse_booking_pc_entries(booking.pc_names)
     pc_names = booking_display_pc_names(pc_entries)
@@ -1538,19 +2508,18 @@ def update_booking_status(booking_id):
 @app.put("/api/bookings/<int:booking_id>/cancel")
 @jwt_required()
 def cancel_booking_by_manager(booking_id):
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    if not user:
+    identity = current_identity()
+    if not identity:
         return jsonify({"message": "User not found"}), 404
-    if user.role not in ("manager", "admin"):
+    if identity["role"] not in ("manager", "admin"):
         return jsonify({"message": "Access denied"}), 403
 
     booking = BookingRequest.query.get(booking_id)
     if not booking:
         return jsonify({"message": "Booking not found"}), 404
 
-    if user.role == "manager":
-        if not user.club_id or booking.club_id != user.club_id:
+    if identity["role"] == "manager":
+        if not identity["club_id"] or booking.club_id != identity["club_id"]:
             return jsonify({"message": "Access denied"}), 403
 
     current_status = normalize_booking_status(booking.status)
@@ -1564,9 +2533,11 @@ def cancel_booking_by_manager(booking_id):
 
     booking.status = "cancelled"
     booking.cancellation_reason = reason
-    booking.canceled_by = "admin" if user.role == "admin" else "manager"
+    booking.canceled_by = "admin" if identity["role"] == "admin" else "manager"
     booking.canceled_at = datetime.utcnow()
+    event = record_booking_event(booking, "cancelled")
     db.session.commit()
+    booking_event_bus.publish()
 
     return jsonify({
         "message": "Booking cancelled",
@@ -1582,18 +2553,21 @@ def cancel_booking_by_manager(booking_id):
 
 
 @app.get("/api/public/clubs/<int:club_id>/reviews")
+@conditional_get("public, no-cache")
 def public_club_reviews(club_id):
     club = Club.query.get(club_id)
     if not club:
         return jsonify({"message": "Club not found"}), 404
 
-    reviews = ClubReview.query.filter_by(club_id=club_id).order_by(ClubReview.created_at.desc()).limit(100).all()
-    avg_rating, rating_count = get_club_rating_stats(club_id)
+    reviews = ClubReview.query.options(joinedload(ClubReview.user)).filter_by(club_id=club_id) \
+        .order_by(ClubReview.created_at.desc()).limit(100).all()
+    avg_rating, rating_count = get_club_rating_stats(club)
 
     return jsonify({
         "club_id": club_id,
         "average_rating": round(avg_rating, 1),
         "rating_count": rating_count,
+        "rating_histogram": club_rating_histogram(club),
         "reviews": [{
             "id": r.id,
             "user_id": r.user_id,
@@ -1612,12 +2586,11 @@ def create_public_club_review(club_id):
     if not club:
         return jsonify({"message": "Club not found"}), 404
 
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    if not user:
+    identity = current_identity()
+    if not identity:
         return jsonify({"message": "User not found"}), 404
 
-    if user.role not in ("client", "member"):
+    if identity["role"] not in ("client", "member"):
         return jsonify({"message": "Only authorized clients can post reviews"}), 403
 
     data = request.json or {}
@@ -1636,116 +2609,470 @@ def create_public_club_review(club_id):
 
     review = ClubReview(
         club_id=club_id,
-        user_id=user.id,
+        user_id=identity["user_id"],
         rating=rating,
         text=text
     )
     db.session.add(review)
+    # Increment in SQL so concurrent reviews of the same club can't lose updates
+    star_column = getattr(Club, f"rating_star_{rating}")
+    Club.query.filter_by(id=club_id).update({
+        Club.rating_sum: Club.rating_sum + rating,
+        Club.rating_count: Club.rating_count + 1,
+        star_column: star_column + 1,
+    }, synchronize_session=False)
     db.session.commit()
+    db.session.refresh(club)
 
-    avg_rating, rating_count = get_club_rating_stats(club_id)
+    avg_rating, rating_count = get_club_rating_stats(club)
     return jsonify({
         "message": "Review submitted",
         "review": {
             "id": review.id,
             "club_id": review.club_id,
             "user_id": review.user_id,
-            "username": user.username,
+            "username": db.session.query(User.username).filter(User.id == identity["user_id"]).scalar(),
             "rating": review.rating,
             "text": review.text,
             "created_at": review.created_at.isoformat() + "Z" if review.created_at else None,
         },
         "average_rating": round(avg_rating, 1),
         "rating_count": rating_count,
+        "rating_histogram": club_rating_histogram(club),
     }), 201
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-@app.post("/api/upload-logo")
-def upload_logo():
+def upload_files_exist(variants: dict) -> bool:
+    return all(
+        os.path.exists(os.path.join(app.config["UPLOAD_FOLDER"], filename))
+        for files in variants.values() for filename in files.values()
+    )
+
+
+# ── Upload processing queue ───────────────────────────────────────────────────
+# The request only streams the bytes to disk and checks the header; decoding
+# and rendering the variants runs on _upload_pool. Until a variant exists, a GET
+# for it is answered 503 with Retry-After, in whichever worker process; the
+# uploader previews the file from its own copy meanwhile.
+
+UPLOAD_WORKERS = int(os.environ.get("UPLOAD_WORKERS", "2"))
+UPLOAD_RETRY_AFTER = int(os.environ.get("UPLOAD_RETRY_AFTER", "2"))
+
+_upload_pool = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+_upload_jobs = {}  # digest -> Future, jobs queued or running in this process
+_upload_jobs_lock = threading.Lock()
+
+
+def incoming_path(digest: str) -> str:
+    return os.path.join(UPLOAD_INCOMING, f"{digest}.src")
+
+
+def process_upload(digest: str):
+    """Background job: render the variants of incoming/<digest>.src and mark the upload ready."""
+    path = incoming_path(digest)
+    try:
+        with app.app_context():
+            try:
+                with open(path, "rb") as f:
+                    processed = process_image(f.read())
+                write_files(app.config["UPLOAD_FOLDER"], processed["files"])
+                UploadedFile.query.filter_by(digest=digest).update({
+                    "status": "ready",
+                    "fallback_ext": processed["fallback_ext"],
+                    "size": sum(len(content) for content in processed["files"].values()),
+                }, synchronize_session=False)
+            except (ImageError, OSError) as e:
+                print(f"❌ Upload {digest} rejected: {e}")
+                UploadedFile.query.filter_by(digest=digest).update({"status": "failed"}, synchronize_session=False)
+            db.session.commit()
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+        with _upload_jobs_lock:
+            _upload_jobs.pop(digest, None)
+
+
+def queue_upload(digest: str):
+    with _upload_jobs_lock:
+        if digest not in _upload_jobs:
+            _upload_jobs[digest] = _upload_pool.submit(process_upload, digest)
+
+
+def touch_upload(stored: UploadedFile, file_names: dict):
+    """Restart the gc-uploads grace period of a reused upload, which the new
+    response points at but no club may reference yet."""
+    stored.updated_at = datetime.utcnow()
+    db.session.commit()
+    for files in file_names.values():
+        for filename in files.values():
+            os.utime(os.path.join(app.config["UPLOAD_FOLDER"], filename))
+
+
+def save_uploaded_image():
+    """Receive request.files["file"] and queue it for the image pipeline (see images.py).
+
+    200 when the same image was processed before, 202 while its variants are
+    being rendered; the URLs are final either way.
+    """
     if "file" not in request.files:
         return jsonify({"error": "No file part"}), 400
     file = request.files["file"]
     if file.filename == "":
         return jsonify({"error": "No selected file"}), 400
-    if file and allowed_file(file.filename):
-        filename = "logo_" + secure_filename(file.filename)
-        filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-        file.save(filepath)
-        # Return the URL to access this file
-        return jsonify({"url": f"/api/uploads/{filename}"})
-    return jsonify({"error": "File type not allowed"}), 400
+    if not allowed_file(file.filename):
+        return jsonify({"error": "File type not allowed"}), 400
+
+    # Judge the content, not the extension, before anything is written
+    head = file.stream.read(SNIFF_BYTES)
+    file.stream.seek(0)
+    if not sniff_format(head):
+        return jsonify({"error": "File type not allowed"}), 400
+
+    try:
+        digest, path, _ = receive_stream(file.stream, UPLOAD_INCOMING, ".src", UPLOAD_MAX_BYTES)
+    except UploadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+
+    stored = db.session.get(UploadedFile, digest)
+    if stored and stored.status == "ready" and upload_files_exist(variant_files(digest, stored.fallback_ext)):
+        # Same bytes uploaded before: reuse its files, nothing to decode
+        os.remove(path)
+        file_names, status_code = variant_files(digest, stored.fallback_ext), 200
+        touch_upload(stored, file_names)
+    else:
+        try:
+            probe = probe_image(path)
+        except ImageError as e:
+            os.remove(path)
+            return jsonify({"error": str(e)}), 400
+        if stored:
+            stored.status = "processing"
+            stored.fallback_ext = probe["fallback_ext"]
+        else:
+            db.session.add(UploadedFile(digest=digest, fallback_ext=probe["fallback_ext"], status="processing"))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # the same image uploaded concurrently
+        queue_upload(digest)
+        file_names, status_code = variant_files(digest, probe["fallback_ext"]), 202
+
+    variants = {
+        name: {fmt: f"/api/uploads/{filename}" for fmt, filename in files.items()}
+        for name, files in file_names.items()
+    }
+    # "url" (stored on the club) is the hero; image_variant_url() derives the smaller ones
+    return jsonify({"url": variants["hero"]["webp"], "variants": variants}), status_code
+
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"error": f"File is larger than {round(UPLOAD_MAX_BYTES / 2**20, 1):g} MB"}), 413
+
+
+@app.post("/api/upload-logo")
+def upload_logo():
+    return save_uploaded_image()
 
 
 @app.post("/api/upload-club-photo")
 @jwt_required()
 def upload_club_photo():
-    if "file" not in request.files:
-        return jsonify({"error": "No file part"}), 400
-    file = request.files["file"]
-    if file.filename == "":
-        return jsonify({"error": "No selected file"}), 400
-    if file and allowed_file(file.filename):
-        filename = "club_photo_" + secure_filename(file.filename)
-        filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-        file.save(filepath)
-        return jsonify({"url": f"/api/uploads/{filename}"})
-    return jsonify({"error": "File type not allowed"}), 400
+    return save_uploaded_image()
+
+
+UPLOAD_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
 
 @app.get("/api/uploads/<filename>")
 def uploaded_file(filename):
-    return send_from_directory(app.config["UPLOAD_FOLDER"], filename)
+    parsed = parse_filename(filename)
+    if not parsed:
+        # Legacy names (logo_<original>.png) can be overwritten: revalidate every time
+        return send_from_directory(app.config["UPLOAD_FOLDER"], filename)
+
+    if not os.path.exists(os.path.join(app.config["UPLOAD_FOLDER"], filename)):
+        if db.session.query(UploadedFile.status).filter_by(digest=parsed["digest"]).scalar() == "processing":
+            # Still being rendered (by this or another worker process). Only
+            # the stripped, re-encoded variant is ever served, never incoming/.
+            response = jsonify({"error": "Image is still being processed"})
+            response.status_code = 503
+            response.headers["Retry-After"] = str(UPLOAD_RETRY_AFTER)
+            response.headers["Cache-Control"] = "no-store"
+            return response
+
+    # Content-addressed: the name changes whenever the bytes do, so the file is
+    # cacheable forever. conditional=True answers If-None-Match and Range.
+    response = send_from_directory(
+        app.config["UPLOAD_FOLDER"], filename,
+        conditional=True,
+        etag=f"{parsed['digest']}-{parsed['variant']}-{parsed['ext']}",
+        max_age=31536000,
+    )
+    response.headers["Cache-Control"] = UPLOAD_CACHE_CONTROL
+    return response
+
+
+# ── Upload references ─────────────────────────────────────────────────────────
+# uploaded_files.ref_count counts the club fields (club_logo_url,
+# club_main_photo_url, club_photos entries) pointing at an upload. Routes that
+# edit those fields apply the difference before committing; `flask gc-uploads`
+# recounts from scratch and deletes files nothing points at.
+
+UPLOAD_GC_GRACE_HOURS = float(os.environ.get("UPLOAD_GC_GRACE_HOURS", "24"))
+
+
+def club_image_urls(club: Club) -> list[str]:
+    urls = [club.club_logo_url, club.club_main_photo_url]
+    try:
+        photos = json.loads(club.club_photos or "[]")
+    except ValueError:
+        photos = []
+    if isinstance(photos, list):
+        urls += [p.get("url") if isinstance(p, dict) else p for p in photos]
+    return [u for u in urls if isinstance(u, str) and u]
+
+
+def club_upload_refs(club: Club) -> Counter:
+    return Counter(d for d in map(url_digest, club_image_urls(club)) if d)
+
+
+def apply_upload_ref_changes(before: Counter, after: Counter):
+    """Adjust ref counts by the difference between two club_upload_refs() results."""
+    for digest in set(before) | set(after):
+        delta = after[digest] - before[digest]
+        if delta:
+            new_count = UploadedFile.ref_count + delta
+            UploadedFile.query.filter_by(digest=digest).update(
+                {"ref_count": case((new_count < 0, 0), else_=new_count)},
+                synchronize_session=False,
+            )
+
+
+def rebuild_upload_refs() -> Counter:
+    """Recount every upload's references from the clubs table."""
+    counts = Counter()
+    for club in Club.query.all():
+        counts.update(club_upload_refs(club))
+    UploadedFile.query.update({"ref_count": 0}, synchronize_session=False)
+    for digest, count in counts.items():
+        UploadedFile.query.filter_by(digest=digest).update({"ref_count": count}, synchronize_session=False)
+    db.session.commit()
+    return counts
+
+
+@app.cli.command("gc-uploads")
+@click.option("--grace-hours", type=float, default=UPLOAD_GC_GRACE_HOURS, show_default=True,
+              help="Keep unreferenced uploads (re-)uploaded less than this long ago (they may be about to be saved).")
+@click.option("--dry-run", is_flag=True, help="Only list what would be deleted.")
+def gc_uploads_command(grace_hours, dry_run):
+    """Recount upload references and delete unreferenced image files."""
+    # Jobs lost to a restart: render them now, or give up if the original is gone
+    stalled = UploadedFile.query.filter(
+        UploadedFile.status == "processing",
+        UploadedFile.updated_at < datetime.utcnow() - timedelta(minutes=10),
+    ).all()
+    for upload in stalled:
+        if os.path.exists(incoming_path(upload.digest)):
+            process_upload(upload.digest)
+        else:
+            upload.status = "failed"
+    db.session.commit()
+
+    counts = rebuild_upload_refs()
+    cutoff = time.time() - grace_hours * 3600
+    folder = app.config["UPLOAD_FOLDER"]
+    removed, freed = 0, 0
+    for filename in sorted(os.listdir(folder)):
+        parsed = parse_filename(filename)
+        path = os.path.join(folder, filename)
+        if not parsed or counts[parsed["digest"]] or os.path.getmtime(path) > cutoff:
+            continue
+        removed += 1
+        freed += os.path.getsize(path)
+        if not dry_run:
+            os.remove(path)
+    if not dry_run:
+        UploadedFile.query.filter(
+            UploadedFile.ref_count == 0,
+            UploadedFile.updated_at < datetime.utcnow() - timedelta(hours=grace_hours),
+        ).delete(synchronize_session=False)
+        db.session.commit()
+    print(f"{'Would remove' if dry_run else '🧹 Removed'} {removed} files ({freed // 1024} KiB)")
 
 
 # ── Overview / Stats ──────────────────────────────────────────────────────────
 
-@app.get("/api/overview")
-@jwt_required()
-def overview():
+# ── Revenue store ─────────────────────────────────────────────────────────────
+# reportChart history is immutable apart from the last few days, so it is
+# fetched once (REVENUE_BACKFILL_DAYS) into club_daily_revenue and afterwards
+# only today plus REVENUE_LATE_WINDOW_DAYS are re-fetched, at most every
+# REVENUE_REFRESH_INTERVAL seconds.
+#
+# The overview and the four charts all view the same history (7 days, 30 days,
+# 7 months), so the widest window is read once per club and interval into
+# revenue_window_cache and each endpoint slices it in-process.
+
+REVENUE_BACKFILL_DAYS = int(os.environ.get("REVENUE_BACKFILL_DAYS", "210"))
+REVENUE_LATE_WINDOW_DAYS = int(os.environ.get("REVENUE_LATE_WINDOW_DAYS", "1"))
+REVENUE_REFRESH_INTERVAL = float(os.environ.get("REVENUE_REFRESH_INTERVAL", "60"))
+
+revenue_single_flight = SingleFlight("revenue_sync")
+revenue_window_cache = TTLCache("revenue_window", ttl=REVENUE_REFRESH_INTERVAL)
+
+
+def store_revenue_report(club_id: int, start: date, end: date, raw: dict):
+    """Replace the club's rows in [start, end] with a reportChart response."""
+    data = raw.get("data") or {}
+    categories = data.get("categories", [])
+    amounts = {}
+    for s in data.get("series", []):
+        name = (s.get("name") or "Unknown")[:100]
+        values = s.get("data", [])
+        for i, cat in enumerate(categories):
+            try:
+                day = date.fromisoformat(str(cat)[:10])
+            except ValueError:
+                continue
+            value = float(values[i] or 0) if i < len(values) else 0.0
+            amounts[(day, name)] = amounts.get((day, name), 0.0) + value
+
+    ClubDailyRevenue.query.filter(
+        ClubDailyRevenue.club_id == club_id,
+        ClubDailyRevenue.day >= start,
+        ClubDailyRevenue.day <= end,
+    ).delete(synchronize_session=False)
+    db.session.add_all([
+        ClubDailyRevenue(club_id=club_id, day=day, series=name, amount=amount)
+        for (day, name), amount in amounts.items()
+    ])
+
+
+def _refresh_club_revenue(club_id: int) -> bool:
+    club = db.session.get(Club, club_id)
     today = date.today()
-    week_ago = today - timedelta(days=6)
+    if club.revenue_synced_through:
+        # Also covers days missed while nobody opened the dashboard
+        start = min(today, club.revenue_synced_through) - timedelta(days=REVENUE_LATE_WINDOW_DAYS)
+    else:
+        start = today - timedelta(days=REVENUE_BACKFILL_DAYS)
 
-    # Combined report for revenue calculation
-    chart_data = icafe_get("/reports/reportChart", {
-        "date_start": week_ago.isoformat(),
+    raw = icafe_get_raw(club.api_key, club.cafe_id, "/reports/reportChart", {
+        "date_start": start.isoformat(),
         "date_end": today.isoformat(),
         "data_source": "recent"
-    })
+    }, timeout=15)
+    if not raw or raw.get("code") != 200:
+        return club.revenue_synced_through is not None
+
+    try:
+        store_revenue_report(club.id, start, today, raw)
+        club.revenue_synced_through = today
+        club.revenue_refreshed_at = datetime.utcnow()
+        db.session.commit()
+    except Exception as e:
+        # Typically another worker storing the same window at the same moment
+        db.session.rollback()
+        print(f"Revenue store update failed for club {club_id}: {e}")
+    return db.session.get(Club, club_id).revenue_synced_through is not None
+
+
+def sync_club_revenue(club: Club | None) -> bool:
+    """Bring the club's club_daily_revenue rows up to date; False when nothing is stored."""
+    if not club:
+        return False
+    fresh = (
+        club.revenue_refreshed_at
+        and (datetime.utcnow() - club.revenue_refreshed_at).total_seconds() < REVENUE_REFRESH_INTERVAL
+    )
+    if fresh or not club.api_key or not club.cafe_id:
+        return club.revenue_synced_through is not None
+    return revenue_single_flight.do(club.id, lambda: _refresh_club_revenue(club.id))
+
+
+def reset_club_revenue(club: Club):
+    """Forget stored revenue, e.g. after the club was pointed at another cafe."""
+    ClubDailyRevenue.query.filter_by(club_id=club.id).delete(synchronize_session=False)
+    club.revenue_synced_through = None
+    club.revenue_refreshed_at = None
+    revenue_window_cache.invalidate(club.id)
+
+
+def load_revenue_window(club: Club) -> dict | None:
+    """Sync the club, then read its last REVENUE_BACKFILL_DAYS as {day: {series: amount}}."""
+    if not sync_club_revenue(club):
+        return None
+    today = date.today()
+    rows = ClubDailyRevenue.query.filter(
+        ClubDailyRevenue.club_id == club.id,
+        ClubDailyRevenue.day >= today - timedelta(days=REVENUE_BACKFILL_DAYS),
+        ClubDailyRevenue.day <= today,
+    ).with_entities(ClubDailyRevenue.day, ClubDailyRevenue.series, ClubDailyRevenue.amount).all()
+
+    days = {}
+    for day, series, amount in rows:
+        days.setdefault(day, {})[series] = float(amount or 0)
+    return {"end": today, "days": days}
+
+
+def club_revenue_window(club: Club | None) -> dict | None:
+    """Shared revenue window for the dashboard widgets; None when nothing is stored."""
+    if not club:
+        return None
+    # Widgets of one batched dashboard request miss together: load the window once
+    loader = lambda: revenue_single_flight.do(("window", club.id), lambda: load_revenue_window(club))
+    window = revenue_window_cache.get(club.id, loader)
+    if window and window["end"] != date.today():
+        # Cached before midnight: today's bucket is not in it yet
+        revenue_window_cache.invalidate(club.id)
+        window = revenue_window_cache.get(club.id, loader)
+    return window
+
+
+def date_range(start: date, end: date) -> list[date]:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def revenue_by_series(window: dict, start: date, end: date) -> list[tuple[str, float]]:
+    totals = {}
+    for day in date_range(start, end):
+        for name, amount in window["days"].get(day, {}).items():
+            totals[name] = totals.get(name, 0.0) + amount
+    return sorted(totals.items())
+
+
+def revenue_by_day(window: dict, start: date, end: date) -> dict:
+    return {day: sum(window["days"].get(day, {}).values()) for day in date_range(start, end)}
+
+
+def overview_payload() -> dict:
+    today = date.today()
+    week_ago = today - timedelta(days=6)
+    club = current_user_club()
 
     today_revenue = 0
     week_revenue = 0
     payment_methods = []
 
+    # Revenue from the local store
+    window = club_revenue_window(club)
+
     # PC list for active count
-    pc_data = icafe_get("/pcList")
+    pc_data = get_club_pc_list(club)
 
-    # Member count
-    member_data = icafe_get("/members", {"page": 1})
+    # Member count: local when the mirror is fresh
+    local_member_count = club_member_count(club)
+    member_data = icafe_get("/members", {"page": 1}) if local_member_count is None else None
 
-    if chart_data and chart_data.get("code") == 200:
-        data = chart_data.get("data", {})
-        series = data.get("series", [])
-        categories = data.get("categories", [])
-        
-        # Today is the last category
-        if categories:
-            today_idx = len(categories) - 1
-            for s in series:
-                s_vals = s.get("data", [])
-                if today_idx < len(s_vals):
-                    today_revenue += float(s_vals[today_idx] or 0)
-                
-                # Week total
-                week_revenue += sum(float(v or 0) for v in s_vals)
-                
-                # Build mock payment method list for UI breakdown
-                m_name = s.get("name", "Unknown")
-                m_total = sum(float(v or 0) for v in s_vals)
-                if m_total > 0:
-                    payment_methods.append({"name": m_name, "amount": m_total})
+    if window:
+        today_revenue = revenue_by_day(window, today, today)[today]
+        for m_name, m_total in revenue_by_series(window, week_ago, today):
+            week_revenue += m_total
+            if m_total > 0:
+                payment_methods.append({"name": m_name, "amount": m_total})
 
     # Active vs total PCs
     active_pcs = 0
@@ -1772,12 +3099,12 @@ def overview():
                     active_pcs += 1
 
     # Member count
-    total_members = 0
+    total_members = local_member_count or 0
     if member_data and member_data.get("code") == 200:
         total_members = member_data.get("data", {}).get("paging_info", {}).get("total_records", 0)
 
     print(f"DEBUG: Active={active_pcs}, Total={total_pcs}, Today={today_revenue}")
-    return jsonify({
+    return {
         "today_revenue": today_revenue,
         "week_revenue": week_revenue,
         "total_members": total_members,
@@ -1786,126 +3113,101 @@ def overview():
         "pc_load_percent": round(active_pcs / total_pcs * 100) if total_pcs else 0,
         "payment_methods": payment_methods,
         # Check if we actually got ANY data back from iCafeCloud recently
-        "api_connected": any([chart_data, pc_data, member_data]),
-    })
+        "api_connected": any([window, pc_data, member_data, local_member_count is not None]),
+    }
+
+
+@app.get("/api/overview")
+@jwt_required()
+@conditional_get()
+def overview():
+    return jsonify(overview_payload())
 
 
 # ── Daily income chart (last 7 days) ─────────────────────────────────────────
 
-@app.get("/api/charts/daily")
-@jwt_required()
-def daily_chart():
+def daily_chart_payload() -> dict:
     today = date.today()
-    result = icafe_get("/reports/reportChart", {
-        "date_start": (today - timedelta(days=6)).isoformat(),
-        "date_end": today.isoformat(),
-        "data_source": "recent"
-    })
-    
+    start = today - timedelta(days=6)
+    club = current_user_club()
+
     days = []
     total = 0
     ru_days = ["пн", "вт", "ср", "чт", "пт", "сб", "вс"]
-    
-    if result and result.get("code") == 200:
-        data = result.get("data", {})
-        categories = data.get("categories", [])
-        series = data.get("series", [])
-        
-        # Aggregate totals across all payment series (Cash, Credit card, etc.)
-        daily_totals = [0.0] * len(categories)
-        for s in series:
-            s_data = s.get("data", [])
-            for i in range(min(len(daily_totals), len(s_data))):
-                daily_totals[i] += float(s_data[i] or 0)
-        
-        for i, cat in enumerate(categories):
-            try:
-                dt = datetime.fromisoformat(cat)
-                days.append({
-                    "day": ru_days[dt.weekday()],
-                    "date": cat,
-                    "value": daily_totals[i]
-                })
-                total += daily_totals[i]
-            except:
-                continue
 
-    return jsonify({"days": days, "total": total})
+    window = club_revenue_window(club)
+    if window:
+        # Totals across all payment series (Cash, Credit card, etc.)
+        for day, value in revenue_by_day(window, start, today).items():
+            days.append({
+                "day": ru_days[day.weekday()],
+                "date": day.isoformat(),
+                "value": value
+            })
+            total += value
 
+    return {"days": days, "total": total}
 
-# ── 30-day income chart (cash vs balance) ────────────────────────────────────
 
-@app.get("/api/charts/monthly")
+@app.get("/api/charts/daily")
 @jwt_required()
-def monthly_chart():
+def daily_chart():
+    return jsonify(daily_chart_payload())
+
+
+# ── 30-day income chart (cash vs balance) ────────────────────────────────────
+
+def monthly_chart_payload() -> dict:
     today = date.today()
-    result = icafe_get("/reports/reportChart", {
-        "date_start": (today - timedelta(days=29)).isoformat(),
-        "date_end": today.isoformat(),
-        "data_source": "recent"
-    })
+    start = today - timedelta(days=29)
+    club = current_user_club()
 
     points = []
     total_cash = 0
     total_balance = 0
 
-    if result and result.get("code") == 200:
-        data = result.get("data", {})
-        categories = data.get("categories", [])
-        series = data.get("series", [])
-        
-        cash_data = []
-        balance_data = []
-        for s in series:
-            s_name = s.get("name", "").lower()
-            if s_name == "cash":
-                cash_data = s.get("data", [])
-            elif "balance" in s_name or "coin" in s_name:
-                # Merge non-cash income into balance for simplicity in this chart
-                if not balance_data:
-                    balance_data = [float(v or 0) for v in s.get("data", [])]
-                else:
-                    s_vals = s.get("data", [])
-                    for i in range(min(len(balance_data), len(s_vals))):
-                        balance_data[i] += float(s_vals[i] or 0)
-
-        for i, cat in enumerate(categories):
-            c = float(cash_data[i] or 0) if i < len(cash_data) else 0
-            b = float(balance_data[i] or 0) if i < len(balance_data) else 0
+    window = club_revenue_window(club)
+    if window:
+        for day in date_range(start, today):
+            c = b = 0.0
+            for s_name, amount in window["days"].get(day, {}).items():
+                s_name = s_name.lower()
+                if s_name == "cash":
+                    c += amount
+                elif "balance" in s_name or "coin" in s_name:
+                    # Merge non-cash income into balance for simplicity in this chart
+                    b += amount
             total_cash += c
             total_balance += b
-            points.append({"date": cat, "cash": c, "balance": b})
+            points.append({"date": day.isoformat(), "cash": c, "balance": b})
 
-    return jsonify({
+    return {
         "points": points,
         "total_cash": total_cash,
         "total_balance": total_balance,
-    })
+    }
+
+
+@app.get("/api/charts/monthly")
+@jwt_required()
+def monthly_chart():
+    return jsonify(monthly_chart_payload())
 
 
 # ── Payment methods breakdown (last 7 days) ───────────────────────────────────
 
-@app.get("/api/charts/payments")
-@jwt_required()
-def payment_methods_chart():
+def payment_methods_payload() -> dict:
     today = date.today()
-    result = icafe_get("/reports/reportChart", {
-        "date_start": (today - timedelta(days=6)).isoformat(),
-        "date_end": today.isoformat(),
-        "data_source": "recent"
-    })
+    club = current_user_club()
 
     methods = []
-    if result and result.get("code") == 200:
-        data = result.get("data", {})
-        series = data.get("series", [])
-        
+    window = club_revenue_window(club)
+    if window:
         # Aggregate totals for each series
         totals = {}
         grand_total = 0
         
-        for s in series:
-            s_name = s.get("name", "Unknown")
+        for s_name, s_sum in revenue_by_series(window, today - timedelta(days=6), today):
             # Translate common names to RU for better UI
             label = s_name
             if s_name.lower() == "cash": label = "Наличные"
@@ -1914,7 +3216,6 @@ def payment_methods_chart():
             elif "qr" in s_name.lower(): label = "QR-код"
             elif "coin" in s_name.lower(): label = "Монеты"
             
-            s_sum = sum(float(v or 0) for v in s.get("data", []))
             if s_sum > 0:
                 totals[label] = totals.get(label, 0) + s_sum
                 grand_total += s_sum
@@ -1931,22 +3232,22 @@ def payment_methods_chart():
         # Sort by amount descending
         methods.sort(key=lambda x: x["amount"], reverse=True)
 
-    return jsonify({"methods": methods})
+    return {"methods": methods}
+
+
+@app.get("/api/charts/payments")
+@jwt_required()
+def payment_methods_chart():
+    return jsonify(payment_methods_payload())
 
 
 # ── Monthly aggregated income (last 7 months) ─────────────────────────────────
 
-@app.get("/api/charts/income-monthly")
-@jwt_required()
-def income_monthly_chart():
+def income_monthly_payload() -> dict:
     today = date.today()
     # Go back roughly 7 months (approx 210 days to be safe and cover full months)
     start_date = (today - timedelta(days=210))
-    result = icafe_get("/reports/reportChart", {
-        "date_start": start_date.isoformat(),
-        "date_end": today.isoformat(),
-        "data_source": "recent"
-    })
+    club = current_user_club()
 
     months_data = {}
     ru_months = {
@@ -1954,22 +3255,12 @@ def income_monthly_chart():
         7: "Июл", 8: "Авг", 9: "Сен", 10: "Окт", 11: "Ноя", 12: "Дек"
     }
 
-    if result and result.get("code") == 200:
-        data = result.get("data", {})
-        categories = data.get("categories", [])
-        series = data.get("series", [])
-        
-        # Aggregate daily data into monthly buckets
-        for s in series:
-            s_data = s.get("data", [])
-            for i, val in enumerate(s_data):
-                if i >= len(categories): break
-                try:
-                    dt = datetime.fromisoformat(categories[i])
-                    month_key = dt.strftime("%Y-%m")
-                    months_data[month_key] = months_data.get(month_key, 0) + float(val or 0)
-                except:
-                    continue
+    window = club_revenue_window(club)
+    if window:
+        # Aggregate daily totals into monthly buckets
+        for day, value in revenue_by_day(window, start_date, today).items():
+            month_key = day.strftime("%Y-%m")
+            months_data[month_key] = months_data.get(month_key, 0) + value
 
     # Convert to sorted list and format for UI
     sorted_keys = sorted(months_data.keys(), reverse=True)[:7] # Take last 7 months
@@ -1983,15 +3274,19 @@ def income_monthly_chart():
             "amount": round(months_data[key], 2)
         })
 
-    return jsonify({"data": output})
+    return {"data": output}
+
+
+@app.get("/api/charts/income-monthly")
+@jwt_required()
+def income_monthly_chart():
+    return jsonify(income_monthly_payload())
 
 
 # ── PCs monitoring ────────────────────────────────────────────────────────────
 
-@app.get("/api/pcs")
-@jwt_required()
-def get_pcs():
-    result = icafe_get("/pcList")
+def pcs_payload() -> dict:
+    result = get_club_pc_list(current_user_club())
     pcs = []
     if result and result.get("code") == 200:
         raw_pcs = []
@@ -2024,19 +3319,256 @@ def get_pcs():
                 "left": pc.get("pc_box_left", 0),
             })
 
-    return jsonify({"pcs": pcs, "total": len(pcs)})
+    return {"pcs": pcs, "total": len(pcs)}
 
 
-# ── Members ───────────────────────────────────────────────────────────────────
-
-@app.get("/api/members")
+@app.get("/api/pcs")
 @jwt_required()
-def get_members():
-    page = request.args.get("page", 1, type=int)
-    search = request.args.get("search", "")
-    sort_field = request.args.get("sort_field", "member_create")
-    sort_dir = request.args.get("sort_dir", "desc")
+@conditional_get()
+def get_pcs():
+    return jsonify(pcs_payload())
+
+
+# ── Member mirror ─────────────────────────────────────────────────────────────
+# club_members mirrors each club's iCafeCloud /members so browsing, searching
+# and counting members are local queries. poller.py (or `flask sync-members`)
+# keeps it current: an incremental pass walks /members newest-first and stops
+# at the newest member already stored; a periodic full pass refreshes balances
+# and drops deleted members. The mirror answers while its last pass of either
+# kind is within MEMBER_MIRROR_MAX_AGE, otherwise the endpoints fall back to
+# proxying iCafeCloud. Balance, points and online/active flags change between
+# full passes, so on a locally served member page they are taken from the live
+# /members page with the same query (cached for MEMBER_LIVE_FIELDS_TTL), or
+# from the mirror when iCafeCloud can't answer.
+
+MEMBER_SYNC_INTERVAL = float(os.environ.get("MEMBER_SYNC_INTERVAL", "300"))
+MEMBER_FULL_SYNC_INTERVAL = float(os.environ.get("MEMBER_FULL_SYNC_INTERVAL", "21600"))
+MEMBER_MIRROR_MAX_AGE = float(os.environ.get("MEMBER_MIRROR_MAX_AGE", "900"))
+MEMBER_LIVE_FIELDS_TTL = float(os.environ.get("MEMBER_LIVE_FIELDS_TTL", "30"))
+MEMBER_SYNC_MAX_PAGES = int(os.environ.get("MEMBER_SYNC_MAX_PAGES", "1000"))
+MEMBERS_PAGE_SIZE = int(os.environ.get("MEMBERS_PAGE_SIZE", "20"))
+
+MEMBER_SORT_COLUMNS = {
+    "member_create": ClubMember.created,
+    "member_account": ClubMember.account_key,
+    "member_first_name": ClubMember.name_key,
+    "member_balance": ClubMember.balance,
+    "member_balance_bonus": ClubMember.balance_bonus,
+    "member_points": ClubMember.points,
+    "member_group_name": ClubMember.group_name,
+    "member_expire_time": ClubMember.expire,
+}
+MEMBER_LIVE_FIELDS = ("balance", "balance_bonus", "points", "is_active", "is_logined")
+
+member_live_fields_cache = TTLCache("member_live_fields", ttl=MEMBER_LIVE_FIELDS_TTL)
+
+
+def member_from_icafe(m: dict) -> dict:
+    return {
+        "id": m.get("member_icafe_id"),
+        "account": m.get("member_account", ""),
+        "name": f"{m.get('member_first_name', '')} {m.get('member_last_name', '')}".strip(),
+        "balance": float(m.get("member_balance", 0)),
+        "balance_bonus": float(m.get("member_balance_bonus", 0)),
+        "points": float(m.get("member_points", 0)),
+        "group": m.get("member_group_name", ""),
+        "is_active": bool(m.get("member_is_active")),
+        "is_logined": bool(m.get("member_is_logined")),
+        "expire": m.get("member_expire_time_local", ""),
+        "created": m.get("member_create_local", m.get("member_create", "")),
+    }
+
+
+def member_json(row: ClubMember) -> dict:
+    return {
+        "id": row.member_id,
+        "account": row.account,
+        "name": row.name,
+        "balance": row.balance,
+        "balance_bonus": row.balance_bonus,
+        "points": row.points,
+        "group": row.group_name,
+        "is_active": row.is_active,
+        "is_logined": row.is_logined,
+        "expire": row.expire,
+        "created": row.created,
+    }
+
+
+def _store_member_page(club_id: int, members: list[dict], now: datetime) -> set:
+    """Upsert one /members page; returns the member ids it contained."""
+    parsed = {m["id"]: m for m in map(member_from_icafe, members) if m["id"]}
+    existing = {
+        row.member_id: row for row in
+        ClubMember.query.filter(ClubMember.club_id == club_id, ClubMember.member_id.in_(list(parsed)))
+    } if parsed else {}
+    for member_id, m in parsed.items():
+        row = existing.get(member_id)
+        if not row:
+            row = ClubMember(club_id=club_id, member_id=member_id)
+            db.session.add(row)
+        row.account = (m["account"] or "")[:100]
+        row.name = (m["name"] or "")[:200]
+        row.account_key = row.account.lower()
+        row.name_key = row.name.lower()
+        row.balance = m["balance"]
+        row.balance_bonus = m["balance_bonus"]
+        row.points = m["points"]
+        row.group_name = (m["group"] or "")[:100]
+        row.is_active = m["is_active"]
+        row.is_logined = m["is_logined"]
+        row.expire = str(m["expire"] or "")[:30]
+        row.created = str(m["created"] or "")[:30]
+        row.synced_at = now
+    return set(parsed)
+
+
+def sync_club_members(club_id: int, full: bool = False) -> dict:
+    """Mirror a club's members; one commit per upstream page.
+
+    Returns {"pages", "members", "removed", "ok"}. Partial progress is kept
+    when a page fails or the walk hits MEMBER_SYNC_MAX_PAGES; the club's sync
+    timestamps only move when the walk got to its end.
+    """
+    club = db.session.get(Club, club_id)
+    stats = {"pages": 0, "members": 0, "removed": 0, "ok": False}
+    if not club or not club.api_key or not club.cafe_id:
+        return stats
+
+    started = datetime.utcnow()
+    newest_stored = None if full else db.session.query(func.max(ClubMember.created)) \
+        .filter(ClubMember.club_id == club_id).scalar()
+    reached_end = False
+    page = 1
+    while page <= MEMBER_SYNC_MAX_PAGES:
+        raw = icafe_get_raw(club.api_key, club.cafe_id, "/members", {
+            "page": page,
+            "sort_field": "member_create",
+            "sort_dir": "desc",
+        }, timeout=15)
+        if not raw or raw.get("code") != 200:
+            print(f"  [!] Member sync for club {club_id} stopped at page {page}")
+            return stats
+        data = raw.get("data") or {}
+        members = data.get("members", [])
+        _store_member_page(club_id, members, started)
+        db.session.commit()
+        stats["pages"] += 1
+        stats["members"] += len(members)
+
+        pages = int((data.get("paging_info") or {}).get("pages") or 1)
+        oldest_on_page = min((str(m.get("member_create_local", m.get("member_create", "")) or "") for m in members), default="")
+        if not members or page >= pages or (newest_stored and oldest_on_page <= newest_stored):
+            reached_end = True
+            break
+        page += 1
+
+    if not reached_end:
+        # Members past the cap were neither stored nor seen: the mirror is incomplete
+        print(f"  [!] Member sync for club {club_id} stopped at MEMBER_SYNC_MAX_PAGES ({MEMBER_SYNC_MAX_PAGES})")
+        return stats
+
+    if full:
+        # Only a complete pass can tell which members were deleted upstream:
+        # every member it saw was stamped with `started`
+        stats["removed"] = ClubMember.query.filter(
+            ClubMember.club_id == club_id,
+            or_(ClubMember.synced_at.is_(None), ClubMember.synced_at < started),
+        ).delete(synchronize_session=False)
+        club.members_full_synced_at = started
+    club.members_synced_at = started
+    db.session.commit()
+    stats["ok"] = True
+    return stats
+
+
+def reset_club_members(club: Club):
+    ClubMember.query.filter_by(club_id=club.id).delete(synchronize_session=False)
+    club.members_synced_at = None
+    club.members_full_synced_at = None
+
+
+def member_mirror_is_fresh(club: Club | None) -> bool:
+    if not club or not club.members_full_synced_at or not club.members_synced_at:
+        return False
+    return (datetime.utcnow() - club.members_synced_at).total_seconds() <= MEMBER_MIRROR_MAX_AGE
+
+
+def live_member_fields(club: Club, params: dict) -> dict | None:
+    """{member_id: {MEMBER_LIVE_FIELDS}} from the live /members page for
+    ``params``; None when iCafeCloud can't answer."""
+    if icafe_breaker.is_open(str(club.cafe_id)):
+        return None
+
+    def load():
+        raw = icafe_get_for_club(club, "/members", params)
+        if not raw or raw.get("code") != 200:
+            return None
+        return {
+            m["id"]: {field: m[field] for field in MEMBER_LIVE_FIELDS}
+            for m in map(member_from_icafe, (raw.get("data") or {}).get("members", [])) if m["id"]
+        }
+
+    return member_live_fields_cache.get((club.id, tuple(sorted(params.items()))), load)
+
+
+def prefix_match(column, prefix: str):
+    # A range instead of LIKE so the (club_id, key) index serves it on every backend
+    return and_(column >= prefix, column < prefix + "\uffff")
+
+
+def local_members_page(club_id: int, page: int, search: str, sort_field: str, sort_dir: str) -> dict:
+    query = ClubMember.query.filter(ClubMember.club_id == club_id)
+    if search:
+        key = search.strip().lower()
+        query = query.filter(or_(prefix_match(ClubMember.account_key, key), prefix_match(ClubMember.name_key, key)))
+
+    column = MEMBER_SORT_COLUMNS.get(sort_field, ClubMember.created)
+    order = column.asc() if sort_dir == "asc" else column.desc()
+    tiebreak = ClubMember.member_id.asc() if sort_dir == "asc" else ClubMember.member_id.desc()
+
+    page = max(page, 1)
+    total = query.count()
+    rows = query.order_by(order, tiebreak).offset((page - 1) * MEMBERS_PAGE_SIZE).limit(MEMBERS_PAGE_SIZE).all()
+    total_pages = max(1, -(-total // MEMBERS_PAGE_SIZE))
+    return {
+        "members": [member_json(r) for r in rows],
+        "paging": {
+            "page": page,
+            "per_page": MEMBERS_PAGE_SIZE,
+            "total_records": total,
+            "pages": total_pages,
+            "total_pages": total_pages,
+        },
+    }
+
 
+def club_member_count(club: Club | None) -> int | None:
+    """Member count from the mirror, or None when it can't be trusted."""
+    if not member_mirror_is_fresh(club):
+        return None
+    return db.session.query(func.count(ClubMember.member_id)).filter(ClubMember.club_id == club.id).scalar()
+
+
+@app.cli.command("sync-members")
+@click.option("--club-id", type=int, default=None, help="Only this club (default: every configured club).")
+@click.option("--full", is_flag=True, help="Full pass: refresh every member and drop deleted ones.")
+def sync_members_command(club_id, full):
+    """Mirror iCafeCloud members into club_members."""
+    club_ids = [club_id] if club_id else [
+        c.id for c in Club.query.filter(Club.api_key.isnot(None), Club.cafe_id.isnot(None))
+    ]
+    for cid in club_ids:
+        # The first sync of a club is always a full pass
+        stats = sync_club_members(cid, full=full or not db.session.get(Club, cid).members_full_synced_at)
+        print(f"{'✅' if stats['ok'] else '❌'} Club {cid}: {stats['members']} members in {stats['pages']} pages, "
+              f"{stats['removed']} removed")
+
+
+# ── Members ───────────────────────────────────────────────────────────────────
+
+def members_payload(page: int = 1, search: str = "", sort_field: str = "member_create", sort_dir: str = "desc") -> dict:
+    club = current_user_club()
     params = {
         "page": page,
         "sort_field": sort_field,
@@ -2045,6 +3577,16 @@ def get_members():
     if search:
         params["search_text"] = search
 
+    if member_mirror_is_fresh(club):
+        payload = local_members_page(club.id, page, search, sort_field, sort_dir)
+        if (datetime.utcnow() - club.members_full_synced_at).total_seconds() > MEMBER_LIVE_FIELDS_TTL:
+            # Same query upstream lists (nearly) the same members: take their
+            # current balances from it, keep the mirror's for any it doesn't list
+            live = live_member_fields(club, params) or {}
+            for member in payload["members"]:
+                member.update(live.get(member["id"], {}))
+        return payload
+
     result = icafe_get("/members", params)
     members = []
     paging = {}
@@ -2052,22 +3594,109 @@ def get_members():
     if result and result.get("code") == 200:
         data = result.get("data", {})
         paging = data.get("paging_info", {})
-        for m in data.get("members", []):
-            members.append({
-                "id": m.get("member_icafe_id"),
-                "account": m.get("member_account", ""),
-                "name": f"{m.get('member_first_name', '')} {m.get('member_last_name', '')}".strip(),
-                "balance": float(m.get("member_balance", 0)),
-                "balance_bonus": float(m.get("member_balance_bonus", 0)),
-                "points": float(m.get("member_points", 0)),
-                "group": m.get("member_group_name", ""),
-                "is_active": bool(m.get("member_is_active")),
-                "is_logined": bool(m.get("member_is_logined")),
-                "expire": m.get("member_expire_time_local", ""),
-                "created": m.get("member_create_local", m.get("member_create", "")),
-            })
+        members = [member_from_icafe(m) for m in data.get("members", [])]
+
+    return {"members": members, "paging": paging}
 
-    return jsonify({"members": members, "paging": paging})
+
+@app.get("/api/members")
+@jwt_required()
+def get_members():
+    return jsonify(members_payload(
+        page=request.args.get("page", 1, type=int),
+        search=request.args.get("search", ""),
+        sort_field=request.args.get("sort_field", "member_create"),
+        sort_dir=request.args.get("sort_dir", "desc"),
+    ))
+
+
+# ── Batched dashboard ─────────────────────────────────────────────────────────
+# One round trip for the whole dashboard: the identity is resolved once and the
+# requested widgets are built concurrently, each in a copy of the request
+# context (own DB session), on one shared pool. A request has at most
+# DASHBOARD_REQUEST_WORKERS widgets in the pool at a time, so one slow tenant's
+# dashboards can't take every thread from the others. Upstream calls still go through the
+# shared caches and single-flights, so widgets needing the same report or PC
+# list share one fetch. Build times go in Server-Timing rather than the body,
+# which keeps the body (and its ETag) stable while the data is unchanged.
+
+DASHBOARD_WORKERS = int(os.environ.get("DASHBOARD_WORKERS", "16"))
+DASHBOARD_REQUEST_WORKERS = int(os.environ.get("DASHBOARD_REQUEST_WORKERS", "4"))  # share of one request
+DASHBOARD_DEADLINE = float(os.environ.get("DASHBOARD_DEADLINE", "20"))
+
+_dashboard_pool = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix="dashboard")
+
+DASHBOARD_WIDGETS = {
+    "overview": overview_payload,
+    "daily": daily_chart_payload,
+    "monthly": monthly_chart_payload,
+    "payments": payment_methods_payload,
+    "income_monthly": income_monthly_payload,
+    "pcs": pcs_payload,
+    "members": members_payload,  # first page, default sort
+    "config": config_payload,
+}
+
+
+def _build_widget(key: str, identity: dict | None) -> dict:
+    # Copied request contexts start with an empty g: hand over the identity
+    # resolved by the calling request instead of decoding the JWT again.
+    g.identity = identity
+    started = time.perf_counter()
+    try:
+        data = DASHBOARD_WIDGETS[key]()
+        status = "ok" if data is not None else "not_found"
+    except Exception as e:
+        print(f"Dashboard widget {key} failed: {e}")
+        data, status = None, "error"
+    return {"status": status, "data": data}, round((time.perf_counter() - started) * 1000, 1)
+
+
+@app.get("/api/dashboard")
+@jwt_required()
+@conditional_get()
+def dashboard():
+    """?widgets=overview,daily,... -> {"widgets": {key: {"status", "data"}}}.
+
+    status is "ok", "not_found" (e.g. config without a club), "error" or
+    "timeout" (not built within DASHBOARD_DEADLINE). Without ?widgets every
+    widget is built. Per-widget build times are in the Server-Timing header.
+    """
+    requested = [k.strip() for k in request.args.get("widgets", "").split(",") if k.strip()]
+    requested = list(dict.fromkeys(requested)) or list(DASHBOARD_WIDGETS)
+    unknown = [k for k in requested if k not in DASHBOARD_WIDGETS]
+    if unknown:
+        return jsonify({"message": f"Unknown widgets: {', '.join(unknown)}"}), 400
+
+    identity = current_identity()
+    started = time.perf_counter()
+    deadline = started + DASHBOARD_DEADLINE
+    share = threading.BoundedSemaphore(DASHBOARD_REQUEST_WORKERS)
+    futures = {}
+    for key in requested:
+        if not share.acquire(timeout=max(deadline - time.perf_counter(), 0)):
+            break  # out of time before a slot freed up: the rest time out unbuilt
+        future = _dashboard_pool.submit(copy_current_request_context(_build_widget), key, identity)
+        future.add_done_callback(lambda _: share.release())
+        futures[key] = future
+    done, pending = wait(futures.values(), timeout=max(deadline - time.perf_counter(), 0))
+    # Don't wait for stragglers: running ones finish in the background and
+    # whatever they fetch still lands in the shared caches; queued ones are dropped
+    for future in pending:
+        future.cancel()
+
+    widgets = {}
+    timings = []
+    for key in requested:
+        future = futures.get(key)
+        if future in done:
+            widgets[key], ms = future.result()
+        else:
+            widgets[key], ms = {"status": "timeout", "data": None}, round((time.perf_counter() - started) * 1000, 1)
+        timings.append(f"{key};dur={ms}")
+    timings.append(f"total;dur={round((time.perf_counter() - started) * 1000, 1)}")
+
+    return jsonify({"widgets": widgets}), 200, {"Server-Timing": ", ".join(timings)}
 
 
 # ── Billing logs ──────────────────────────────────────────────────────────────
@@ -2148,5 +3777,6 @@ def serve(path):
 
 
 if __name__ == "__main__":
+    init_db()
     print("🚀 iCafe Dashboard running at http://localhost:5000")
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,105 @@
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from club_extract import decode_html, extract_club, extract_listing
+
+# Сравнение club_extract (lxml) со старым разбором на BeautifulSoup по сохранённой странице клуба:
+#   python bench_extract.py [файл] [повторов]
+
+FIXTURE = "test_html.txt"  # frag.gg/club/233, сохранена в UTF-16
+
+
+def load_fixture(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+    encoding = "utf-16" if raw[:2] in (b"\xff\xfe", b"\xfe\xff") else "utf-8"
+    return raw.decode(encoding)
+
+
+def bs4_extract_club(html):
+    # Прежний scraper.parse_club, как эталон
+    c_soup = BeautifulSoup(html, "html.parser")
+
+    name_tag = c_soup.find("h1") or c_soup.find("h2")
+    if not name_tag:
+        og_title = c_soup.find("meta", property="og:title")
+        name = og_title["content"] if og_title else "Unknown Club"
+    else:
+        name = name_tag.text.strip()
+
+    logo = ""
+    top_img_div = c_soup.find("div", class_="clubDetailTopImage")
+    if top_img_div and top_img_div.get("style") and "url(" in top_img_div["style"]:
+        match = re.search(r"url\((.*?)\)", top_img_div["style"])
+        if match:
+            logo = match.group(1).strip("'\"")
+    if not logo or "frag-og.png" in logo:
+        og_img = c_soup.find("meta", property="og:image")
+        if og_img and og_img.get("content") and "frag-og.png" not in og_img["content"]:
+            logo = og_img["content"]
+        else:
+            for img in c_soup.find_all("img"):
+                src = img.get("src", "")
+                if "/uploads/club/" in src:
+                    logo = src
+                    break
+    if logo and not logo.startswith("http"):
+        logo = "https://frag.gg" + logo
+
+    phone = ""
+    instagram = ""
+    address = "Адрес не указан"
+    for a in c_soup.find_all("a", href=True):
+        href = a["href"]
+        if "instagram.com" in href and "fragportal" not in href:
+            instagram = href
+        if href.startswith("tel:"):
+            phone = href.replace("tel:", "").strip()
+    for p in c_soup.find_all(["p", "div", "span", "li"]):
+        text = p.text.strip()
+        if not phone and re.search(r"(\+?998[\s-]?\(?\d{2}\)?[\s-]?\d{3}[\s-]?\d{2}[\s-]?\d{2})", text):
+            m = re.search(r"(\+?998[\s-]?\(?\d{2}\)?[\s-]?\d{3}[\s-]?\d{2}[\s-]?\d{2})", text)
+            if m: phone = m.group(1)
+        if ("улица" in text.lower() or "ул." in text.lower() or "г." in text.lower()) and len(text) < 150:
+            if "frag portal" not in text.lower() and "frag.gg" not in text.lower():
+                address = text
+
+    return {"name": name, "logo": logo, "phone": phone, "instagram": instagram, "address": address}
+
+
+def timed(func, page, rounds):
+    func(page)  # прогрев
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func(page)
+    return (time.perf_counter() - started) / rounds * 1000
+
+
+def run(path=FIXTURE, rounds=50):
+    html = load_fixture(path)
+    print(f"Fixture: {path}, {len(html)} символов, {rounds} повторов\n")
+
+    expected = bs4_extract_club(html)
+    got = extract_club(html)
+    for field in expected:
+        mark = "OK " if expected[field] == got[field] else "!! "
+        print(f"{mark}{field}: {got[field]!r}" + ("" if mark == "OK " else f" (bs4: {expected[field]!r})"))
+    print(f"Ссылок на клубы: {len(extract_listing(html))}\n")
+
+    page_bytes = html.encode("utf-8")  # так страницу получает scraper (res.content)
+    content_type = "text/html; charset=UTF-8"
+    old_ms = timed(bs4_extract_club, html, rounds)
+    new_ms = timed(lambda page: extract_club(decode_html(page, content_type)), page_bytes, rounds)
+    print(f"BeautifulSoup html.parser: {old_ms:.2f} мс/страница")
+    print(f"club_extract (lxml):       {new_ms:.2f} мс/страница")
+    print(f"Быстрее в {old_ms / new_ms:.1f} раз")
+    return expected == got
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else FIXTURE
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    sys.exit(0 if run(path, rounds) else 1)
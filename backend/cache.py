@@ -0,0 +1,149 @@
+"""In-process caching helpers shared by the iCafeCloud call paths."""
+import threading
+import time
+
+
+class TTLCache:
+    """Thread-safe key/value cache with a fresh TTL and a stale-while-revalidate window.
+
+    * age < ttl                 -> fresh hit, value returned as-is
+    * ttl <= age < ttl + stale  -> stale hit, value returned and refreshed in the background
+    * otherwise                 -> miss, loader runs in the caller's thread
+
+    Loader results are stored only when ``should_cache(value)`` is true, so
+    upstream errors are never served from the cache.
+    """
+
+    def __init__(self, name: str, ttl: float, stale_ttl: float = 0, should_cache=None):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.should_cache = should_cache or (lambda value: value is not None)
+        self._entries = {}  # key -> (stored_at, value)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get(self, key, loader, allow_stale: bool = True):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                age = now - entry[0]
+                if age < self.ttl:
+                    self.hits += 1
+                    return entry[1]
+                if allow_stale and age < self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+                    return entry[1]
+            self.misses += 1
+        return self._load(key, loader)
+
+    def peek(self, key):
+        """Return the last stored value for ``key`` regardless of its age."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[1] if entry else None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "size": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+            }
+
+    def _load(self, key, loader):
+        value = loader()
+        if self.should_cache(value):
+            self.set(key, value)
+        return value
+
+    def _refresh(self, key, loader):
+        try:
+            self._load(key, loader)
+        except Exception as e:
+            print(f"Cache refresh failed ({self.name}:{key}): {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls sharing a key into one execution.
+
+    The first caller (the leader) runs ``fn``; callers arriving while it is in
+    flight wait for it and receive the same result, or the same exception.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.collapsed = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call:
+                self.collapsed += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "in_flight": len(self._calls),
+                "executed": self.executed,
+                "collapsed": self.collapsed,
+            }
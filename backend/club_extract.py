@@ -0,0 +1,139 @@
+"""Field extraction for frag.gg pages, on lxml with precompiled XPath and regexes.
+
+Same rules as the BeautifulSoup version the scraper used before, in one
+parse per page:
+
+    name       first <h1>, else first <h2>, else og:title
+    logo       .clubDetailTopImage background, else og:image, else the
+               first /uploads/club/ <img> (frag-og.png is a placeholder)
+    phone      last tel: link, else the first +998 number in the text
+    instagram  last instagram.com link that isn't the portal's own
+    address    last short text block that looks like a street address
+"""
+import re
+
+from lxml import etree, html as lxml_html
+
+BASE_URL = "https://frag.gg"
+NO_ADDRESS = "Адрес не указан"
+PLACEHOLDER_IMAGE = "frag-og.png"
+MAX_ADDRESS_LENGTH = 150
+
+PHONE_RE = re.compile(r"(\+?998[\s-]?\(?\d{2}\)?[\s-]?\d{3}[\s-]?\d{2}[\s-]?\d{2})")
+BACKGROUND_URL_RE = re.compile(r"url\((.*?)\)")
+CHARSET_RE = re.compile(r"charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+XML_DECLARATION_RE = re.compile(r"^\s*<\?xml[^>]*\?>")
+ADDRESS_MARKERS = ("улица", "ул.", "г.")
+ADDRESS_STOP_WORDS = ("frag portal", "frag.gg")
+
+_first_h1 = etree.XPath("(//h1)[1]")
+_first_h2 = etree.XPath("(//h2)[1]")
+_og_title = etree.XPath("(//meta[@property='og:title'])[1]/@content")
+_og_image = etree.XPath("(//meta[@property='og:image'])[1]/@content")
+_top_image_style = etree.XPath(
+    "(//div[contains(concat(' ', normalize-space(@class), ' '), ' clubDetailTopImage ')])[1]/@style"
+)
+_club_upload_src = etree.XPath("(//img[contains(@src, '/uploads/club/')])[1]/@src")
+_link_hrefs = etree.XPath("//a/@href")
+_club_hrefs = etree.XPath("//a[starts-with(@href, '/club/')]/@href")
+# Not part of the visible text; BeautifulSoup's .text skipped them too
+_invisible = etree.XPath("//script | //style | //template")
+
+
+def decode_html(content: bytes, content_type: str | None) -> str | bytes:
+    """Page text for lxml: decoded with the charset of the Content-Type header,
+    else as UTF-8. Bytes that are neither are returned as-is, and lxml falls
+    back to the page's <meta charset>."""
+    match = CHARSET_RE.search(content_type or "")
+    if match:
+        try:
+            return content.decode(match.group(1), errors="replace")
+        except LookupError:
+            pass  # unknown charset name
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return content
+
+
+def _fromstring(page: str | bytes):
+    if isinstance(page, str):
+        # lxml refuses str input that still declares an encoding
+        page = XML_DECLARATION_RE.sub("", page, count=1)
+    return lxml_html.fromstring(page)
+
+
+def parse_html(page: str | bytes):
+    root = _fromstring(page)
+    for element in _invisible(root):
+        element.drop_tree()  # keeps the tail text
+    return root
+
+
+def _first(values: list) -> str:
+    return str(values[0]) if values else ""
+
+
+def extract_listing(page: str | bytes) -> list[str]:
+    """Absolute club profile URLs linked from a listing page, sorted."""
+    root = _fromstring(page)
+    return sorted({
+        BASE_URL + href
+        for href in _club_hrefs(root)
+        if href != "/club/" and "page=" not in href
+    })
+
+
+def extract_logo(root) -> str:
+    logo = ""
+    match = BACKGROUND_URL_RE.search(_first(_top_image_style(root)))
+    if match:
+        logo = match.group(1).strip("'\"")
+
+    if not logo or PLACEHOLDER_IMAGE in logo:
+        og_image = _first(_og_image(root))
+        if og_image and PLACEHOLDER_IMAGE not in og_image:
+            logo = og_image
+        else:
+            logo = _first(_club_upload_src(root)) or logo
+
+    if logo and not logo.startswith("http"):
+        logo = BASE_URL + logo
+    return logo
+
+
+def extract_club(page: str | bytes) -> dict:
+    """{"name", "logo", "phone", "instagram", "address"} of a club profile page."""
+    root = parse_html(page)
+
+    heading = _first_h1(root) or _first_h2(root)
+    if heading:
+        name = heading[0].text_content().strip()
+    else:
+        name = _first(_og_title(root)) or "Unknown Club"
+
+    phone = ""
+    instagram = ""
+    for href in _link_hrefs(root):
+        if "instagram.com" in href and "fragportal" not in href:
+            instagram = str(href)
+        if href.startswith("tel:"):
+            phone = href[4:].strip()
+
+    # One pass over the text blocks, cheapest checks first
+    address = NO_ADDRESS
+    for element in root.iter("p", "div", "span", "li"):
+        text = element.text_content().strip()
+        if not phone:
+            match = PHONE_RE.search(text)
+            if match:
+                phone = match.group(1)
+        if len(text) >= MAX_ADDRESS_LENGTH:
+            continue
+        lowered = text.lower()
+        if any(marker in lowered for marker in ADDRESS_MARKERS) and not any(
+            word in lowered for word in ADDRESS_STOP_WORDS
+        ):
+            address = text
+
+    return {"name": name, "logo": extract_logo(root), "phone": phone, "instagram": instagram, "address": address}
@@ -0,0 +1,42 @@
+"""Gunicorn settings for the iCafeDash API.
+
+Sizing: requests mostly wait on iCafeCloud (up to ICAFE_READ_TIMEOUT) or on
+the database, so throughput comes from threads, not CPUs. Each worker serves
+`threads` requests at once; total capacity is WEB_CONCURRENCY x GUNICORN_THREADS.
+The booking SSE streams are served by gevent workers (gunicorn_sse.conf.py)
+behind the same proxy. A stream that reaches this service anyway holds one
+thread for up to SSE_MAX_STREAM_SECONDS.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2, 4)))
+threads = int(os.environ.get("GUNICORN_THREADS", "32"))
+
+# With gthread the timeout is a worker heartbeat, not a per-request limit, so
+# long SSE streams are fine; a worker stuck for this long is restarted.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "5"))
+
+# Recycle workers now and then to cap slow memory growth
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "500"))
+
+accesslog = "-"
+errorlog = "-"
+# Default format minus the query string (%(U)s is the path only): SSE tickets
+# and other credentials passed as query parameters stay out of the logs
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+
+
+def on_starting(server):
+    # Migrations and admin seeding run once here, before any worker exists
+    from app import app, db, init_db
+
+    init_db()
+    # Don't hand the master's pooled DB connections to forked workers
+    with app.app_context():
+        db.engine.dispose()
@@ -0,0 +1,28 @@
+"""Gunicorn settings for the booking SSE streams.
+
+    gunicorn -c gunicorn_sse.conf.py wsgi:app
+
+/api/bookings/stream and /api/public/bookings/stream are open for minutes at
+a time while doing almost nothing, so they are not served by the gthread API
+workers (gunicorn.conf.py), where each one would hold a request thread. The
+proxy routes those two paths here instead. gevent workers run every stream as
+a greenlet: an idle tab costs a socket and a few KB of memory, so one worker
+holds SSE_WORKER_CONNECTIONS tabs. Everything else stays on the API service.
+
+Migrations run in the API service's on_starting hook, not here.
+"""
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+worker_class = "gevent"
+workers = int(os.environ.get("SSE_WORKERS", "1"))
+worker_connections = int(os.environ.get("SSE_WORKER_CONNECTIONS", "2000"))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = "-"
+errorlog = "-"
+# Same as gunicorn.conf.py: no query strings (stream tickets) in the log
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
@@ -0,0 +1,225 @@
+"""Pooled, keep-alive HTTP client for the iCafeCloud v2 API."""
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+ICAFE_BASE = "https://api.icafecloud.com/api/v2"
+
+
+class ICafeClient:
+    """One requests.Session per process, shared by every iCafeCloud call.
+
+    Connections to api.icafecloud.com are kept alive and reused, so the TLS
+    handshake is paid once per pooled connection instead of once per call.
+    GETs are retried with jittered exponential backoff on connection errors
+    and 502/503/504; read timeouts are not retried so callers keep a bounded
+    worst case. POSTs are never retried.
+    """
+
+    def __init__(self, base_url: str = ICAFE_BASE, pool_size: int = 20,
+                 connect_timeout: float = 3.05, read_timeout: float = 15,
+                 get_retries: int = 2, backoff: float = 0.3):
+        self.base_url = base_url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        retry = Retry(
+            total=get_retries,
+            connect=get_retries,
+            read=0,
+            status=get_retries,
+            backoff_factor=backoff,
+            backoff_jitter=backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @classmethod
+    def from_env(cls) -> "ICafeClient":
+        return cls(
+            base_url=os.environ.get("ICAFE_BASE_URL", ICAFE_BASE),
+            pool_size=int(os.environ.get("ICAFE_POOL_SIZE", "20")),
+            connect_timeout=float(os.environ.get("ICAFE_CONNECT_TIMEOUT", "3.05")),
+            read_timeout=float(os.environ.get("ICAFE_READ_TIMEOUT", "15")),
+            get_retries=int(os.environ.get("ICAFE_GET_RETRIES", "2")),
+            backoff=float(os.environ.get("ICAFE_RETRY_BACKOFF", "0.3")),
+        )
+
+    def url(self, cafe_id: str, path: str) -> str:
+        return f"{self.base_url}/cafe/{cafe_id}{path}"
+
+    def _timeout(self, read_timeout: float | None) -> tuple[float, float]:
+        return (self.connect_timeout, read_timeout or self.read_timeout)
+
+    def get(self, api_key: str, cafe_id: str, path: str, params: dict = None,
+            read_timeout: float | None = None) -> dict:
+        headers = {
+            "Authorization": f"Bearer {api_key.strip()}",
+            "Accept": "application/json",
+        }
+        resp = self.session.get(self.url(cafe_id, path), headers=headers, params=params,
+                                timeout=self._timeout(read_timeout))
+        return resp.json()
+
+    def post(self, api_key: str, cafe_id: str, path: str, data: dict = None,
+             read_timeout: float | None = None) -> dict:
+        headers = {
+            "Authorization": f"Bearer {api_key.strip()}",
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        }
+        resp = self.session.post(self.url(cafe_id, path), headers=headers, json=data or {},
+                                 timeout=self._timeout(read_timeout))
+        return resp.json()
+
+
+class CircuitBreaker:
+    """Per-tenant circuit breaker for upstream calls.
+
+    closed    -> calls flow; ``failure_threshold`` consecutive failures open it
+    open      -> calls are refused until the cool-down elapses
+    half_open -> a single probe call is let through; success closes the
+                 circuit, failure re-opens it with a doubled cool-down
+                 (capped at ``max_cooldown``)
+
+    ``on_change(key, state)`` is called outside the lock whenever a tenant's
+    state or failure count changes, so callers can persist it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, base_cooldown: float = 10,
+                 max_cooldown: float = 300, on_change=None):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.on_change = on_change
+        self._tenants = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, on_change=None) -> "CircuitBreaker":
+        return cls(
+            failure_threshold=int(os.environ.get("ICAFE_BREAKER_THRESHOLD", "3")),
+            base_cooldown=float(os.environ.get("ICAFE_BREAKER_COOLDOWN", "10")),
+            max_cooldown=float(os.environ.get("ICAFE_BREAKER_MAX_COOLDOWN", "300")),
+            on_change=on_change,
+        )
+
+    def _tenant(self, key: str) -> dict:
+        tenant = self._tenants.get(key)
+        if tenant is None:
+            tenant = {
+                "state": self.CLOSED,
+                "failures": 0,
+                "trips": 0,
+                "open_until": 0.0,
+                "last_error": None,
+                "probing": False,
+            }
+            self._tenants[key] = tenant
+        return tenant
+
+    def is_open(self, key: str) -> bool:
+        """True while calls for ``key`` would be refused (no state change)."""
+        with self._lock:
+            tenant = self._tenants.get(key)
+            if not tenant:
+                return False
+            if tenant["state"] == self.OPEN:
+                return time.time() < tenant["open_until"]
+            return tenant["state"] == self.HALF_OPEN and tenant["probing"]
+
+    def allow(self, key: str) -> bool:
+        changed = None
+        with self._lock:
+            tenant = self._tenant(key)
+            if tenant["state"] == self.CLOSED:
+                return True
+            if tenant["state"] == self.OPEN:
+                if time.time() < tenant["open_until"]:
+                    return False
+                tenant["state"] = self.HALF_OPEN
+                changed = self._public(tenant)
+            if tenant["probing"]:
+                return False
+            tenant["probing"] = True
+        if changed:
+            self._notify(key, changed)
+        return True
+
+    def record_success(self, key: str):
+        with self._lock:
+            tenant = self._tenant(key)
+            if tenant["state"] == self.CLOSED and tenant["failures"] == 0:
+                return
+            tenant.update(state=self.CLOSED, failures=0, trips=0, open_until=0.0, probing=False)
+            changed = self._public(tenant)
+        self._notify(key, changed)
+
+    def record_failure(self, key: str, error: str):
+        with self._lock:
+            tenant = self._tenant(key)
+            tenant["failures"] += 1
+            tenant["last_error"] = error[:255]
+            tenant["probing"] = False
+            if tenant["state"] == self.HALF_OPEN or tenant["failures"] >= self.failure_threshold:
+                tenant["trips"] += 1
+                cooldown = min(self.base_cooldown * 2 ** (tenant["trips"] - 1), self.max_cooldown)
+                tenant["state"] = self.OPEN
+                tenant["open_until"] = time.time() + cooldown
+            changed = self._public(tenant)
+        self._notify(key, changed)
+
+    def reset(self, key: str):
+        """Close the circuit, e.g. after the tenant's credentials were changed."""
+        with self._lock:
+            if key not in self._tenants:
+                return
+            self._tenants.pop(key)
+        self._notify(key, {"state": self.CLOSED, "failures": 0, "open_until": None, "last_error": None})
+
+    def restore(self, key: str, state: str, failures: int, open_until: float, last_error: str | None):
+        """Seed a tenant from persisted state (e.g. after a worker restart)."""
+        with self._lock:
+            tenant = self._tenant(key)
+            tenant.update(
+                state=self.OPEN if state in (self.OPEN, self.HALF_OPEN) else self.CLOSED,
+                failures=failures or 0,
+                trips=1 if state in (self.OPEN, self.HALF_OPEN) else 0,
+                open_until=open_until or 0.0,
+                last_error=last_error,
+                probing=False,
+            )
+
+    def state(self, key: str) -> dict | None:
+        with self._lock:
+            tenant = self._tenants.get(key)
+            return self._public(tenant) if tenant else None
+
+    @staticmethod
+    def _public(tenant: dict) -> dict:
+        return {
+            "state": tenant["state"],
+            "failures": tenant["failures"],
+            "open_until": tenant["open_until"] or None,
+            "last_error": tenant["last_error"],
+        }
+
+    def _notify(self, key: str, state: dict):
+        if self.on_change:
+            try:
+                self.on_change(key, state)
+            except Exception as e:
+                print(f"Circuit breaker listener failed ({key}): {e}")
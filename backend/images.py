@@ -0,0 +1,238 @@
+"""Upload image pipeline: decode-validate, strip metadata, resize into fixed variants.
+
+Every accepted upload is stored as a small set of content-addressed files:
+
+    img_<digest>_<variant>.webp     thumb / card / hero, WebP
+    img_<digest>_<variant>.jpg|png  same sizes, fallback for clients without WebP
+
+The digest is the SHA-256 of the uploaded bytes, so re-uploading the same
+image maps to the same names and the files never change once written.
+"""
+import hashlib
+import io
+import os
+import re
+import tempfile
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# name -> (width, height, crop). Cropped variants fill the box exactly, the
+# others are scaled down to fit inside it and never upscaled.
+VARIANTS = {
+    "thumb": (160, 160, True),
+    "card": (640, 400, False),
+    "hero": (1600, 1000, False),
+}
+ACCEPTED_FORMATS = {"JPEG", "PNG", "GIF", "WEBP"}
+
+WEBP_QUALITY = int(os.environ.get("IMAGE_WEBP_QUALITY", "80"))
+JPEG_QUALITY = int(os.environ.get("IMAGE_JPEG_QUALITY", "85"))
+# Decompression-bomb guard: Pillow refuses images above this many pixels
+Image.MAX_IMAGE_PIXELS = int(os.environ.get("IMAGE_MAX_PIXELS", "40000000"))
+
+_VARIANT_NAME = re.compile(r"^(?P<prefix>.*/img_[0-9a-f]{32}_)(?P<variant>[a-z]+)\.webp$")
+_FILENAME = re.compile(r"^img_(?P<digest>[0-9a-f]{32})_(?P<variant>[a-z]+)\.(?P<ext>webp|jpg|png)$")
+_DIGEST_IN_URL = re.compile(r"/img_([0-9a-f]{32})_[a-z]+\.(?:webp|jpg|png)$")
+
+
+# Leading bytes of each accepted format; WebP is RIFF....WEBP
+_MAGIC = (
+    (b"\xff\xd8\xff", "JPEG"),
+    (b"\x89PNG\r\n\x1a\n", "PNG"),
+    (b"GIF87a", "GIF"),
+    (b"GIF89a", "GIF"),
+)
+SNIFF_BYTES = 16
+
+
+class ImageError(ValueError):
+    """The upload is not an image we accept."""
+
+
+class UploadTooLarge(ImageError):
+    """The upload is bigger than the configured limit."""
+
+
+def digest_of(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def sniff_format(head: bytes) -> str | None:
+    """Format named by the file's magic bytes, whatever its extension claims."""
+    for magic, fmt in _MAGIC:
+        if head.startswith(magic):
+            return fmt
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+def receive_stream(stream, folder: str, name: str, max_bytes: int, chunk_size: int = 64 * 1024) -> tuple[str, str, int]:
+    """Copy an upload stream to ``folder`` in chunks, hashing as it goes.
+
+    The bytes land in a temp file that is renamed to ``<digest><name>`` only
+    once complete, so readers never see a partial file. Returns
+    (digest, path, size); raises UploadTooLarge past ``max_bytes``.
+    """
+    sha = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"File is larger than {round(max_bytes / 2**20, 1):g} MB")
+                sha.update(chunk)
+                f.write(chunk)
+        digest = sha.hexdigest()[:32]
+        path = os.path.join(folder, f"{digest}{name}")
+        os.replace(tmp_path, path)
+        return digest, path, size
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def probe_image(path: str) -> dict:
+    """Read only the image header: {"format", "width", "height", "fallback_ext"}.
+
+    Cheap enough for the request path; the full decode happens in process_image().
+    """
+    try:
+        with Image.open(path) as image:
+            fmt, width, height, mode = image.format, image.width, image.height, image.mode
+            has_alpha = mode in ("RGBA", "LA", "PA") or (mode == "P" and "transparency" in image.info)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError, ValueError) as e:
+        raise ImageError("Not a valid image") from e
+    if fmt not in ACCEPTED_FORMATS:
+        raise ImageError(f"Unsupported image format: {fmt}")
+    return {"format": fmt, "width": width, "height": height, "fallback_ext": "png" if has_alpha else "jpg"}
+
+
+def variant_filename(digest: str, variant: str, ext: str) -> str:
+    return f"img_{digest}_{variant}.{ext}"
+
+
+def parse_filename(filename: str) -> dict | None:
+    """{"digest", "variant", "ext"} for pipeline file names, None for anything else."""
+    match = _FILENAME.match(filename)
+    if not match or match.group("variant") not in VARIANTS:
+        return None
+    return match.groupdict()
+
+
+def url_digest(url: str | None) -> str | None:
+    match = _DIGEST_IN_URL.search(url or "")
+    return match.group(1) if match else None
+
+
+def variant_files(digest: str, fallback_ext: str) -> dict:
+    """{variant: {"webp": filename, "fallback": filename}} of an already processed upload."""
+    return {
+        variant: {
+            "webp": variant_filename(digest, variant, "webp"),
+            "fallback": variant_filename(digest, variant, fallback_ext),
+        }
+        for variant in VARIANTS
+    }
+
+
+def decode_image(data: bytes) -> Image.Image:
+    """Fully decode the upload; raises ImageError for anything that isn't a sane image."""
+    try:
+        with Image.open(io.BytesIO(data)) as probe:
+            fmt = probe.format
+            probe.verify()  # structure check; the image can't be used afterwards
+        if fmt not in ACCEPTED_FORMATS:
+            raise ImageError(f"Unsupported image format: {fmt}")
+        image = Image.open(io.BytesIO(data))
+        image.seek(0)  # first frame of animated GIF/WebP
+        image.load()
+    except ImageError:
+        raise
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError, ValueError) as e:
+        raise ImageError("Not a valid image") from e
+
+    # Apply the EXIF rotation before the metadata is dropped
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+    return image.convert("RGBA" if has_alpha else "RGB")
+
+
+def resize(image: Image.Image, width: int, height: int, crop: bool) -> Image.Image:
+    if crop:
+        return ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail((width, height), Image.Resampling.LANCZOS)
+    return resized
+
+
+def encode(image: Image.Image, fmt: str) -> bytes:
+    # New buffers only: EXIF, ICC and comments from the upload are not carried over
+    out = io.BytesIO()
+    if fmt == "webp":
+        image.save(out, "WEBP", quality=WEBP_QUALITY, method=4)
+    elif fmt == "png":
+        image.save(out, "PNG", optimize=True)
+    else:
+        image.save(out, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def process_image(data: bytes) -> dict:
+    """Decode and render every variant.
+
+    Returns {"digest", "fallback_ext", "width", "height", "files": {filename: bytes},
+    "variants": {variant: {"webp": filename, "fallback": filename}}}.
+    """
+    image = decode_image(data)
+    digest = digest_of(data)
+    fallback_ext = "png" if image.mode == "RGBA" else "jpg"
+
+    files = {}
+    variants = variant_files(digest, fallback_ext)
+    for variant, (width, height, crop) in VARIANTS.items():
+        resized = resize(image, width, height, crop)
+        files[variants[variant]["webp"]] = encode(resized, "webp")
+        files[variants[variant]["fallback"]] = encode(resized, fallback_ext)
+
+    return {
+        "digest": digest,
+        "fallback_ext": fallback_ext,
+        "width": image.width,
+        "height": image.height,
+        "files": files,
+        "variants": variants,
+    }
+
+
+def write_files(folder: str, files: dict) -> None:
+    """Write content-addressed files atomically; names already on disk are left alone."""
+    for name, content in files.items():
+        path = os.path.join(folder, name)
+        if os.path.exists(path):
+            continue
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".tmp_")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def image_variant_url(url: str | None, variant: str) -> str | None:
+    """Point a stored pipeline URL at another variant; other URLs are returned unchanged."""
+    if not url or variant not in VARIANTS:
+        return url
+    match = _VARIANT_NAME.match(url)
+    if not match:
+        return url  # legacy raw upload or external link
+    return f"{match.group('prefix')}{variant}.webp"
@@ -0,0 +1,97 @@
+"""Versioned schema migrations.
+
+Each module in this package named ``v<NNNN>_<name>.py`` defines
+``upgrade(db)`` and is applied once, in version order. Applied versions are
+recorded in the ``schema_version`` table, so checking for pending work at
+start-up is a single query.
+
+Migrations receive the Flask-SQLAlchemy ``db`` (inside an app context) and
+must be idempotent: databases created before this runner existed already
+have some of the columns, and v0001 creates missing tables from the current
+models.
+
+    flask --app app migrate            # apply pending migrations
+    flask --app app migrate --status   # show current / latest version
+"""
+import importlib
+import pkgutil
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+SCHEMA_TABLE = "schema_version"
+
+
+def discover() -> list[tuple[int, str]]:
+    """(version, module name) of every migration, oldest first."""
+    found = []
+    for module in pkgutil.iter_modules(__path__):
+        prefix, _, _ = module.name.partition("_")
+        if prefix.startswith("v") and prefix[1:].isdigit():
+            found.append((int(prefix[1:]), module.name))
+    return sorted(found)
+
+
+def latest_version() -> int:
+    migrations = discover()
+    return migrations[-1][0] if migrations else 0
+
+
+def current_version(db) -> int:
+    """Highest applied version; 0 for a database that predates the runner (or is empty)."""
+    with db.engine.connect() as conn:
+        try:
+            return conn.execute(text(f"SELECT MAX(version) FROM {SCHEMA_TABLE}")).scalar() or 0
+        except Exception:
+            return 0
+
+
+def _ensure_version_table(db):
+    with db.engine.connect() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} ("
+            "version INTEGER PRIMARY KEY, name VARCHAR(120) NOT NULL, applied_at DATETIME NOT NULL)"
+        ))
+        conn.commit()
+
+
+def upgrade(db) -> list[str]:
+    """Apply every pending migration; returns the names applied."""
+    _ensure_version_table(db)
+    current = current_version(db)
+    applied = []
+    for version, name in discover():
+        if version <= current:
+            continue
+        print(f"🔧 Applying migration {name}...")
+        importlib.import_module(f"{__name__}.{name}").upgrade(db)
+        with db.engine.connect() as conn:
+            conn.execute(
+                text(f"INSERT INTO {SCHEMA_TABLE} (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {"v": version, "n": name, "t": datetime.utcnow()},
+            )
+            conn.commit()
+        applied.append(name)
+    return applied
+
+
+# ── Helpers for migration scripts ────────────────────────────────────────────
+
+def add_missing_columns(db, table: str, columns: list[tuple[str, str]]):
+    """ALTER TABLE ``table`` ADD COLUMN for each (name, ddl) not present yet."""
+    existing = {col["name"] for col in inspect(db.engine).get_columns(table)}
+    with db.engine.connect() as conn:
+        for name, ddl in columns:
+            if name not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+                conn.commit()
+                print(f"✅ Added '{name}' column to {table} table")
+
+
+def create_missing_indexes(db, table: str):
+    """Create the model-declared indexes of ``table`` that the database lacks."""
+    existing = {ix["name"] for ix in inspect(db.engine).get_indexes(table)}
+    for index in db.metadata.tables[table].indexes:
+        if index.name not in existing:
+            print(f"🔧 Creating index {index.name}...")
+            index.create(bind=db.engine)
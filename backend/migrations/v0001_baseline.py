@@ -0,0 +1,31 @@
+"""Baseline: create missing tables and the columns added before versioned migrations."""
+from migrations import add_missing_columns
+
+
+def upgrade(db):
+    db.create_all()
+
+    add_missing_columns(db, "users", [
+        ("email", "VARCHAR(120) UNIQUE"),
+        ("phone", "VARCHAR(20)"),
+        ("is_verified", "BOOLEAN DEFAULT 1"),
+    ])
+    add_missing_columns(db, "clubs", [
+        ("address", "VARCHAR(255)"),
+        ("phone", "VARCHAR(50)"),
+        ("description", "TEXT"),
+        ("lat", "FLOAT"),
+        ("lng", "FLOAT"),
+        ("instagram", "VARCHAR(100)"),
+        ("working_hours", "VARCHAR(100)"),
+        ("zones", "TEXT"),
+        ("tariffs", "TEXT"),
+        ("internet_speed", "VARCHAR(50)"),
+        ("club_main_photo_url", "VARCHAR(255) DEFAULT ''"),
+        ("club_photos", "TEXT"),
+    ])
+    add_missing_columns(db, "booking_requests", [
+        ("cancellation_reason", "TEXT"),
+        ("canceled_by", "VARCHAR(20)"),
+        ("canceled_at", "DATETIME"),
+    ])
@@ -0,0 +1,12 @@
+"""Persisted iCafeCloud circuit-breaker state on clubs."""
+from migrations import add_missing_columns
+
+
+def upgrade(db):
+    add_missing_columns(db, "clubs", [
+        ("breaker_state", "VARCHAR(20) DEFAULT 'closed'"),
+        ("breaker_failures", "INTEGER DEFAULT 0"),
+        ("breaker_open_until", "DATETIME"),
+        ("breaker_last_error", "VARCHAR(255)"),
+        ("breaker_changed_at", "DATETIME"),
+    ])
@@ -0,0 +1,8 @@
+"""booking_requests.updated_at for delta sync."""
+from migrations import add_missing_columns
+
+
+def upgrade(db):
+    add_missing_columns(db, "booking_requests", [
+        ("updated_at", "DATETIME"),
+    ])
@@ -0,0 +1,7 @@
+"""Composite indexes behind keyset pagination of bookings, reviews and users."""
+from migrations import create_missing_indexes
+
+
+def upgrade(db):
+    for table in ("users", "club_reviews", "booking_requests"):
+        create_missing_indexes(db, table)
@@ -0,0 +1,24 @@
+"""Per-club rating aggregates, backfilled from club_reviews."""
+from sqlalchemy import text
+
+from migrations import add_missing_columns
+
+STARS = range(0, 6)
+
+
+def upgrade(db):
+    columns = ["rating_sum", "rating_count"] + [f"rating_star_{star}" for star in STARS]
+    add_missing_columns(db, "clubs", [(name, "INTEGER NOT NULL DEFAULT 0") for name in columns])
+
+    per_star = ", ".join(
+        f"rating_star_{star} = (SELECT COUNT(*) FROM club_reviews r WHERE r.club_id = clubs.id AND r.rating = {star})"
+        for star in STARS
+    )
+    with db.engine.connect() as conn:
+        conn.execute(text(
+            "UPDATE clubs SET "
+            "rating_sum = (SELECT COALESCE(SUM(r.rating), 0) FROM club_reviews r WHERE r.club_id = clubs.id), "
+            "rating_count = (SELECT COUNT(*) FROM club_reviews r WHERE r.club_id = clubs.id), "
+            + per_star
+        ))
+        conn.commit()
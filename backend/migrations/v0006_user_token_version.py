@@ -0,0 +1,8 @@
+"""users.token_version for revoking issued access tokens."""
+from migrations import add_missing_columns
+
+
+def upgrade(db):
+    add_missing_columns(db, "users", [
+        ("token_version", "INTEGER NOT NULL DEFAULT 0"),
+    ])
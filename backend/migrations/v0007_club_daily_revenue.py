@@ -0,0 +1,11 @@
+"""club_daily_revenue store of reportChart history and its per-club sync state."""
+from migrations import add_missing_columns
+
+
+def upgrade(db):
+    db.create_all()
+
+    add_missing_columns(db, "clubs", [
+        ("revenue_synced_through", "DATE"),
+        ("revenue_refreshed_at", "DATETIME"),
+    ])
@@ -0,0 +1,11 @@
+"""club_members mirror of iCafeCloud members and its per-club sync state."""
+from migrations import add_missing_columns
+
+
+def upgrade(db):
+    db.create_all()
+
+    add_missing_columns(db, "clubs", [
+        ("members_synced_at", "DATETIME"),
+        ("members_full_synced_at", "DATETIME"),
+    ])
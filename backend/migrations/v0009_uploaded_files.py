@@ -0,0 +1,5 @@
+"""uploaded_files: reference-counted, content-addressed image uploads."""
+
+
+def upgrade(db):
+    db.create_all()
@@ -0,0 +1,9 @@
+"""uploaded_files.status for uploads processed in the background."""
+from migrations import add_missing_columns
+
+
+def upgrade(db):
+    # Rows written before the queue existed were processed in the request
+    add_missing_columns(db, "uploaded_files", [
+        ("status", "VARCHAR(20) NOT NULL DEFAULT 'ready'"),
+    ])
@@ -0,0 +1,5 @@
+"""scraped_pages: validators and results of the frag.gg scraper."""
+
+
+def upgrade(db):
+    db.create_all()
@@ -0,0 +1,152 @@
+"""Background PC-status poller.
+
+Polls every configured club's /pcList on an adaptive interval and stores the
+result in club_pc_snapshots, which the HTTP endpoints read instead of calling
+iCafeCloud on every request. It also keeps the club_members mirror current
+(incremental every MEMBER_SYNC_INTERVAL, full every MEMBER_FULL_SYNC_INTERVAL) on
+a separate, smaller pool, so long member walks never delay the /pcList polls.
+
+Run it next to the web app (one instance is enough):
+    python poller.py
+    docker-compose exec backend python poller.py
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import (app, db, Club, BookingRequest, ClubPcSnapshot, MEMBER_FULL_SYNC_INTERVAL, MEMBER_SYNC_INTERVAL,
+                 icafe_get_raw, restore_breaker_states, save_pc_snapshot, sync_club_members)
+
+ACTIVE_INTERVAL = float(os.environ.get("POLLER_ACTIVE_INTERVAL", "10"))  # viewers or pending bookings
+IDLE_INTERVAL = float(os.environ.get("POLLER_IDLE_INTERVAL", "60"))
+NIGHT_INTERVAL = float(os.environ.get("POLLER_NIGHT_INTERVAL", "300"))  # idle clubs at night
+VIEWER_WINDOW = float(os.environ.get("POLLER_VIEWER_WINDOW", "120"))  # seconds a view counts as "active"
+NIGHT_HOURS = os.environ.get("POLLER_NIGHT_HOURS", "2-8")  # local server hours, [start, end)
+WORKERS = int(os.environ.get("POLLER_WORKERS", "8"))
+MEMBER_WORKERS = int(os.environ.get("POLLER_MEMBER_WORKERS", "2"))
+TICK = float(os.environ.get("POLLER_TICK", "2"))
+READ_TIMEOUT = float(os.environ.get("POLLER_READ_TIMEOUT", "8"))
+
+
+def is_night(now_local: datetime) -> bool:
+    start, end = (int(h) for h in NIGHT_HOURS.split("-"))
+    if start <= end:
+        return start <= now_local.hour < end
+    return now_local.hour >= start or now_local.hour < end
+
+
+def poll_interval(snapshot: ClubPcSnapshot | None, has_pending: bool, now: datetime, night: bool) -> float:
+    viewed_recently = bool(
+        snapshot and snapshot.last_viewed_at
+        and (now - snapshot.last_viewed_at).total_seconds() <= VIEWER_WINDOW
+    )
+    if viewed_recently or has_pending:
+        return ACTIVE_INTERVAL
+    return NIGHT_INTERVAL if night else IDLE_INTERVAL
+
+
+def due_clubs(in_flight: set) -> list[tuple[int, str, str]]:
+    now = datetime.utcnow()
+    night = is_night(datetime.now())
+    clubs = Club.query.filter(Club.api_key.isnot(None), Club.api_key != "", Club.cafe_id.isnot(None), Club.cafe_id != "").all()
+    snapshots = {s.club_id: s for s in ClubPcSnapshot.query.all()}
+    pending = {
+        row.club_id for row in db.session.query(BookingRequest.club_id)
+        .filter(BookingRequest.status.in_(["pending", "new"])).distinct()
+    }
+
+    due = []
+    for c in clubs:
+        if c.id in in_flight:
+            continue
+        snapshot = snapshots.get(c.id)
+        last_checked = snapshot.checked_at if snapshot else None
+        interval = poll_interval(snapshot, c.id in pending, now, night)
+        if not last_checked or (now - last_checked).total_seconds() >= interval:
+            due.append((c.id, c.api_key, c.cafe_id))
+    return due
+
+
+def due_member_syncs(skip: set, skip_full: set) -> list[tuple[int, bool]]:
+    """(club_id, full) for clubs whose member mirror is due for a sync; clubs in
+    ``skip_full`` only get an incremental pass."""
+    now = datetime.utcnow()
+    clubs = Club.query.filter(Club.api_key.isnot(None), Club.api_key != "", Club.cafe_id.isnot(None), Club.cafe_id != "").all()
+    due = []
+    for c in clubs:
+        if c.id in skip:
+            continue
+        full_due = not c.members_full_synced_at or (now - c.members_full_synced_at).total_seconds() >= MEMBER_FULL_SYNC_INTERVAL
+        if full_due and c.id not in skip_full:
+            due.append((c.id, True))
+        elif not c.members_synced_at or (now - c.members_synced_at).total_seconds() >= MEMBER_SYNC_INTERVAL:
+            due.append((c.id, False))
+    return due
+
+
+def run_member_sync(club_id: int, full: bool):
+    with app.app_context():
+        try:
+            sync_club_members(club_id, full=full)
+        except Exception as e:
+            db.session.rollback()
+            print(f"  [!] Member sync failed for club {club_id}: {e}")
+
+
+def run_forever():
+    print(f"🔄 PC poller started (active={ACTIVE_INTERVAL}s, idle={IDLE_INTERVAL}s, night={NIGHT_INTERVAL}s)")
+    pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="pc-poller")
+    member_pool = ThreadPoolExecutor(max_workers=MEMBER_WORKERS, thread_name_prefix="member-sync")
+    in_flight = {}  # club_id -> future
+    member_syncs = {}  # club_id -> future
+    member_attempts = {}  # club_id -> monotonic start of the last sync, failed ones included
+    full_attempts = {}  # club_id -> monotonic start of the last full pass, failed ones included
+    with app.app_context():
+        restore_breaker_states()
+
+    while True:
+        with app.app_context():
+            # Store finished polls first so their checked_at is visible to scheduling
+            for club_id, future in list(in_flight.items()):
+                if not future.done():
+                    continue
+                del in_flight[club_id]
+                try:
+                    save_pc_snapshot(club_id, future.result())
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"  [!] Poll failed for club {club_id}: {e}")
+                    save_pc_snapshot(club_id, None, error=str(e))
+
+            try:
+                for club_id, api_key, cafe_id in due_clubs(set(in_flight)):
+                    in_flight[club_id] = pool.submit(icafe_get_raw, api_key, cafe_id, "/pcList", None, READ_TIMEOUT)
+            except Exception as e:
+                db.session.rollback()
+                print(f"[!] Poller scheduling error: {e}")
+
+            for club_id, future in list(member_syncs.items()):
+                if future.done():
+                    del member_syncs[club_id]
+            # A failed sync leaves the club due; wait an interval before retrying it.
+            # A failed full pass (which may be a long walk) is retried a full interval later.
+            recent = {cid for cid, at in member_attempts.items() if time.monotonic() - at < MEMBER_SYNC_INTERVAL}
+            recent_full = {cid for cid, at in full_attempts.items() if time.monotonic() - at < MEMBER_FULL_SYNC_INTERVAL}
+            try:
+                for club_id, full in due_member_syncs(set(member_syncs) | recent, recent_full):
+                    member_attempts[club_id] = time.monotonic()
+                    if full:
+                        full_attempts[club_id] = member_attempts[club_id]
+                    member_syncs[club_id] = member_pool.submit(run_member_sync, club_id, full)
+            except Exception as e:
+                db.session.rollback()
+                print(f"[!] Member sync scheduling error: {e}")
+        time.sleep(TICK)
+
+
+if __name__ == "__main__":
+    run_forever()
@@ -1,156 +1,241 @@
 import os
-import requests
-from bs4 import BeautifulSoup
+import argparse
+import hashlib
+import json
+import threading
 import time
-import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
 
 # Настраиваем окружение, чтобы импортировать app
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app import app, db, Club
+from app import app, db, Club, ScrapedPage
+from club_extract import BASE_URL, NO_ADDRESS, decode_html, extract_club, extract_listing
 
 # Вы можете запустить этот скрипт прямо на VDS:
-# docker-compose exec backend python scraper.py
+# docker-compose exec backend python scraper.py          (только изменившиеся страницы)
+# docker-compose exec backend python scraper.py --full   (игнорировать ETag/Last-Modified)
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 MQQBrowser/10.0.0.0 Safari/537.36"
+}
+MAX_LISTING_PAGES = int(os.environ.get("SCRAPER_MAX_PAGES", "10"))
+WORKERS = int(os.environ.get("SCRAPER_WORKERS", "8"))
+HOST_RATE = float(os.environ.get("SCRAPER_HOST_RATE", "4"))  # запросов в секунду на один хост
+TIMEOUT = float(os.environ.get("SCRAPER_TIMEOUT", "10"))
+
+
+class HostRateLimiter:
+    """Не чаще HOST_RATE запросов в секунду на хост, сколько бы потоков ни было."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = {}  # host -> monotonic time of the next free slot
+        self._lock = threading.Lock()
+
+    def wait(self, url: str):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
 
-def scrape_clubs():
-    base_url = "https://frag.gg"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 MQQBrowser/10.0.0.0 Safari/537.36"
+
+def make_session() -> requests.Session:
+    # Один пул keep-alive соединений на все потоки
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=WORKERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def fetch(session: requests.Session, limiter: HostRateLimiter, url: str, validators: dict | None) -> dict:
+    """Условный GET. Возвращает {"url", "status": changed/unchanged/failed, ...}."""
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    limiter.wait(url)
+    try:
+        res = session.get(url, headers=headers, timeout=TIMEOUT)
+    except requests.RequestException as e:
+        return {"url": url, "status": "failed", "error": str(e)}
+
+    if res.status_code == 304:
+        return {"url": url, "status": "unchanged"}
+    if res.status_code != 200:
+        return {"url": url, "status": "failed", "error": f"HTTP {res.status_code}"}
+
+    content_hash = hashlib.sha256(res.content).hexdigest()
+    result = {
+        "url": url,
+        "status": "changed",
+        # Кодировка из Content-Type, иначе UTF-8, иначе <meta charset> (без угадывания в requests)
+        "html": decode_html(res.content, res.headers.get("Content-Type")),
+        "etag": res.headers.get("ETag"),
+        "last_modified": res.headers.get("Last-Modified"),
+        "content_hash": content_hash,
     }
+    if validators and validators.get("content_hash") == content_hash:
+        # Сервер не поддерживает валидаторы, но страница та же
+        result["status"] = "unchanged"
+        result.pop("html")
+    return result
+
+
+def fetch_club(session, limiter, url: str, validators: dict | None) -> dict:
+    # Сеть и разбор HTML — в рабочем потоке; в БД пишет только главный поток
+    result = fetch(session, limiter, url, validators)
+    if result["status"] == "changed":
+        try:
+            result["club"] = extract_club(result.pop("html"))
+        except Exception as e:
+            result = {"url": url, "status": "failed", "error": f"parse: {e}"}
+    return result
+
+
+def upsert_club(data: dict) -> tuple[Club, str]:
+    """Добавляет клуб или дополняет пустые поля существующего. Возвращает (club, added/updated/same)."""
+    name = data["name"]
+    logo, phone, instagram, address = data["logo"], data["phone"], data["instagram"], data["address"]
+    existing = Club.query.filter_by(name=name).first()
+
+    # Если клуб уже есть, ОБНОВЛЯЕМ его данные (особенно если нет фото)
+    if existing:
+        before = (existing.club_logo_url, existing.phone, existing.instagram, existing.address)
+        if not existing.club_logo_url or "frag-og.png" in existing.club_logo_url:
+            existing.club_logo_url = logo[:255]
+        if not existing.phone: existing.phone = phone[:50]
+        if not existing.instagram: existing.instagram = instagram[:100]
+        if address != NO_ADDRESS and not existing.address: existing.address = address[:255]
+        after = (existing.club_logo_url, existing.phone, existing.instagram, existing.address)
+        return existing, "updated" if after != before else "same"
+
+    new_club = Club(
+        name=name[:100],
+        api_key="",
+        cafe_id="",
+        club_logo_url=logo[:255],
+        address=address[:255],
+        phone=phone[:50],
+        description="",
+        instagram=instagram[:100],
+        working_hours="Круглосуточно",
+        lat=0.0,
+        lng=0.0
+    )
+    db.session.add(new_club)
+    db.session.flush()  # нужен id для scraped_pages.club_id
+    return new_club, "added"
+
+
+def record_page(page: ScrapedPage | None, result: dict, now: datetime, **fields) -> ScrapedPage:
+    if not page:
+        page = ScrapedPage(url=result["url"])
+        db.session.add(page)
+    page.status = result["status"]
+    page.checked_at = now
+    if result["status"] == "changed":
+        page.etag = (result.get("etag") or "")[:255] or None
+        page.last_modified = (result.get("last_modified") or "")[:64] or None
+        page.content_hash = result.get("content_hash")
+        page.fetched_at = now
+    for key, value in fields.items():
+        setattr(page, key, value)
+    return page
+
+
+def validators_of(page: ScrapedPage | None, full: bool) -> dict | None:
+    if full or not page:
+        return None
+    return {"etag": page.etag, "last_modified": page.last_modified, "content_hash": page.content_hash}
+
+
+def scrape_clubs(full: bool = False) -> dict:
+    started = time.monotonic()
+    session = make_session()
+    limiter = HostRateLimiter(HOST_RATE)
+    pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="scraper")
+    summary = {"changed": 0, "unchanged": 0, "failed": 0, "added": 0, "updated": 0}
+    seen_clubs = set()
 
-    clubs_added = 0
     with app.app_context():
         # Страниц примерно 5, можно парсить до тех пор, пока есть клубы
-        for page in range(1, 10):
-            print(f"Парсинг страницы {page}...")
-            url = f"{base_url}/club/index?page={page}"
+        for page_no in range(1, MAX_LISTING_PAGES + 1):
+            url = f"{BASE_URL}/club/index?page={page_no}"
+            listing = db.session.get(ScrapedPage, url)
+            result = fetch(session, limiter, url, validators_of(listing, full))
+            now = datetime.utcnow()
+
+            summary[result["status"]] += 1
+            if result["status"] == "failed":
+                print(f"[!] Ошибка запроса страницы {page_no}: {result['error']}")
+                break
+            if result["status"] == "changed":
+                club_links = extract_listing(result["html"])
+            else:
+                # 304: ссылки те же, что в прошлый раз
+                club_links = json.loads(listing.links or "[]") if listing else []
+            club_links = [link for link in club_links if link not in seen_clubs]
+            seen_clubs.update(club_links)
+            print(f"Страница {page_no}: {result['status']}, клубов: {len(club_links)}")
+
+            pages = {p.url: p for p in ScrapedPage.query.filter(ScrapedPage.url.in_(club_links))} if club_links else {}
+            futures = [
+                pool.submit(fetch_club, session, limiter, link, validators_of(pages.get(link), full))
+                for link in club_links
+            ]
+
+            # Одна транзакция на страницу списка
             try:
-                res = requests.get(url, headers=headers, timeout=10)
-                if res.status_code != 200:
-                    break
-                    
-                soup = BeautifulSoup(res.text, "html.parser")
-                # Ищем ссылки на профили клубов
-                # Обычно они выглядят как <a href="/club/123">
-                club_links = set()
-                for a in soup.find_all("a", href=True):
-                    href = a["href"]
-                    if href.startswith("/club/") and href != "/club/" and "page=" not in href:
-                        club_links.add(base_url + href)
-                
-                if not club_links:
-                    break # Если клубов нет на странице, выходим
-                
-                for club_url in club_links:
-                    try:
-                        print(f"  Проверка: {club_url}")
-                        c_res = requests.get(club_url, headers=headers, timeout=10)
-                        if c_res.status_code != 200:
-                            continue
-                            
-                        c_soup = BeautifulSoup(c_res.text, "html.parser")
-                        
-                        # Парсим название 
-                        name_tag = c_soup.find("h1") or c_soup.find("h2")
-                        if not name_tag:
-                            og_title = c_soup.find("meta", property="og:title")
-                            name = og_title["content"] if og_title else "Unknown Club"
-                        else:
-                            name = name_tag.text.strip()
-                        
-                        existing = Club.query.filter_by(name=name).first()
-                        
-                        # --- Извлекаем фото ---
-                        logo = ""
-                        # 1. Проверяем основной баннер клуба (background-image)
-                        top_img_div = c_soup.find("div", class_="clubDetailTopImage")
-                        if top_img_div and top_img_div.get("style") and "url(" in top_img_div["style"]:
-                            style = top_img_div["style"]
-                            match = re.search(r"url\((.*?)\)", style)
-                            if match:
-                                logo = match.group(1).strip("'\"")
-                        
-                        # 2. Если нет, ищем в галерее или og:image
-                        if not logo or "frag-og.png" in logo:
-                            # Проверяем og:image
-                            og_img = c_soup.find("meta", property="og:image")
-                            if og_img and og_img.get("content") and "frag-og.png" not in og_img["content"]:
-                                logo = og_img["content"]
-                            else:
-                                # Ищем первую картинку из загрузок клуба
-                                for img in c_soup.find_all("img"):
-                                    src = img.get("src", "")
-                                    if "/uploads/club/" in src:
-                                        logo = src
-                                        break
-                        
-                        if logo and not logo.startswith("http"):
-                            logo = base_url + logo
-
-                        # --- Контакты и инфо ---
-                        phone = ""
-                        instagram = ""
-                        address = "Адрес не указан"
-                        
-                        # Извлекаем данные из страницы
-                        for a in c_soup.find_all("a", href=True):
-                            href = a["href"]
-                            if "instagram.com" in href and "fragportal" not in href:
-                                instagram = href
-                            if href.startswith("tel:"):
-                                phone = href.replace("tel:", "").strip()
-
-                        for p in c_soup.find_all(["p", "div", "span", "li"]):
-                            text = p.text.strip()
-                            if not phone and re.search(r"(\+?998[\s-]?\(?\d{2}\)?[\s-]?\d{3}[\s-]?\d{2}[\s-]?\d{2})", text):
-                                m = re.search(r"(\+?998[\s-]?\(?\d{2}\)?[\s-]?\d{3}[\s-]?\d{2}[\s-]?\d{2})", text)
-                                if m: phone = m.group(1)
-                            if ("улица" in text.lower() or "ул." in text.lower() or "г." in text.lower()) and len(text) < 150:
-                                if "frag portal" not in text.lower() and "frag.gg" not in text.lower():
-                                    address = text
-
-                        # Если клуб уже есть, ОБНОВЛЯЕМ его данные (особенно если нет фото)
-                        if existing:
-                            print(f"  Клуб '{name}' уже в базе. Обновляем данные...")
-                            if not existing.club_logo_url or "frag-og.png" in existing.club_logo_url:
-                                existing.club_logo_url = logo
-                            if not existing.phone: existing.phone = phone
-                            if not existing.instagram: existing.instagram = instagram
-                            if address != "Адрес не указан" and not existing.address: existing.address = address
-                            db.session.commit()
-                            print(f"      [~] Обновлено: {name} | Фото: {'OK' if logo else 'Fail'}")
-                            continue
-
-                        new_club = Club(
-                            name=name[:100],
-                            api_key="",
-                            cafe_id="",
-                            club_logo_url=logo[:255],
-                            address=address[:255],
-                            phone=phone[:50],
-                            description="",
-                            instagram=instagram[:100],
-                            working_hours="Круглосуточно",
-                            lat=0.0,
-                            lng=0.0
-                        )
-                        db.session.add(new_club)
-                        db.session.commit()
-                        clubs_added += 1
-                        print(f"  [+] Добавлен: {name}")
-                        print(f"      - Фото: {logo[:50]}...")
-                        print(f"      - Тел: {phone}")
-                        print(f"      - Inst: {instagram}")
-                        
-                        time.sleep(1) # Не спамим запросами
-                        
-                    except Exception as e:
-                        print(f"  [!] Ошибка при парсинге {club_url}: {e}")
+                for future in futures:
+                    club_result = future.result()
+                    summary[club_result["status"]] += 1
+                    fields = {}
+                    if club_result["status"] == "changed":
+                        club, action = upsert_club(club_result["club"])
+                        fields["club_id"] = club.id
+                        if action != "same":
+                            summary[action] += 1
+                            print(f"  [{'+' if action == 'added' else '~'}] {club.name}")
+                    elif club_result["status"] == "failed":
+                        print(f"  [!] Ошибка при парсинге {club_result['url']}: {club_result['error']}")
+                    record_page(pages.get(club_result["url"]), club_result, now, **fields)
+                record_page(listing, result, now, links=json.dumps(club_links) if result["status"] == "changed" else listing.links)
+                db.session.commit()
             except Exception as e:
-                print(f"[!] Ошибка запроса страницы {page}: {e}")
-                
-        print(f"\n✅ Парсинг завершён! Добавлено клубов: {clubs_added}")
+                db.session.rollback()
+                print(f"[!] Ошибка сохранения страницы {page_no}: {e}")
+                summary["failed"] += 1
+
+            if not club_links:
+                break # Если клубов нет на странице, выходим
+
+    pool.shutdown()
+    session.close()
+    summary["seconds"] = round(time.monotonic() - started, 1)
+    print(
+        f"\n✅ Парсинг завершён за {summary['seconds']} с: изменилось {summary['changed']}, "
+        f"без изменений {summary['unchanged']}, ошибок {summary['failed']}; "
+        f"добавлено клубов {summary['added']}, обновлено {summary['updated']}"
+    )
+    return summary
+
 
 if __name__ == "__main__":
-    scrape_clubs()
+    parser = argparse.ArgumentParser(description="Импорт клубов с frag.gg")
+    parser.add_argument("--full", action="store_true", help="Скачать всё заново, без условных запросов")
+    scrape_clubs(full=parser.parse_args().full)
@@ -0,0 +1,10 @@
+"""WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The database is initialised by gunicorn.conf.py's on_starting hook, once in
+the master process; importing this module does not touch the database.
+"""
+from app import app
+
+application = app
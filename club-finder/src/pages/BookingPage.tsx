@@ -86,8 +86,12 @@ export default function BookingPage() {
   const [submitting, setSubmitting] = useState(false);
   const [booked, setBooked] = useState<null | { id: number; zone_name: string; pc_names: string[]; status: string }>(null);
 
-  const [myBookings, setMyBookings] = useState<MyBooking[]>([]);
+  const [myBookings, setMyBookings] = useState<MyBooking[]>([]);  // first page, kept current
+  const [firstPageCursor, setFirstPageCursor] = useState<string | null>(null);
+  // Pages past the first, loaded on demand ("Показать ещё")
+  const [olderBookings, setOlderBookings] = useState<null | { bookings: MyBooking[]; cursor: string | null }>(null);
   const [loadingMyBookings, setLoadingMyBookings] = useState(false);
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const [cancellingId, setCancellingId] = useState<number | null>(null);
 
   const token = localStorage.getItem("icafe_client_token");
@@ -97,6 +101,13 @@ export default function BookingPage() {
     [myBookings]
   );
 
+  const allBookings = useMemo(() => {
+    if (!olderBookings) return myBookings;
+    const recentIds = new Set(myBookings.map((b) => b.id));
+    return [...myBookings, ...olderBookings.bookings.filter((b) => !recentIds.has(b.id))];
+  }, [myBookings, olderBookings]);
+  const nextBookingsCursor = olderBookings ? olderBookings.cursor : firstPageCursor;
+
   const loadMyBookings = async (opts?: { silent?: boolean }) => {
     if (!token) {
       setMyBookings([]);
@@ -114,10 +125,12 @@ export default function BookingPage() {
         localStorage.removeItem("icafe_client_token");
         localStorage.removeItem("icafe_client_user");
         setMyBookings([]);
+        setOlderBookings(null);
         return;
       }
       if (!res.ok) throw new Error(payload?.message || "Не удалось загрузить бронирования");
       const nextBookings = Array.isArray(payload?.bookings) ? payload.bookings : [];
+      setFirstPageCursor(payload?.next_cursor ?? null);
       setMyBookings((prev) => {
         if (JSON.stringify(prev) === JSON.stringify(nextBookings)) return prev;
         return nextBookings;
@@ -133,6 +146,27 @@ export default function BookingPage() {
     }
   };
 
+  const loadOlderBookings = async () => {
+    if (!token || !nextBookingsCursor) return;
+    setLoadingOlder(true);
+    try {
+      const res = await fetch(`/api/public/bookings/my?cursor=${encodeURIComponent(nextBookingsCursor)}`, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      const payload = await res.json();
+      if (!res.ok) throw new Error(payload?.message || "Не удалось загрузить бронирования");
+      const page = Array.isArray(payload?.bookings) ? payload.bookings : [];
+      setOlderBookings((prev) => ({
+        bookings: [...(prev?.bookings ?? []), ...page],
+        cursor: payload?.next_cursor ?? null,
+      }));
+    } catch (err: any) {
+      toast({ title: "Ошибка", description: err?.message || "Не удалось загрузить бронирования", variant: "destructive" });
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   const cancelMyBooking = async (bookingId: number) => {
     if (!token) return;
     const reason = window.prompt("Укажите причину отмены");
@@ -167,10 +201,45 @@ export default function BookingPage() {
   }, []);
 
   useEffect(() => {
+    // Booking changes are pushed over SSE; the interval is only a fallback.
     const intervalId = window.setInterval(() => {
       loadMyBookings({ silent: true });
-    }, 5000);
-    return () => window.clearInterval(intervalId);
+    }, 60_000);
+    // EventSource can't send headers: the stream is opened with a short-lived
+    // ticket, and a fresh one is fetched whenever EventSource gives up.
+    let source: EventSource | null = null;
+    let retryTimer: number | undefined;
+    let stopped = false;
+    const connect = async () => {
+      try {
+        const res = await fetch("/api/public/bookings/stream/ticket", {
+          method: "POST",
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        if (!res.ok) return; // signed out or token revoked; the interval keeps polling
+        const { ticket } = await res.json();
+        if (stopped) return;
+        source = new EventSource(`/api/public/bookings/stream?ticket=${encodeURIComponent(ticket)}`);
+        source.addEventListener("booking", () => loadMyBookings({ silent: true }));
+        source.onerror = () => {
+          if (source?.readyState !== EventSource.CLOSED) return;
+          source = null;
+          loadMyBookings({ silent: true }); // catch up on anything missed while disconnected
+          retryTimer = window.setTimeout(connect, 3000);
+        };
+      } catch {
+        if (!stopped) retryTimer = window.setTimeout(connect, 3000);
+      }
+    };
+    if (token && "EventSource" in window) {
+      connect();
+    }
+    return () => {
+      stopped = true;
+      window.clearInterval(intervalId);
+      window.clearTimeout(retryTimer);
+      source?.close();
+    };
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
@@ -409,10 +478,10 @@ export default function BookingPage() {
         <div className="px-4 space-y-3">
           {loadingMyBookings ? (
             <div className="text-sm text-muted-foreground">Загрузка бронирований...</div>
-          ) : myBookings.length === 0 ? (
+          ) : allBookings.length === 0 ? (
             <div className="text-sm text-muted-foreground">У вас пока нет бронирований</div>
           ) : (
-            myBookings.map((b) => {
+            allBookings.map((b) => {
               const ui = bookingStatusUi(b.status);
               const canCancel = b.status === "pending" || b.status === "approved";
               const canOpenChat = b.status === "approved" && !!b.chat_url;
@@ -469,6 +538,11 @@ export default function BookingPage() {
               );
             })
           )}
+          {!loadingMyBookings && nextBookingsCursor ? (
+            <Button onClick={loadOlderBookings} disabled={loadingOlder} variant="outline" className="w-full">
+              {loadingOlder ? "Загрузка..." : "Показать ещё"}
+            </Button>
+          ) : null}
         </div>
       </div>
     );
@@ -1,7 +1,7 @@
 import { useState } from "react";
 import { CalendarClock, Phone, User, Monitor, MapPin, RefreshCw } from "lucide-react";
-import { useQuery } from "@tanstack/react-query";
-import { api } from "@/lib/api";
+import { useQuery, useQueryClient } from "@tanstack/react-query";
+import { api, appendBookingsPage, type DashboardBookingsData } from "@/lib/api";
 
 function formatDate(value: string | null): string {
   if (!value) return "-";
@@ -31,10 +31,13 @@ function statusUi(status: string) {
 
 const BookingPanel = () => {
   const [updatingId, setUpdatingId] = useState<number | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const queryClient = useQueryClient();
   const { data, isLoading, refetch, isFetching } = useQuery({
     queryKey: ["manager_bookings"],
-    queryFn: api.managerBookings,
-    refetchInterval: 5000,
+    // Only rows changed since the cached cursor are fetched and merged in
+    queryFn: () => api.managerBookingsSince(queryClient.getQueryData<DashboardBookingsData>(["manager_bookings"])),
+    refetchInterval: 60_000, // fallback only; Sidebar's booking stream invalidates this query
     refetchOnWindowFocus: true,
   });
 
@@ -53,6 +56,19 @@ const BookingPanel = () => {
     }
   };
 
+  const handleLoadMore = async () => {
+    if (!data?.next_cursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await api.managerBookings(data.next_cursor);
+      queryClient.setQueryData<DashboardBookingsData>(["manager_bookings"], (prev) => (prev ? appendBookingsPage(prev, page) : page));
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleCancel = async (bookingId: number) => {
     const reason = window.prompt("Укажите причину отмены");
     if (!reason || !reason.trim()) return;
@@ -202,6 +218,16 @@ const BookingPanel = () => {
               </div>
             );
           })}
+          {data?.next_cursor ? (
+            <button
+              type="button"
+              disabled={loadingMore}
+              onClick={handleLoadMore}
+              className="w-full rounded-lg border border-border bg-card px-3 py-2 text-sm hover:bg-accent transition-colors disabled:opacity-60"
+            >
+              {loadingMore ? "Загрузка..." : "Показать ещё"}
+            </button>
+          ) : null}
         </div>
       )}
     </div>
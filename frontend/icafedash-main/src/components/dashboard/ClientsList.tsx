@@ -1,6 +1,6 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
-import { api, RegisteredUser } from "@/lib/api";
+import { api, type Page, type RegisteredUser } from "@/lib/api";
 import { Users, Shield, ShieldCheck, Trash2, CheckCircle, XCircle, UserCog, Search, RefreshCw } from "lucide-react";
 import { useAuth } from "@/components/auth/AuthProvider";
 
@@ -9,10 +9,36 @@ const ClientsList = () => {
     const queryClient = useQueryClient();
     const [search, setSearch] = useState("");
 
-    const { data: users = [], isLoading, refetch } = useQuery({
-        queryKey: ["admin-users"],
-        queryFn: api.adminUsers,
+    const [debouncedSearch, setDebouncedSearch] = useState("");
+    const [loadingMore, setLoadingMore] = useState(false);
+
+    useEffect(() => {
+        const timer = setTimeout(() => setDebouncedSearch(search.trim()), 300);
+        return () => clearTimeout(timer);
+    }, [search]);
+
+    // One page at a time; the server filters by role and search
+    const queryKey = ["admin-users", "staff", debouncedSearch];
+    const { data, isLoading, refetch } = useQuery({
+        queryKey,
+        queryFn: () => api.adminUsers({ role: "staff", search: debouncedSearch }),
     });
+    const users = data?.items ?? [];
+
+    const handleLoadMore = async () => {
+        if (!data?.next_cursor) return;
+        setLoadingMore(true);
+        try {
+            const page = await api.adminUsers({ role: "staff", search: debouncedSearch, cursor: data.next_cursor });
+            queryClient.setQueryData<Page<RegisteredUser>>(queryKey, (prev) =>
+                prev ? { items: [...prev.items, ...page.items], next_cursor: page.next_cursor } : page
+            );
+        } catch (err) {
+            console.error(err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
 
     const { data: clubs = [] } = useQuery({
         queryKey: ["admin-clubs"],
@@ -47,14 +73,8 @@ const ClientsList = () => {
         }
     };
 
-    const managers = users.filter(u => u.role !== "member");
-
-    const filteredUsers = managers.filter(
-        (u) =>
-            u.username.toLowerCase().includes(search.toLowerCase()) ||
-            (u.email && u.email.toLowerCase().includes(search.toLowerCase())) ||
-            (u.phone && u.phone.includes(search))
-    );
+    const filteredUsers = users;
+    const more = data?.next_cursor ? "+" : "";  // counts cover the loaded pages only
 
     const formatDate = (dateStr: string | null) => {
         if (!dateStr) return "—";
@@ -99,19 +119,19 @@ const ClientsList = () => {
             <div className="grid grid-cols-2 md:grid-cols-4 gap-4">
                 <div className="bg-card rounded-xl border border-border p-4">
                     <p className="text-xs text-muted-foreground">Всего</p>
-                    <p className="text-2xl font-bold text-foreground">{users.length}</p>
+                    <p className="text-2xl font-bold text-foreground">{users.length}{more}</p>
                 </div>
                 <div className="bg-card rounded-xl border border-border p-4">
                     <p className="text-xs text-muted-foreground">Подтверждённые</p>
-                    <p className="text-2xl font-bold text-emerald-400">{users.filter(u => u.is_verified).length}</p>
+                    <p className="text-2xl font-bold text-emerald-400">{users.filter(u => u.is_verified).length}{more}</p>
                 </div>
                 <div className="bg-card rounded-xl border border-border p-4">
                     <p className="text-xs text-muted-foreground">Ожидают</p>
-                    <p className="text-2xl font-bold text-amber-400">{users.filter(u => !u.is_verified).length}</p>
+                    <p className="text-2xl font-bold text-amber-400">{users.filter(u => !u.is_verified).length}{more}</p>
                 </div>
                 <div className="bg-card rounded-xl border border-border p-4">
                     <p className="text-xs text-muted-foreground">С клубом</p>
-                    <p className="text-2xl font-bold text-primary">{users.filter(u => u.club_id).length}</p>
+                    <p className="text-2xl font-bold text-primary">{users.filter(u => u.club_id).length}{more}</p>
                 </div>
             </div>
 
@@ -239,6 +259,16 @@ const ClientsList = () => {
                     </table>
                 </div>
             </div>
+            {data?.next_cursor && (
+                <button
+                    type="button"
+                    disabled={loadingMore}
+                    onClick={handleLoadMore}
+                    className="w-full rounded-lg border border-border bg-card px-3 py-2 text-sm hover:bg-accent transition-colors disabled:opacity-60"
+                >
+                    {loadingMore ? "Загрузка..." : "Показать ещё"}
+                </button>
+            )}
         </div>
     );
 };
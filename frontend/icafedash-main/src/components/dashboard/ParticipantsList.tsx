@@ -1,16 +1,42 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
-import { api, RegisteredUser } from "@/lib/api";
+import { api, type Page, type RegisteredUser } from "@/lib/api";
 import { Users, Trash2, CheckCircle, XCircle, Search, RefreshCw, Mail } from "lucide-react";
 
 const ParticipantsList = () => {
     const queryClient = useQueryClient();
     const [search, setSearch] = useState("");
 
-    const { data: users = [], isLoading, refetch } = useQuery({
-        queryKey: ["admin-users"],
-        queryFn: api.adminUsers,
+    const [debouncedSearch, setDebouncedSearch] = useState("");
+    const [loadingMore, setLoadingMore] = useState(false);
+
+    useEffect(() => {
+        const timer = setTimeout(() => setDebouncedSearch(search.trim()), 300);
+        return () => clearTimeout(timer);
+    }, [search]);
+
+    // One page at a time; the server filters by role and search
+    const queryKey = ["admin-users", "member", debouncedSearch];
+    const { data, isLoading, refetch } = useQuery({
+        queryKey,
+        queryFn: () => api.adminUsers({ role: "member", search: debouncedSearch }),
     });
+    const users = data?.items ?? [];
+
+    const handleLoadMore = async () => {
+        if (!data?.next_cursor) return;
+        setLoadingMore(true);
+        try {
+            const page = await api.adminUsers({ role: "member", search: debouncedSearch, cursor: data.next_cursor });
+            queryClient.setQueryData<Page<RegisteredUser>>(queryKey, (prev) =>
+                prev ? { items: [...prev.items, ...page.items], next_cursor: page.next_cursor } : page
+            );
+        } catch (err) {
+            console.error(err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
 
     const updateMutation = useMutation({
         mutationFn: ({ userId, data }: { userId: number; data: any }) => api.updateUser(userId, data),
@@ -32,15 +58,8 @@ const ParticipantsList = () => {
         }
     };
 
-    // Filter by role="member" (those from club-finder)
-    const participants = users.filter(u => u.role === "member");
-
-    const filteredUsers = participants.filter(
-        (u) =>
-            u.username.toLowerCase().includes(search.toLowerCase()) ||
-            (u.email && u.email.toLowerCase().includes(search.toLowerCase())) ||
-            (u.phone && u.phone.includes(search))
-    );
+    // role="member": accounts registered through club-finder
+    const filteredUsers = users;
 
     const formatDate = (dateStr: string | null) => {
         if (!dateStr) return "—";
@@ -144,6 +163,16 @@ const ParticipantsList = () => {
                     </table>
                 </div>
             </div>
+            {data?.next_cursor && (
+                <button
+                    type="button"
+                    disabled={loadingMore}
+                    onClick={handleLoadMore}
+                    className="w-full rounded-lg border border-border bg-card px-3 py-2 text-sm hover:bg-accent transition-colors disabled:opacity-60"
+                >
+                    {loadingMore ? "Загрузка..." : "Показать ещё"}
+                </button>
+            )}
         </div>
     );
 };
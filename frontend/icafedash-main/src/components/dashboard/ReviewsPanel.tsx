@@ -1,6 +1,7 @@
-import { useQuery } from "@tanstack/react-query";
+import { useState } from "react";
+import { useQuery, useQueryClient } from "@tanstack/react-query";
 import { MessageSquare, Star } from "lucide-react";
-import { api } from "@/lib/api";
+import { api, type DashboardReviewsData } from "@/lib/api";
 
 function formatDate(value: string | null): string {
     if (!value) return "—";
@@ -16,14 +17,31 @@ function formatDate(value: string | null): string {
 }
 
 const ReviewsPanel = () => {
+    const queryClient = useQueryClient();
+    const [loadingMore, setLoadingMore] = useState(false);
     const { data, isLoading } = useQuery({
         queryKey: ["reviews-dashboard"],
-        queryFn: api.managerReviews,
+        queryFn: () => api.managerReviews(),
     });
 
     const reviews = data?.reviews ?? [];
     const summary = data?.summary ?? { count: 0, average_rating: 0 };
 
+    const handleLoadMore = async () => {
+        if (!data?.next_cursor) return;
+        setLoadingMore(true);
+        try {
+            const page = await api.managerReviews(data.next_cursor);
+            queryClient.setQueryData<DashboardReviewsData>(["reviews-dashboard"], (prev) =>
+                prev ? { ...prev, reviews: [...prev.reviews, ...page.reviews], next_cursor: page.next_cursor } : page
+            );
+        } catch (err) {
+            console.error(err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     return (
         <div className="space-y-6">
             <div className="flex items-center justify-between">
@@ -76,6 +94,17 @@ const ReviewsPanel = () => {
                         <p className="mt-3 whitespace-pre-wrap text-sm text-foreground/90">{review.text}</p>
                     </div>
                 ))}
+
+                {!isLoading && data?.next_cursor && (
+                    <button
+                        type="button"
+                        disabled={loadingMore}
+                        onClick={handleLoadMore}
+                        className="w-full rounded-lg border border-border bg-card px-3 py-2 text-sm hover:bg-accent transition-colors disabled:opacity-60"
+                    >
+                        {loadingMore ? "Загрузка..." : "Показать ещё"}
+                    </button>
+                )}
             </div>
         </div>
     );
@@ -34,6 +34,8 @@ const SettingsPanel = () => {
     const [selectedFile, setSelectedFile] = useState<File | null>(null);
     const [clubPhotos, setClubPhotos] = useState<string[]>([]);
     const [mainPhotoUrl, setMainPhotoUrl] = useState<string>("");
+    // Fresh uploads are shown from the local file: the server answers 503 until their variants are rendered
+    const [photoPreviews, setPhotoPreviews] = useState<Record<string, string>>({});
     const [isUploadingPhoto, setIsUploadingPhoto] = useState(false);
 
     const { data: config, isLoading } = useQuery({
@@ -152,6 +154,7 @@ const SettingsPanel = () => {
         setIsUploadingPhoto(true);
         try {
             const uploadRes = await api.uploadClubPhoto(file);
+            setPhotoPreviews((prev) => (prev[uploadRes.url] ? prev : { ...prev, [uploadRes.url]: URL.createObjectURL(file) }));
             setClubPhotos((prev) => {
                 if (prev.includes(uploadRes.url)) return prev;
                 return [...prev, uploadRes.url];
@@ -326,7 +329,7 @@ const SettingsPanel = () => {
                             <div className="grid grid-cols-2 md:grid-cols-4 gap-3">
                                 {clubPhotos.map((photoUrl) => (
                                     <div key={photoUrl} className="relative rounded-lg overflow-hidden border border-border bg-background group">
-                                        <img src={photoUrl} alt="Фото клуба" className="w-full h-24 object-cover" />
+                                        <img src={photoPreviews[photoUrl] || photoUrl} alt="Фото клуба" className="w-full h-24 object-cover" />
                                         <div className="absolute inset-0 bg-black/50 opacity-0 group-hover:opacity-100 transition-opacity flex flex-col justify-end p-2 gap-1">
                                             <button
                                                 type="button"
@@ -13,9 +13,10 @@ import {
   CalendarClock,
 } from "lucide-react";
 import { useEffect, useRef, useState } from "react";
-import { useQuery } from "@tanstack/react-query";
-import { api } from "@/lib/api";
+import { useQuery, useQueryClient } from "@tanstack/react-query";
+import { api, type DashboardBookingsData } from "@/lib/api";
 import { useAuth } from "@/components/auth/AuthProvider";
+import { useBookingStream } from "@/hooks/use-booking-stream";
 
 const navItems = [
   { icon: LayoutDashboard, label: "Обзор" },
@@ -60,15 +61,18 @@ function playShortSignal() {
 const Sidebar = ({ activeTab, onTabChange }: SidebarProps) => {
   const [mobileOpen, setMobileOpen] = useState(false);
   const { isAdmin } = useAuth();
+  const queryClient = useQueryClient();
   const { data: cfg } = useQuery({ queryKey: ["config"], queryFn: api.getConfig });
   const prevPendingRef = useRef<number | null>(null);
   const { data: bookingData } = useQuery({
     queryKey: ["manager_bookings_badge"],
-    queryFn: api.managerBookings,
+    // Only rows changed since the cached cursor are fetched and merged in
+    queryFn: () => api.managerBookingsSince(queryClient.getQueryData<DashboardBookingsData>(["manager_bookings_badge"])),
     enabled: !isAdmin,
-    refetchInterval: 5000,
+    refetchInterval: 60_000, // fallback only; updates arrive via useBookingStream
     refetchOnWindowFocus: true,
   });
+  useBookingStream();
 
   const clubName = cfg?.club_name || "iCafe";
   const clubLogo = cfg?.club_logo_url;
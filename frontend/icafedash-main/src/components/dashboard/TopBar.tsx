@@ -20,6 +20,8 @@ const SettingsModal = ({ onClose }: { onClose: () => void }) => {
 
   const [clubName, setClubName] = useState("");
   const [clubLogo, setClubLogo] = useState("");
+  // Shown until the uploaded logo's variants are rendered (503 until then)
+  const [logoPreview, setLogoPreview] = useState<string | null>(null);
   const [isUploading, setIsUploading] = useState(false);
 
   // Initialize form when data loads
@@ -49,6 +51,7 @@ const SettingsModal = ({ onClose }: { onClose: () => void }) => {
     try {
       const { url } = await api.uploadLogo(file);
       setClubLogo(url);
+      setLogoPreview(URL.createObjectURL(file));
     } catch (err) {
       alert("Ошибка при загрузке логотипа");
     } finally {
@@ -104,7 +107,7 @@ const SettingsModal = ({ onClose }: { onClose: () => void }) => {
               <div className="flex items-center gap-4">
                 <div className="h-16 w-16 rounded-xl border border-border bg-secondary overflow-hidden flex items-center justify-center flex-shrink-0">
                   {clubLogo ? (
-                    <img src={clubLogo} alt="Preview" className="h-full w-full object-contain" />
+                    <img src={logoPreview || clubLogo} alt="Preview" className="h-full w-full object-contain" />
                   ) : (
                     <div className="h-full w-full bg-primary/20 flex items-center justify-center text-primary font-bold">
                       {clubName.slice(0, 2).toUpperCase()}
@@ -0,0 +1,61 @@
+import { useEffect } from "react";
+import { useQueryClient } from "@tanstack/react-query";
+import { bookingStreamUrl } from "@/lib/api";
+
+const RECONNECT_DELAY_MS = 3000;
+
+/**
+ * Subscribes to /api/bookings/stream (Server-Sent Events) and refreshes the
+ * booking queries only when a booking is created, approved, rejected or
+ * cancelled. The stream URL holds a short-lived ticket, so once EventSource
+ * gives up (the ticket expired before a reconnect) a new ticket is fetched and
+ * the stream resumes after the last event seen.
+ */
+export function useBookingStream(enabled = true) {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    if (!enabled || typeof window === "undefined" || !("EventSource" in window)) return;
+
+    let source: EventSource | null = null;
+    let lastEventId: string | null = null;
+    let retryTimer: number | undefined;
+    let stopped = false;
+
+    const onBooking = (event: MessageEvent) => {
+      if (event.lastEventId) lastEventId = event.lastEventId;
+      queryClient.invalidateQueries({ queryKey: ["manager_bookings"] });
+      queryClient.invalidateQueries({ queryKey: ["manager_bookings_badge"] });
+    };
+
+    const connect = async () => {
+      let url: string | null = null;
+      try {
+        url = await bookingStreamUrl(lastEventId);
+      } catch {
+        url = null;
+      }
+      if (stopped) return;
+      if (!url) {
+        retryTimer = window.setTimeout(connect, RECONNECT_DELAY_MS);
+        return;
+      }
+      source = new EventSource(url);
+      source.addEventListener("booking", onBooking);
+      source.onerror = () => {
+        if (source?.readyState !== EventSource.CLOSED) return; // EventSource is retrying by itself
+        source.removeEventListener("booking", onBooking);
+        source = null;
+        retryTimer = window.setTimeout(connect, RECONNECT_DELAY_MS);
+      };
+    };
+
+    connect();
+    return () => {
+      stopped = true;
+      window.clearTimeout(retryTimer);
+      source?.removeEventListener("booking", onBooking);
+      source?.close();
+    };
+  }, [enabled, queryClient]);
+}
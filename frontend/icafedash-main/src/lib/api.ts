@@ -4,6 +4,7 @@
  */
 
 const BASE = import.meta.env.VITE_API_URL ?? "/api";
+const ADMIN_USERS_PAGE_SIZE = 50;
 
 function getHeaders() {
     const token = localStorage.getItem("icafe_token");
@@ -33,6 +34,22 @@ async function get<T>(path: string, params?: Record<string, string | number>): P
     return res.json();
 }
 
+/** GET one page of an array endpoint that returns the next page's cursor in X-Next-Cursor. */
+async function getPage<T>(path: string, params?: Record<string, string | number>): Promise<Page<T>> {
+    const url = new URL(`${BASE}${path}`, window.location.origin);
+    if (params) {
+        Object.entries(params).forEach(([k, v]) => url.searchParams.set(k, String(v)));
+    }
+    const res = await fetch(url.toString(), { headers: getHeaders() });
+    if (res.status === 401) {
+        localStorage.removeItem("icafe_token");
+        localStorage.removeItem("icafe_user");
+        window.location.href = "/login";
+    }
+    if (!res.ok) throw new Error(`API error ${res.status}`);
+    return { items: await res.json(), next_cursor: res.headers.get("X-Next-Cursor") };
+}
+
 async function post<T>(path: string, body: object): Promise<T> {
     const url = new URL(`${BASE}${path}`, window.location.origin);
     const headers = getHeaders();
@@ -85,6 +102,66 @@ async function del<T>(path: string): Promise<T> {
     return res.json();
 }
 
+/**
+ * URL of the booking SSE stream. EventSource can't send headers, so the URL
+ * carries a short-lived stream ticket (never the access token); get a fresh
+ * URL for every new EventSource.
+ */
+export async function bookingStreamUrl(lastEventId?: string | null): Promise<string | null> {
+    if (!localStorage.getItem("icafe_token")) return null;
+    const { ticket } = await post<{ ticket: string; expires_in: number }>("/bookings/stream/ticket", {});
+    const url = new URL(`${BASE}/bookings/stream`, window.location.origin);
+    url.searchParams.set("ticket", ticket);
+    if (lastEventId) url.searchParams.set("last_event_id", lastEventId);
+    return url.toString();
+}
+
+// ── Batched dashboard widgets ──────────────────────────────────────────────
+
+export type DashboardWidget =
+    | "overview" | "daily" | "monthly" | "payments" | "income_monthly" | "pcs" | "members" | "config";
+
+interface DashboardWidgetResult {
+    status: "ok" | "not_found" | "error" | "timeout";
+    data: unknown;
+}
+
+let pendingWidgets = new Map<DashboardWidget, { resolve: (data: any) => void; reject: (err: Error) => void }[]>();
+
+/**
+ * Widgets requested in the same tick (every dashboard card mounting or
+ * refetching together) are fetched with a single /dashboard?widgets= call.
+ * The response carries an ETag, so an unchanged batch is revalidated by the
+ * browser cache and comes back as an empty 304.
+ */
+function widget<T>(key: DashboardWidget): Promise<T> {
+    return new Promise<T>((resolve, reject) => {
+        if (pendingWidgets.size === 0) queueMicrotask(flushWidgets);
+        const waiters = pendingWidgets.get(key) ?? [];
+        waiters.push({ resolve, reject });
+        pendingWidgets.set(key, waiters);
+    });
+}
+
+async function flushWidgets() {
+    const batch = pendingWidgets;
+    pendingWidgets = new Map();
+    try {
+        const res = await get<{ widgets: Record<string, DashboardWidgetResult> }>("/dashboard", {
+            widgets: [...batch.keys()].join(","),
+        });
+        batch.forEach((waiters, key) => {
+            const result = res.widgets[key];
+            waiters.forEach(({ resolve, reject }) => {
+                if (result?.status === "ok") resolve(result.data);
+                else reject(new Error(result?.status === "not_found" ? "API error 404" : `Widget ${key}: ${result?.status}`));
+            });
+        });
+    } catch (err) {
+        batch.forEach((waiters) => waiters.forEach(({ reject }) => reject(err as Error)));
+    }
+}
+
 // ── Types ──────────────────────────────────────────────────────────────────
 
 export interface OverviewData {
@@ -153,6 +230,11 @@ export interface ConfigData {
     internet_speed: string;
 }
 
+export interface Page<T> {
+    items: T[];
+    next_cursor: string | null;
+}
+
 export interface RegisteredUser {
     id: number;
     username: string;
@@ -192,20 +274,53 @@ export interface DashboardBooking {
     canceled_by?: string | null;
     canceled_at?: string | null;
     created_at: string | null;
+    updated_at?: string | null;
+}
+
+export interface DashboardBookingsData {
+    bookings: DashboardBooking[];
+    summary: { count: number; pending_count: number; cancelled_count: number };
+    cursor: number;
+    next_cursor?: string | null;
+    delta?: boolean;
+}
+
+export interface DashboardReviewsData {
+    reviews: DashboardReview[];
+    summary: { count: number; average_rating: number };
+    next_cursor?: string | null;
+}
+
+/** Apply a `?since=` delta to the cached bookings list (changed rows replace, new rows are added). */
+export function mergeBookingsDelta(prev: DashboardBookingsData, delta: DashboardBookingsData): DashboardBookingsData {
+    const changed = new Map(delta.bookings.map((b) => [b.id, b]));
+    const kept = prev.bookings.filter((b) => !changed.has(b.id));
+    const bookings = [...delta.bookings, ...kept].sort((a, b) => (b.created_at || "").localeCompare(a.created_at || ""));
+    return { bookings, summary: delta.summary, cursor: delta.cursor, next_cursor: prev.next_cursor, delta: false };
+}
+
+/** Append an older page (fetched with `?cursor=`) to the cached bookings list. */
+export function appendBookingsPage(prev: DashboardBookingsData, page: DashboardBookingsData): DashboardBookingsData {
+    const seen = new Set(prev.bookings.map((b) => b.id));
+    return {
+        ...prev,
+        bookings: [...prev.bookings, ...page.bookings.filter((b) => !seen.has(b.id))],
+        next_cursor: page.next_cursor,
+    };
 }
 
 // ── API calls ──────────────────────────────────────────────────────────────
 
 export const api = {
-    overview: () => get<OverviewData>("/overview"),
+    overview: () => widget<OverviewData>("overview"),
 
-    dailyChart: () => get<DailyChartData>("/charts/daily"),
+    dailyChart: () => widget<DailyChartData>("daily"),
 
-    monthlyChart: () => get<MonthlyChartData>("/charts/monthly"),
+    monthlyChart: () => widget<MonthlyChartData>("monthly"),
 
-    paymentMethods: () => get<PaymentMethodsData>("/charts/payments"),
+    paymentMethods: () => widget<PaymentMethodsData>("payments"),
 
-    pcs: () => get<{ pcs: PC[]; total: number }>("/pcs"),
+    pcs: () => widget<{ pcs: PC[]; total: number }>("pcs"),
 
     members: (page = 1, search = "") =>
         get<{ members: Member[]; paging: Record<string, number> }>("/members", {
@@ -213,7 +328,7 @@ export const api = {
             search,
         }),
 
-    getConfig: () => get<ConfigData>("/config"),
+    getConfig: () => widget<ConfigData>("config"),
 
     getIcafeData: () => get<{ zones: string; tariffs: string }>("/config/icafe-data"),
 
@@ -245,7 +360,7 @@ export const api = {
         return res.json();
     },
 
-    getMonthlyAggregatedIncome: () => get<{ data: { month: string; amount: number }[] }>("/charts/income-monthly"),
+    getMonthlyAggregatedIncome: () => widget<{ data: { month: string; amount: number }[] }>("income_monthly"),
 
     getMembers: (params: { page?: number; search?: string; sort_field?: string; sort_dir?: string }) =>
         get<{ members: any[]; paging: any }>("/members", params),
@@ -270,12 +385,23 @@ export const api = {
     addClub: (data: { name: string; api_key: string; cafe_id: string }) => post<{ ok: boolean }>("/admin/clubs", data),
     updateClub: (clubId: number, data: any) => put<{ message: string }>(`/admin/clubs/${clubId}`, data),
     assignUser: (data: { username: string; password: string; club_id: string }) => post<{ ok: boolean }>("/admin/assign-user", data),
-    adminUsers: () => get<RegisteredUser[]>("/admin/users"),
+    adminUsers: (filters: { role: "member" | "staff"; search?: string; cursor?: string }) =>
+        getPage<RegisteredUser>("/admin/users", {
+            role: filters.role,
+            limit: ADMIN_USERS_PAGE_SIZE,
+            ...(filters.search ? { search: filters.search } : {}),
+            ...(filters.cursor ? { cursor: filters.cursor } : {}),
+        }),
     updateUser: (userId: number, data: { role?: string; club_id?: number | null; is_verified?: boolean }) =>
         put<{ message: string }>(`/admin/users/${userId}`, data),
     deleteUser: (userId: number) => del<{ message: string }>(`/admin/users/${userId}`),
-    managerReviews: () => get<{ reviews: DashboardReview[]; summary: { count: number; average_rating: number } }>("/reviews"),
-    managerBookings: () => get<{ bookings: DashboardBooking[]; summary: { count: number; pending_count: number; cancelled_count: number } }>("/bookings"),
+    managerReviews: (cursor?: string) => get<DashboardReviewsData>("/reviews", cursor ? { cursor } : undefined),
+    managerBookings: (cursor?: string) => get<DashboardBookingsData>("/bookings", cursor ? { cursor } : undefined),
+    managerBookingsSince: async (prev?: DashboardBookingsData) => {
+        if (!prev?.cursor) return get<DashboardBookingsData>("/bookings");
+        const delta = await get<DashboardBookingsData>(`/bookings?since=${prev.cursor}`);
+        return mergeBookingsDelta(prev, delta);
+    },
     updateBookingStatus: (bookingId: number, status: "approved" | "rejected") =>
         put<{ message: string; booking: DashboardBooking }>(`/bookings/${bookingId}/status`, { status }),
     cancelBooking: (bookingId: number, reason: string) =>